@@ -1,12 +1,27 @@
 import os
+import sys
 from setuptools import Extension, setup, find_packages
 from Cython.Build import cythonize
 
+# nw_breakpoint_batch distributes reads over threads with OpenMP where the compiler supports it
+openmp_args = []
+if sys.platform.startswith('linux'):
+    openmp_args = ['-fopenmp']
+
+extensions = [
+    Extension(
+        "ChromBridGE.ChromBridGE_aln",
+        ["src/ChromBridGE/ChromBridGE_aln.pyx"],
+        extra_compile_args=openmp_args,
+        extra_link_args=openmp_args,
+    )
+]
+
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
 
 setup(
-    ext_modules=cythonize("src/ChromBridGE/ChromBridGE_aln.pyx"),
+    ext_modules=cythonize(extensions),
     name = "ChromBridGE",
     version = "0.0.5",
     author = "Kendell Clement",
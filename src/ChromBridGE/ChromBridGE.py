@@ -1,52 +1,330 @@
 import argparse
+import csv
 import os
 import re
 import gzip
+import collections
+import itertools
+import multiprocessing
 from ChromBridGE import ChromBridGE_aln
-from ChromBridGE import ChromBridGE_tx
+from ChromBridGE import ChromBridGE_index
+from ChromBridGE import ChromBridGE_summary
 
 
 def main():
 
     parser = argparse.ArgumentParser(description='ChromBridGE: Translocation detection in genome-edited reads.')
     parser.add_argument('-f','--fastq', help='Input fastq file', required=True)
-    parser.add_argument('-a','--sequence_a', help='Input sequence a', required=True)
-    parser.add_argument('-b','--sequence_b', help='Input sequence b', required=True)
+    parser.add_argument('-a','--sequence_a', help='Input sequence a (required unless --config is given)',default=None)
+    parser.add_argument('-b','--sequence_b', help='Input sequence b (required unless --config is given)',default=None)
     parser.add_argument('--seqA_cut_pos', type=int, help='Index in sequence a of predicted cut site',default=None)
     parser.add_argument('--seqB_cut_pos', type=int, help='Index in sequence b of predicted cut site',default=None)
-    parser.add_argument('--match_score', help='Match score for alignment',default=3)
-    parser.add_argument('--mismatch_score', help='Mismatch score for alignment',default=-1)
-    parser.add_argument('--gap_score', help='Gap score for alignment',default=-2)
-    parser.add_argument('--jump_score', help='Jump score for alignment',default=-3)
-    parser.add_argument('--cut_pos_incentive_score', help='Incentive for jumping at a predicted cut site',default=1)
+    parser.add_argument('--config', help='CRISPECTOR-style config.csv with the SiteName, AmpliconReference and gRNA of a panel of sites. Instead of aligning reads to sequences a and b, each read is aligned to the pairs of sites sharing the most k-mers with its two halves',default=None)
+    parser.add_argument('--kmer_size', type=int, help='Length of the k-mers used to pick the pairs of sites to align each read to with --config',default=15)
+    parser.add_argument('--candidate_pairs', type=int, help='Number of pairs of sites to align each read to with --config (the best alignment is written)',default=1)
+    parser.add_argument('--match_score', type=int, help='Match score for alignment',default=3)
+    parser.add_argument('--mismatch_score', type=int, help='Mismatch score for alignment',default=-1)
+    parser.add_argument('--gap_score', type=int, help='Gap score for alignment',default=-2)
+    parser.add_argument('--jump_score', type=int, help='Jump score for alignment',default=-3)
+    parser.add_argument('--cut_pos_incentive_score', type=int, help='Incentive for jumping at a predicted cut site',default=1)
+    parser.add_argument('--band_width', type=int, help='If greater than 0, first align within this many diagonals of the expected alignment of each sequence, and realign fully unless every alignment leaving the band scores less',default=0)
+    parser.add_argument('--x_drop', type=int, help='If greater than 0, stop extending alignments that score more than this much below the best alignment at the same read position. This is faster but may miss the optimal alignment',default=0)
+    parser.add_argument('--min_score', type=int, help='Do not report alignments scoring less than this score, and stop aligning a read as soon as its alignment cannot reach it (these reads are written with a tx_status of "Not aligned (score below min_score)")',default=None)
+    parser.add_argument('--primer_triage', help='Do not align reads whose start and end match the primers of the same sequence (these are written with breakpoint_count 0 and a tx_status of "Not aligned (primers AA)" or "Not aligned (primers BB)")', action='store_true')
+    parser.add_argument('--primers_a', nargs=2, metavar=('LEFT','RIGHT'), help='Sequences at the start and end of reads amplified from sequence a, used by --primer_triage (default: the first and last --primer_length bases of sequence a)',default=None)
+    parser.add_argument('--primers_b', nargs=2, metavar=('LEFT','RIGHT'), help='Sequences at the start and end of reads amplified from sequence b, used by --primer_triage (default: the first and last --primer_length bases of sequence b)',default=None)
+    parser.add_argument('--primer_length', type=int, help='Number of bases at each end of the sequences used as primers by --primer_triage',default=20)
+    parser.add_argument('--primer_mismatches', type=int, help='Number of mismatches allowed between a read end and a primer by --primer_triage (0 to ' + str(MAX_PRIMER_MISMATCHES) + ')',default=1)
+    parser.add_argument('--write_unique', help='Write one row per unique read sequence with a read_count column instead of one row per read', action='store_true')
+    parser.add_argument('--compact_alignments', help='Write the alignment of each read as an aln_segments column with the sequence (A or B), start position and CIGAR string of each segment of the read (e.g. A:0:30M;B:25:35M) instead of the read_aln, refA_aln and refB_aln columns. The alignments can be rebuilt from the read and the sequences with decode_aln_segments', action='store_true')
+    parser.add_argument('--no_collapse', help='Align every read, even if an identical sequence has already been aligned', action='store_true')
+    parser.add_argument('--threads', type=int, help='Number of processes to use for alignment',default=1)
+    parser.add_argument('--chunk_size', type=int, help='Number of reads sent to a process at a time',default=1000)
     parser.add_argument('-o','--output_file', help='Output file to write results',default=None)
+    parser.add_argument('--summary_file', help='Also write a summary of the run to this file: the number of reads with each tx status (and of likely A>B and B>A translocations and unlikely translocations), and the number of reads with a breakpoint at each position of each sequence by tx status',default=None)
+    parser.add_argument('--summary_only', help='Only write the summary of the run (to --summary_file, or next to the input fastq by default) instead of a row for each read (-o cannot be given)', action='store_true')
     args = parser.parse_args()
 
+    if args.config is None and (args.sequence_a is None or args.sequence_b is None):
+        parser.error('-a/--sequence_a and -b/--sequence_b are required unless --config is given')
+    if args.config is not None and args.primer_triage:
+        parser.error('--primer_triage cannot be used with --config')
+    if args.primer_mismatches < 0 or args.primer_mismatches > MAX_PRIMER_MISMATCHES:
+        parser.error('--primer_mismatches must be between 0 and ' + str(MAX_PRIMER_MISMATCHES))
+    if args.summary_only and args.output_file is not None:
+        parser.error('-o/--output_file cannot be used with --summary_only (no rows are written)')
+
     if not os.path.isfile(args.fastq):
         raise Exception('File ' + args.fastq + ' does not exist')
 
+    root = args.fastq
+    root = re.sub(".fq.gz$","",root)
+    root = re.sub(".fq$","",root)
+    root = re.sub(".fastq.gz$","",root)
+    root = re.sub(".fastq$","",root)
     output_file = args.output_file
     if output_file is None:
-        root = args.fastq
-        root = re.sub(".fq.gz$","",root)
-        root = re.sub(".fq$","",root)
-        root = re.sub(".fastq.gz$","",root)
-        root = re.sub(".fastq$","",root)
         output_file = root+".ChromBridGE.fa"
+    summary_file = args.summary_file
+    if summary_file is None and args.summary_only:
+        summary_file = root+".ChromBridGE.summary.txt"
 
     if args.fastq.endswith('.gz'):
-        f_in = io.BufferedReader(gzip.open(args.fastq,'rt'))
+        f_in = gzip.open(args.fastq,'rt')
     else:
         f_in = open(args.fastq,'rt')
 
-    if output_file.endswith('.gz'):
-        f_out = gzip.open(output_file, 'wt')
+    # with --summary_only, no rows are written
+    f_out = None
+    if not args.summary_only:
+        if output_file.endswith('.gz'):
+            f_out = gzip.open(output_file, 'wt')
+        else:
+            f_out = open(output_file, 'wt')
+
+    aln_params = {
+            'ref1_seq':args.sequence_a,
+            'ref2_seq':args.sequence_b,
+            'ref1_cut_pos':args.seqA_cut_pos,
+            'ref2_cut_pos':args.seqB_cut_pos,
+            'match_score':args.match_score,
+            'mismatch_score':args.mismatch_score,
+            'gap_score':args.gap_score,
+            'jump_score':args.jump_score,
+            'cut_pos_jump_incentive_score':args.cut_pos_incentive_score,
+            'band_width':args.band_width,
+            'x_drop':args.x_drop,
+            'min_score':args.min_score,
+            'compact_alignments':args.compact_alignments,
+            }
+
+    # with --config, each read is aligned to the pairs of sites picked by a k-mer index of the panel (see get_panel_result_fields)
+    sites = None
+    result_header = RESULT_HEADER
+    if args.compact_alignments:
+        result_header = COMPACT_RESULT_HEADER
+    if args.config is not None:
+        sites = read_site_config(args.config)
+        if len(sites) < 2:
+            raise Exception('At least two sites are required in ' + args.config)
+        aln_params['sites'] = sites
+        aln_params['kmer_index'] = ChromBridGE_index.KmerIndex([site_seq for site_name, site_seq, site_cut_pos in sites], args.kmer_size)
+        aln_params['candidate_pairs'] = args.candidate_pairs
+        result_header = PANEL_RESULT_HEADER
+        if args.compact_alignments:
+            result_header = PANEL_COMPACT_RESULT_HEADER
+
+    # with --summary_file or --summary_only, the results of the reads are counted in a summary (see ChromBridGE_summary.BreakpointSummary)
+    # aligned sequences are counted in a summary of each chunk by the process that aligns them, and the chunk summaries are merged here
+    # with the reads that are not aligned (triaged reads, and copies of sequences aligned in earlier chunks)
+    summary_params = None
+    summary = None
+    if summary_file is not None:
+        if sites is None:
+            summary_params = (['A', 'B'], [len(args.sequence_a), len(args.sequence_b)], False)
+        else:
+            summary_params = ([site_name for site_name, site_seq, site_cut_pos in sites], [len(site_seq) for site_name, site_seq, site_cut_pos in sites], True)
+        summary = ChromBridGE_summary.BreakpointSummary(*summary_params)
+
+    # with --threads > 1, chunks of sequences are aligned by a pool of worker processes that each hold aln_params
+    # otherwise, chunks are aligned in this process. In both cases rows are written in input order
+    pool = None
+    if args.threads > 1:
+        pool = multiprocessing.Pool(args.threads, initializer=_init_worker, initargs=(aln_params, summary_params, f_out is not None))
     else:
-        f_out = open(output_file, 'wt')
+        _init_worker(aln_params, summary_params, f_out is not None)
+
+    # exact copies of the references are written without aligning them (see get_wild_type_aln_info)
+    wild_type_seqs = set()
+    if sites is None:
+        wild_type_seqs = get_wild_type_seqs(_get_ref_pair(aln_params))
 
-    f_out.write("read_id\tbreakpoints\tbreakpoint_count\tbreakpoint_cumulative_distance_from_cut\tread_aln\trefA_aln\trefB_aln\n")
+    # with --primer_triage, reads whose ends match the primers of the same sequence are written without aligning them
+    primer_lookups = None
+    if args.primer_triage:
+        primers_a = args.primers_a
+        if primers_a is None:
+            primers_a = get_primers(args.sequence_a, args.primer_length)
+        primers_b = args.primers_b
+        if primers_b is None:
+            primers_b = get_primers(args.sequence_b, args.primer_length)
+        primer_lookups = get_primer_lookups(primers_a, primers_b, args.primer_mismatches)
+    primer_class_counts = collections.Counter()
+
+    def triage_seqs(seqs, read_counts):
+        # counts the primer classes of the reads and returns the results (result fields, if rows are written, and summary fields) of the sequences that are not aligned
+        # wild-type reads are aligned quickly (and exactly) so they are not triaged
+        triaged_fields = {}
+        if primer_lookups is not None:
+            for seq_line, read_count in zip(seqs, read_counts):
+                primer_class = classify_read_primers(seq_line, *primer_lookups)
+                primer_class_counts[primer_class] += read_count
+                if primer_class in TRIAGED_PRIMER_CLASSES and seq_line not in wild_type_seqs:
+                    result_fields = None
+                    if f_out is not None:
+                        result_fields = get_triaged_result_fields(seq_line, primer_class, args.seqA_cut_pos, args.seqB_cut_pos, args.compact_alignments)
+                    triaged_fields[seq_line] = (result_fields, get_triaged_summary_fields(primer_class))
+        return triaged_fields
 
     total_read_count = 0
+    aligned_read_count = 0
+    wild_type_read_count = 0
+    triaged_read_count = 0
+    if args.write_unique:
+        # first pass: count each distinct sequence (dict keeps first-seen order)
+        seq_counts = {}
+        for id_line, seq_line in read_fastq(f_in):
+            total_read_count += 1
+            seq_counts[seq_line] = seq_counts.get(seq_line, 0) + 1
+
+        if f_out is not None:
+            f_out.write("read_seq\tread_count\t" + result_header + "\n")
+        unique_seqs = list(seq_counts.keys())
+        wild_type_read_count = sum([seq_counts[seq] for seq in wild_type_seqs if seq in seq_counts])
+        triaged_fields = triage_seqs(unique_seqs, [seq_counts[seq] for seq in unique_seqs])
+        triaged_read_count = sum([seq_counts[seq] for seq in triaged_fields])
+        if summary is not None:
+            for seq_line, (result_fields, summary_fields) in triaged_fields.items():
+                summary.add_result_fields(summary_fields, seq_counts[seq_line])
+        seq_chunks = [unique_seqs[i:i+args.chunk_size] for i in range(0, len(unique_seqs), args.chunk_size)]
+        seq_chunks_to_align = [[seq_line for seq_line in seq_chunk if seq_line not in triaged_fields] for seq_chunk in seq_chunks]
+        chunk_args = [(seqs_to_align, [seq_counts[seq_line] for seq_line in seqs_to_align]) for seqs_to_align in seq_chunks_to_align]
+        if pool is not None:
+            chunk_results = pool.imap(_align_counted_chunk, chunk_args)
+        else:
+            chunk_results = map(_align_counted_chunk, chunk_args)
+        for seq_chunk, seqs_to_align, (chunk_result, chunk_summary) in zip(seq_chunks, seq_chunks_to_align, chunk_results):
+            if summary is not None:
+                summary.merge(chunk_summary)
+            chunk_result = iter(chunk_result)
+            for seq_line in seq_chunk:
+                if seq_line in triaged_fields:
+                    result_fields, summary_fields = triaged_fields[seq_line]
+                else:
+                    result_fields, summary_fields = next(chunk_result)
+                if f_out is not None:
+                    f_out.write(seq_line + "\t" + str(seq_counts[seq_line]) + "\t" + result_fields + "\n")
+            aligned_read_count += len([seq_line for seq_line in seqs_to_align if seq_line not in wild_type_seqs])
+            print('aligned unique read count: ' + str(aligned_read_count))
+    else:
+        if f_out is not None:
+            f_out.write("read_id\t" + result_header + "\n")
+        # result_cache holds the results (result fields and summary fields) of each sequence that has been aligned (or None if it has been submitted but not returned yet)
+        result_cache = {}
+        # pending holds (chunk, seqs_to_align, triaged_fields, result) for chunks that have been submitted but not written
+        pending = collections.deque()
+        max_pending_chunks = max(1, args.threads) * 4
+
+        def write_chunk(chunk, seqs_to_align, triaged_fields, result):
+            if pool is not None:
+                result = result.get()
+            result, chunk_summary = result
+            if summary is not None:
+                summary.merge(chunk_summary)
+            if args.no_collapse:
+                result = iter(result)
+                for id_line, seq_line in chunk:
+                    if seq_line in triaged_fields:
+                        result_fields, summary_fields = triaged_fields[seq_line]
+                        if summary is not None:
+                            summary.add_result_fields(summary_fields)
+                    else:
+                        result_fields, summary_fields = next(result)
+                    if f_out is not None:
+                        f_out.write(id_line + "\t" + result_fields + "\n")
+            else:
+                result_cache.update(zip(seqs_to_align, result))
+                # reads whose sequences were aligned in this chunk are already counted in its summary
+                aligned_seqs = set(seqs_to_align)
+                for id_line, seq_line in chunk:
+                    result_fields, summary_fields = result_cache[seq_line]
+                    if summary is not None and seq_line not in aligned_seqs:
+                        summary.add_result_fields(summary_fields)
+                    if f_out is not None:
+                        f_out.write(id_line + "\t" + result_fields + "\n")
+
+        for chunk in read_chunks(read_fastq(f_in), args.chunk_size):
+            total_read_count += len(chunk)
+            wild_type_read_count += len([seq_line for id_line, seq_line in chunk if seq_line in wild_type_seqs])
+            triaged_fields = triage_seqs([seq_line for id_line, seq_line in chunk], [1] * len(chunk))
+            triaged_read_count += len([seq_line for id_line, seq_line in chunk if seq_line in triaged_fields])
+            if args.no_collapse:
+                seqs_to_align = [seq_line for id_line, seq_line in chunk if seq_line not in triaged_fields]
+            else:
+                result_cache.update(triaged_fields)
+                seqs_to_align = []
+                for id_line, seq_line in chunk:
+                    if seq_line not in result_cache:
+                        result_cache[seq_line] = None
+                        seqs_to_align.append(seq_line)
+            aligned_read_count += len([seq_line for seq_line in seqs_to_align if seq_line not in wild_type_seqs])
+            # each sequence aligned in this chunk is counted for every read of the chunk with that sequence
+            chunk_seq_counts = collections.Counter([seq_line for id_line, seq_line in chunk])
+            read_counts = [1 if args.no_collapse else chunk_seq_counts[seq_line] for seq_line in seqs_to_align]
+
+            if pool is not None:
+                result = pool.apply_async(_align_chunk, (seqs_to_align, read_counts))
+            else:
+                result = _align_chunk(seqs_to_align, read_counts)
+            pending.append((chunk, seqs_to_align, triaged_fields, result))
+
+            while len(pending) > max_pending_chunks:
+                write_chunk(*pending.popleft())
+                print('total read count: ' + str(total_read_count))
+
+        while len(pending) > 0:
+            write_chunk(*pending.popleft())
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    f_in.close()
+    if f_out is not None:
+        f_out.close()
+    if summary is not None:
+        with open(summary_file, 'wt') as f_summary:
+            summary.write(f_summary)
+    print('Aligned ' + str(aligned_read_count) + ' sequences from ' + str(total_read_count) + ' reads')
+    if sites is None:
+        print('Skipped alignment of ' + str(wild_type_read_count) + ' wild-type reads')
+    else:
+        num_site_pairs = len(sites) * (len(sites) - 1) // 2
+        num_aligned_site_pairs = min(args.candidate_pairs, num_site_pairs)
+        print('Aligned each sequence to ' + str(num_aligned_site_pairs) + ' of ' + str(num_site_pairs) + ' pairs of sites (pruned ' + str(aligned_read_count * (num_site_pairs - num_aligned_site_pairs)) + ' pair alignments)')
+    if primer_lookups is not None:
+        print('Primer classes: ' + ', '.join([primer_class + ': ' + str(primer_class_counts[primer_class]) for primer_class in PRIMER_CLASSES]))
+        print('Skipped alignment of ' + str(triaged_read_count) + ' reads with primers of the same sequence')
+    if f_out is not None:
+        print('Wrote ' + output_file)
+    if summary is not None:
+        print('Wrote summary to ' + summary_file)
+
+
+# primer classes of reads: the sequence whose left primer starts the read and the sequence whose right primer ends it
+PRIMER_CLASSES = ['AA', 'BB', 'AB', 'BA', 'unclassified']
+# primer classes of reads that are not aligned with --primer_triage
+TRIAGED_PRIMER_CLASSES = ['AA', 'BB']
+# the primer lookups hold every sequence within --primer_mismatches substitutions of each primer (about 3000 for a 20bp primer with 2 mismatches, but over a million with 4), so the number of mismatches is capped
+MAX_PRIMER_MISMATCHES = 2
+
+RESULT_HEADER = "breakpoints\tbreakpoint_count\tbreakpoint_cumulative_distance_from_cut\ttx_status\tread_aln\trefA_aln\trefB_aln"
+# with --compact_alignments, the alignment is written as its segments (see format_aln_segments)
+COMPACT_RESULT_HEADER = "breakpoints\tbreakpoint_count\tbreakpoint_cumulative_distance_from_cut\ttx_status\taln_segments"
+# with --config, refA and refB are the sites named in the first columns
+PANEL_RESULT_HEADER = "site_a\tsite_b\t" + RESULT_HEADER
+PANEL_COMPACT_RESULT_HEADER = "site_a\tsite_b\t" + COMPACT_RESULT_HEADER
+
+def read_fastq(f_in):
+    """
+    Iterates over the records in an open fastq file
+
+    params:
+        f_in: open file handle of the fastq
+
+    yields:
+        tuple of (id_line, seq_line) for each fastq record
+    """
     while (1):
         id_line   = f_in.readline().strip()
         seq_line  = f_in.readline().strip()
@@ -55,22 +333,527 @@ def main():
 
         if not qual_line : break
 
-        total_read_count+=1
-        print('total read count: ' + str(total_read_count))
-        if total_read_count % 1000 == 0:
-            print('total read count: ' + str(total_read_count))
+        yield id_line, seq_line
+
+def read_chunks(records, chunk_size):
+    """
+    Groups records into lists of chunk_size records
+
+    params:
+        records: iterable of records (e.g. from read_fastq)
+        chunk_size: number of records in each chunk (the last chunk may be smaller)
+
+    yields:
+        list of records
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+def read_site_config(config_file):
+    """
+    Reads the sites of a panel from a CRISPECTOR-style config.csv with SiteName, AmpliconReference and gRNA columns
+    The predicted cut site of each amplicon is 3bp from the PAM end of its gRNA, which may be on either strand of the amplicon
+
+    params:
+        config_file: path to the config.csv
+
+    returns:
+        list of tuples of (site name, amplicon sequence, cut position), with a cut position of None if the gRNA is not found in the amplicon
+    """
+    complement = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A'}
+    sites = []
+    with open(config_file, 'r', newline='') as f_config:
+        for row in csv.DictReader(f_config):
+            site_seq = row['AmpliconReference'].strip().upper()
+            guide_seq = row['gRNA'].strip().upper()
+            guide_seq_rc = "".join([complement.get(base, base) for base in reversed(guide_seq)])
+            cut_pos = None
+            if len(guide_seq) > 0 and guide_seq in site_seq:
+                cut_pos = site_seq.index(guide_seq) + len(guide_seq) - 3
+            elif len(guide_seq) > 0 and guide_seq_rc in site_seq:
+                cut_pos = site_seq.index(guide_seq_rc) + 3
+            sites.append((row['SiteName'], site_seq, cut_pos))
+    return sites
+
+def get_primers(seq, primer_length):
+    """
+    Returns the primers of a sequence (the bases at its start and end)
+
+    params:
+        seq: amplicon sequence
+        primer_length: number of bases at each end of the sequence
+
+    returns:
+        tuple of (left primer, right primer)
+    """
+    return seq[:primer_length], seq[-primer_length:]
+
+def get_primer_lookups(primers_a, primers_b, max_mismatches):
+    """
+    Builds lookups from the ends of reads to the sequence whose primer they match, including every sequence within max_mismatches substitutions of each primer
+
+    params:
+        primers_a: tuple of (left, right) primers of sequence a, as they appear at the start and end of reads
+        primers_b: tuple of (left, right) primers of sequence b
+        max_mismatches: number of mismatches allowed between a read end and a primer
+
+    returns:
+        tuple of (left_lookup, right_lookup), each a dict of primer length -> dict of read end -> 'A' or 'B'. Read ends that match primers of both sequences are not included
+    """
+    primer_lookups = ({}, {})
+    for ref_name, primers in [('A', primers_a), ('B', primers_b)]:
+        for primer_lookup, primer in zip(primer_lookups, primers):
+            end_lookup = primer_lookup.setdefault(len(primer), {})
+            for end_seq in _get_primer_variants(primer.upper(), max_mismatches):
+                if end_lookup.get(end_seq, ref_name) != ref_name:
+                    end_lookup[end_seq] = None
+                else:
+                    end_lookup[end_seq] = ref_name
+
+    for primer_lookup in primer_lookups:
+        for end_lookup in primer_lookup.values():
+            for end_seq in [end_seq for end_seq, ref_name in end_lookup.items() if ref_name is None]:
+                del end_lookup[end_seq]
+    return primer_lookups
+
+def _get_primer_variants(primer, max_mismatches):
+    """
+    Returns the set of sequences with at most max_mismatches substitutions (by another base or N) from a primer, each built once from its mismatch positions and bases
+    """
+    variants = set([primer])
+    for num_mismatches in range(1, max_mismatches+1):
+        for mismatch_positions in itertools.combinations(range(len(primer)), num_mismatches):
+            mismatch_bases = [[base for base in 'ACGTN' if base != primer[pos]] for pos in mismatch_positions]
+            for bases in itertools.product(*mismatch_bases):
+                variant = list(primer)
+                for pos, base in zip(mismatch_positions, bases):
+                    variant[pos] = base
+                variants.add(''.join(variant))
+    return variants
+
+def classify_read_primers(read_seq, left_lookup, right_lookup):
+    """
+    Classifies a read by the primers at its ends
+
+    params:
+        read_seq: read sequence
+        left_lookup: dict of primer length -> dict of read start -> sequence name (from get_primer_lookups)
+        right_lookup: dict of primer length -> dict of read end -> sequence name (from get_primer_lookups)
+
+    returns:
+        the names of the sequences whose primers start and end the read (e.g. 'AB' for a read starting with the left primer of sequence a and ending with the right primer of sequence b), or 'unclassified' if either end does not match a primer
+    """
+    read_seq = read_seq.upper()
+    left_name = None
+    for primer_length, end_lookup in left_lookup.items():
+        left_name = end_lookup.get(read_seq[:primer_length])
+        if left_name is not None:
+            break
+    right_name = None
+    for primer_length, end_lookup in right_lookup.items():
+        if primer_length <= len(read_seq):
+            right_name = end_lookup.get(read_seq[len(read_seq)-primer_length:])
+        if right_name is not None:
+            break
+    if left_name is None or right_name is None:
+        return 'unclassified'
+    return left_name + right_name
+
+def get_triaged_result_fields(read_seq, primer_class, ref1_cut_pos=None, ref2_cut_pos=None, compact_alignments=False):
+    """
+    Formats the result fields of a read that is not aligned because of its primers (see RESULT_HEADER)
+
+    params:
+        read_seq: read sequence
+        primer_class: primer class of the read (from classify_read_primers)
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
+        compact_alignments: format the fields of COMPACT_RESULT_HEADER (with no segments) instead
+
+    returns:
+        string of tab-separated result fields (without read identifier or newline)
+    """
+    tx_status = get_triaged_summary_fields(primer_class)[0]
+    breakpoint_cumulative_distance = 'NA'
+    if ref1_cut_pos is not None and ref2_cut_pos is not None:
+        breakpoint_cumulative_distance = '0'
+    if compact_alignments:
+        return "\t".join(['', '0', breakpoint_cumulative_distance, tx_status, ''])
+    return "\t".join(['', '0', breakpoint_cumulative_distance, tx_status, read_seq, '', ''])
+
+def get_triaged_summary_fields(primer_class):
+    """
+    Returns the fields of a read that is not aligned because of its primers that are counted in a summary (see get_summary_fields)
+
+    params:
+        primer_class: primer class of the read (from classify_read_primers)
+
+    returns:
+        tuple of the tx status of the read and its (empty) list of breakpoints
+    """
+    return 'Not aligned (primers ' + primer_class + ')', []
+
+# alignment parameters and prepared references for this process, set once by _init_worker so they aren't sent with every chunk
+_worker_aln_params = None
+
+# result fields of the wild-type sequences of this process, which are written without aligning them
+_worker_wild_type_fields = None
+
+def _get_ref_pair(aln_params):
+    return ChromBridGE_aln.ReferencePair(
+            aln_params['ref1_seq'],
+            aln_params['ref2_seq'],
+            match_score=aln_params['match_score'],
+            mismatch_score=aln_params['mismatch_score'],
+            gap_score=aln_params['gap_score'],
+            jump_score=aln_params['jump_score'],
+            cut_pos_jump_incentive_score=aln_params['cut_pos_jump_incentive_score'],
+            ref1_cut_pos=aln_params['ref1_cut_pos'],
+            ref2_cut_pos=aln_params['ref2_cut_pos'],
+            band_width=aln_params['band_width'],
+            x_drop=aln_params['x_drop'],
+            min_score=aln_params['min_score'])
+
+# alignment parameters of the pairs of sites of this process with --config, added as reads are aligned to them
+_worker_site_pair_params = None
+
+# parameters of the summaries of the chunks aligned by this process (see ChromBridGE_summary.BreakpointSummary), or None if results are not summarized
+_worker_summary_params = None
+
+# whether the result fields of the reads are formatted (they are not with --summary_only, so the alignment strings are never made)
+_worker_write_rows = True
+
+def _init_worker(aln_params, summary_params=None, write_rows=True):
+    global _worker_aln_params, _worker_wild_type_fields, _worker_site_pair_params, _worker_summary_params, _worker_write_rows
+    _worker_aln_params = dict(aln_params)
+    _worker_summary_params = summary_params
+    _worker_write_rows = write_rows
+    _worker_wild_type_fields = {}
+    if 'sites' in aln_params:
+        _worker_site_pair_params = {}
+        return
+    _worker_aln_params['ref_pair'] = _get_ref_pair(aln_params)
+    for wild_type_seq in get_wild_type_seqs(_worker_aln_params['ref_pair']):
+        aln_info = get_wild_type_aln_info(wild_type_seq, _worker_aln_params['ref_pair'])
+        _worker_wild_type_fields[wild_type_seq] = _get_read_result(wild_type_seq, _worker_aln_params, aln_info)
+
+def _get_read_result(read_seq, pair_params, aln_info, tx_info=None, site_names=None):
+    # returns the result fields of a read (None if rows are not written) and the fields counted in a summary (see get_summary_fields), both starting with the site names with --config
+    aln_info, tx_status = get_aln_tx_status(read_seq, aln_info=aln_info, tx_info=tx_info, **pair_params)
+    result_fields = None
+    if _worker_write_rows:
+        result_fields = format_result_fields(aln_info, tx_status, **pair_params)
+    summary_fields = get_summary_fields(aln_info, tx_status)
+    if site_names is not None:
+        if result_fields is not None:
+            result_fields = "\t".join(site_names) + "\t" + result_fields
+        summary_fields = site_names + summary_fields
+    return result_fields, summary_fields
+
+def _align_chunk(read_seqs, read_counts=None):
+    # returns the result of each sequence (see _get_read_result), and their summary (weighted by read_counts) if results are summarized
+    if 'sites' in _worker_aln_params:
+        chunk_result = []
+        for read_seq in read_seqs:
+            site_names, aln_result, tx_result, pair_params = align_panel_read(read_seq, site_pair_params=_worker_site_pair_params, **_worker_aln_params)
+            chunk_result.append(_get_read_result(read_seq, pair_params, aln_result, tx_result, site_names))
+    else:
+        # reads of the same length in the chunk are aligned together; wild-type reads are not aligned
+        # the alignments are kept as AlignmentResults, whose strings are only made if the row of the read is formatted
+        aln_results = iter(_worker_aln_params['ref_pair'].analyze_lanes([read_seq for read_seq in read_seqs if read_seq not in _worker_wild_type_fields]))
+        chunk_result = []
+        for read_seq in read_seqs:
+            if read_seq in _worker_wild_type_fields:
+                chunk_result.append(_worker_wild_type_fields[read_seq])
+            else:
+                aln_result, tx_result = next(aln_results)
+                chunk_result.append(_get_read_result(read_seq, _worker_aln_params, aln_result, tx_result))
+    chunk_summary = None
+    if _worker_summary_params is not None:
+        chunk_summary = ChromBridGE_summary.BreakpointSummary(*_worker_summary_params)
+        for (result_fields, summary_fields), read_count in zip(chunk_result, read_counts):
+            chunk_summary.add_result_fields(summary_fields, read_count)
+    return chunk_result, chunk_summary
+
+def _align_counted_chunk(chunk_args):
+    return _align_chunk(*chunk_args)
+
+def get_wild_type_aln_info(read_seq, ref_pair):
+    """
+    Returns the alignment of a read that is an exact copy of one of the references without running the alignment.
+    This alignment is only known in advance if every mismatch, gap and jump scores less than the matches it replaces (so the optimal alignment is the unique end-to-end match to the reference)
+
+    params:
+        read_seq: read to check
+        ref_pair: ChromBridGE_aln.ReferencePair with the references and alignment scores
+
+    returns:
+        dict with the same keys as ChromBridGE_aln.nw_breakpoint, or None if the alignment of the read is not known in advance
+    """
+    if len(read_seq) == 0 or \
+            (ref_pair.min_score is not None and len(read_seq) * ref_pair.match_score < ref_pair.min_score) or \
+            ref_pair.match_score <= 0 or \
+            ref_pair.mismatch_score >= ref_pair.match_score or \
+            ref_pair.gap_score >= 0 or \
+            ref_pair.perimeter_gap_extension_score > 0 or \
+            ref_pair.jump_score + 2 * max(ref_pair.cut_pos_jump_incentive_score, 0) >= 0:
+        return None
+
+    # ties between the references go to ref1, so a copy of ref2 must not also be found in ref1
+    if read_seq == ref_pair.ref1_seq:
+        read_path = [1]
+        ref1_aln = read_seq
+        ref2_aln = ' ' * len(read_seq)
+    elif read_seq == ref_pair.ref2_seq and read_seq not in ref_pair.ref1_seq:
+        read_path = [2]
+        ref1_aln = ' ' * len(read_seq)
+        ref2_aln = read_seq
+    else:
+        return None
+
+    return {
+            'read_aln': read_seq,
+            'ref1_aln': ref1_aln,
+            'ref2_aln': ref2_aln,
+            'breakpoints_read': [],
+            'breakpoints_ref1': [],
+            'breakpoints_ref2': [],
+            'aln_score': len(read_seq) * ref_pair.match_score,
+            'read_path': read_path,
+            }
+
+def get_wild_type_seqs(ref_pair):
+    """
+    Returns the references whose exact copies are not aligned (see get_wild_type_aln_info)
+
+    params:
+        ref_pair: ChromBridGE_aln.ReferencePair with the references and alignment scores
+
+    returns:
+        set of wild-type sequences
+    """
+    return set([ref_seq for ref_seq in [ref_pair.ref1_seq, ref_pair.ref2_seq] if get_wild_type_aln_info(ref_seq, ref_pair) is not None])
+
+def get_result_fields(read_seq, ref1_seq, ref2_seq, ref1_cut_pos=None, ref2_cut_pos=None, aln_info=None, tx_info=None, compact_alignments=False, **kwargs):
+    """
+    Aligns a read and formats the result as the tab-separated fields of an output row (see RESULT_HEADER, or COMPACT_RESULT_HEADER if compact_alignments)
+
+    params:
+        read_seq: read to align to the other two sequences
+        ref1_seq: first sequence to align to
+        ref2_seq: second sequence to align to
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
+        aln_info: alignment of the read already computed by ChromBridGE_aln. If given, the read is not aligned again
+        tx_info: translocation analysis of aln_info already computed by ChromBridGE_aln (e.g. by ReferencePair.analyze_lanes). If given, the alignment is not analyzed again
+        compact_alignments: write the alignment as its segments (see format_aln_segments) instead of the three alignment strings
+        kwargs: other parameters passed to analyze_read
+
+    returns:
+        string of tab-separated result fields (without read identifier or newline)
+    """
+    aln_info, tx_status = get_aln_tx_status(read_seq, ref1_seq, ref2_seq, ref1_cut_pos, ref2_cut_pos, aln_info=aln_info, tx_info=tx_info, **kwargs)
+    return format_result_fields(aln_info, tx_status, ref1_seq, ref2_seq, ref1_cut_pos, ref2_cut_pos, compact_alignments)
+
+def get_aln_tx_status(read_seq, ref1_seq, ref2_seq, ref1_cut_pos=None, ref2_cut_pos=None, aln_info=None, tx_info=None, compact_alignments=False, **kwargs):
+    """
+    Aligns a read (unless its alignment is given) and returns its alignment and tx status
+
+    params:
+        read_seq: read to align to the other two sequences
+        ref1_seq: first sequence to align to
+        ref2_seq: second sequence to align to
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
+        aln_info: alignment of the read already computed by ChromBridGE_aln. If given, the read is not aligned again
+        tx_info: translocation analysis of aln_info already computed by ChromBridGE_aln. If given, the alignment is not analyzed again
+        compact_alignments: not used (so that the parameters of get_result_fields can be passed)
+        kwargs: other parameters passed to analyze_read
+
+    returns:
+        tuple of:
+        aln_info: alignment of the read (see analyze_read)
+        tx_status: string with details for tx result
+    """
+    if tx_info is not None:
+        return aln_info, tx_info['tx_status']
+    if aln_info is not None and len(aln_info['read_path']) == 1 and ref1_cut_pos is not None and ref2_cut_pos is not None:
+        # the translocation analysis of an alignment without breakpoints always reports that no breakpoints were detected
+        return aln_info, 'No breakpoints detected'
+    aln_info, tx_info = analyze_read(read_seq, ref1_seq, ref2_seq,
+            ref1_cut_pos=ref1_cut_pos,
+            ref2_cut_pos=ref2_cut_pos,
+            aln_info=aln_info,
+            **kwargs)
+    return aln_info, tx_info['tx_status']
+
+def format_result_fields(aln_info, tx_status, ref1_seq, ref2_seq, ref1_cut_pos=None, ref2_cut_pos=None, compact_alignments=False, **kwargs):
+    """
+    Formats the alignment and tx status of a read as the tab-separated fields of an output row (see RESULT_HEADER, or COMPACT_RESULT_HEADER if compact_alignments)
+
+    params:
+        aln_info: alignment of the read (from get_aln_tx_status), as a dict or a ChromBridGE_aln.AlignmentResult (whose strings are only read if not compact_alignments)
+        tx_status: tx status of the read
+        ref1_seq: first sequence the read was aligned to
+        ref2_seq: second sequence the read was aligned to
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
+        compact_alignments: write the alignment as its segments (see format_aln_segments) instead of the three alignment strings
+        kwargs: not used (so that the alignment parameters of the read can be passed)
+
+    returns:
+        string of tab-separated result fields (without read identifier or newline)
+    """
+    breakpoints = list(zip(aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2']))
+    breakpoints_out = ";".join(["%d:%d:%d"%(bp_read, bp_ref1, bp_ref2) for (bp_read, bp_ref1, bp_ref2) in breakpoints])
+
+    breakpoint_cumulative_distance = 'NA'
+    if ref1_cut_pos is not None and ref2_cut_pos is not None:
+        breakpoint_cumulative_distance = str(sum([abs(bp_ref1 - ref1_cut_pos) + abs(bp_ref2 - ref2_cut_pos) for (bp_read, bp_ref1, bp_ref2) in breakpoints]))
+
+    if compact_alignments:
+        if isinstance(aln_info, ChromBridGE_aln.AlignmentResult):
+            # the segments are read from the operations of the alignment, so its strings are never made
+            aln_segments = aln_info.segments
+        else:
+            aln_segments = ChromBridGE_aln.get_aln_segments(aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln'],
+                    aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2'], aln_info['read_path'], ref1_seq, ref2_seq)
+        return "\t".join([breakpoints_out, str(len(breakpoints)), breakpoint_cumulative_distance, tx_status, format_aln_segments(aln_segments)])
+
+    return "\t".join([breakpoints_out, str(len(breakpoints)), breakpoint_cumulative_distance, tx_status,
+        aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln']])
+
+def get_summary_fields(aln_info, tx_status):
+    """
+    Returns the fields of a read that are counted in a summary (see ChromBridGE_summary.BreakpointSummary.add_result_fields)
+
+    params:
+        aln_info: alignment of the read (from get_aln_tx_status)
+        tx_status: tx status of the read
+
+    returns:
+        tuple of the tx status and the list of (read, ref1, ref2) breakpoints of the read
+    """
+    return tx_status, list(zip(aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2']))
+
+def format_aln_segments(aln_segments):
+    """
+    Formats the segments of an alignment for the aln_segments column of COMPACT_RESULT_HEADER, as the sequence (A for ref1 or B for ref2), start position in the sequence and CIGAR string of each segment, separated by semicolons (e.g. A:0:30M;B:25:35M)
+    Each segment after the first starts where the jump from the end of the previous segment lands
+
+    params:
+        aln_segments: list of tuples of (ref index, start position, CIGAR string) (from ChromBridGE_aln.get_aln_segments)
+
+    returns:
+        string of the segments (empty if the read was not aligned)
+    """
+    return ";".join(["%s:%d:%s"%('A' if ref_ind == 1 else 'B', ref_start, cigar) for (ref_ind, ref_start, cigar) in aln_segments])
 
-        aln_info = ChromBridGE_aln.nw_breakpoint(seq_line,args.sequence_a,args.sequence_b,
-                match_score=args.match_score,
-                mismatch_score=args.mismatch_score,
-                gap_score=args.gap_score,
-                jump_score=args.jump_score,
-                cut_pos_incentive_score=args.cut_pos_incentive_score,
-                ref1_cut_pos=args.seqA_cut_pos,
-                ref2_cut_pos=args.seqB_cut_pos)
+def decode_aln_segments(aln_segments_str, read_seq, ref1_seq, ref2_seq):
+    """
+    Rebuilds the read_aln, refA_aln and refB_aln columns of an alignment written with --compact_alignments (see format_aln_segments)
+
+    params:
+        aln_segments_str: aln_segments column of the read
+        read_seq: read sequence (from the read_seq column with --write_unique, or from the input fastq)
+        ref1_seq: first sequence the read was aligned to (sequence a, or the amplicon of site_a with --config)
+        ref2_seq: second sequence the read was aligned to
+
+    returns:
+        tuple of:
+        read_aln: aligned sequence of read
+        ref1_aln: sequence of ref1 aligned to read (spaces where the read is aligned to ref2)
+        ref2_aln: sequence of ref2 aligned to read (spaces where the read is aligned to ref1)
+        Reads that were not aligned are given as the read sequence and blank reference alignments
+    """
+    if aln_segments_str == '':
+        return read_seq, ' ' * len(read_seq), ' ' * len(read_seq)
+    read_aln = []
+    ref_alns = {'A': [], 'B': []}
+    ref_seqs = {'A': ref1_seq, 'B': ref2_seq}
+    read_pos = 0
+    for segment in aln_segments_str.split(';'):
+        ref_name, ref_pos, cigar = segment.split(':')
+        ref_aln, other_ref_aln = ref_alns[ref_name], ref_alns['B' if ref_name == 'A' else 'A']
+        ref_seq = ref_seqs[ref_name]
+        ref_pos = int(ref_pos)
+        for run_len, op in re.findall('([0-9]+)([MID])', cigar):
+            run_len = int(run_len)
+            if op == 'D':
+                read_aln.append('-' * run_len)
+            else:
+                read_aln.append(read_seq[read_pos:read_pos + run_len])
+                read_pos += run_len
+            if op == 'I':
+                ref_aln.append('-' * run_len)
+            else:
+                ref_aln.append(ref_seq[ref_pos:ref_pos + run_len])
+                ref_pos += run_len
+            other_ref_aln.append(' ' * run_len)
+    return ''.join(read_aln), ''.join(ref_alns['A']), ''.join(ref_alns['B'])
+
+def get_panel_result_fields(read_seq, sites, kmer_index, candidate_pairs=1, site_pair_params=None, **kwargs):
+    """
+    Aligns a read to the pairs of sites in a panel that share the most k-mers with its two halves, and formats the best alignment as the tab-separated fields of an output row (see PANEL_RESULT_HEADER)
 
-        f_out.write(id_line+"\t"+breakpoints_out+"\t"+str(breakpoints_count)+"\t"+breakpoint_cumulative_distance+"\t"+read_aln+"\t"+refA_aln+"\t"+refB_aln+"\n")
+    params:
+        read_seq: read to align
+        sites: list of tuples of (site name, amplicon sequence, cut position) (from read_site_config)
+        kmer_index: ChromBridGE_index.KmerIndex of the amplicons of the sites
+        candidate_pairs: number of pairs of sites to align the read to (ties in score go to the pair with more shared k-mers)
+        site_pair_params: dict of (site index, site index) -> alignment parameters of that pair of sites (including a prepared ReferencePair), added to as pairs are used so that it can be kept between reads
+        kwargs: other parameters passed to get_result_fields
 
+    returns:
+        string of tab-separated result fields (without read identifier or newline)
+    """
+    site_names, aln_result, tx_result, pair_params = align_panel_read(read_seq, sites, kmer_index, candidate_pairs, site_pair_params, **kwargs)
+    return "\t".join(site_names) + "\t" + get_result_fields(read_seq, aln_info=aln_result, tx_info=tx_result, **pair_params)
+
+def align_panel_read(read_seq, sites, kmer_index, candidate_pairs=1, site_pair_params=None, **kwargs):
+    """
+    Aligns a read to the pairs of sites in a panel that share the most k-mers with its two halves, and returns the best alignment and its translocation analysis (see get_panel_result_fields)
+
+    params:
+        read_seq: read to align
+        sites: list of tuples of (site name, amplicon sequence, cut position) (from read_site_config)
+        kmer_index: ChromBridGE_index.KmerIndex of the amplicons of the sites
+        candidate_pairs: number of pairs of sites to align the read to (ties in score go to the pair with more shared k-mers)
+        site_pair_params: dict of (site index, site index) -> alignment parameters of that pair of sites (including a prepared ReferencePair), added to as pairs are used so that it can be kept between reads
+        kwargs: other alignment parameters of the pairs of sites
+
+    returns:
+        tuple of:
+        site_names: tuple of the names of the two sites of the best alignment
+        aln_result: ChromBridGE_aln.AlignmentResult of the best alignment of the read
+        tx_result: ChromBridGE_aln.AlignmentTxResult of the best alignment at the cut positions of its sites
+        pair_params: alignment parameters of the two sites of the best alignment
+    """
+    if site_pair_params is None:
+        site_pair_params = {}
+    best_site_pair = None
+    best_aln_result = None
+    best_tx_result = None
+    for site_pair in kmer_index.get_candidate_pairs(read_seq, candidate_pairs):
+        if site_pair not in site_pair_params:
+            (site_name1, site_seq1, site_cut_pos1), (site_name2, site_seq2, site_cut_pos2) = sites[site_pair[0]], sites[site_pair[1]]
+            pair_params = dict(kwargs, ref1_seq=site_seq1, ref2_seq=site_seq2, ref1_cut_pos=site_cut_pos1, ref2_cut_pos=site_cut_pos2)
+            pair_params['ref_pair'] = _get_ref_pair(pair_params)
+            site_pair_params[site_pair] = pair_params
+        aln_result, tx_result = site_pair_params[site_pair]['ref_pair'].analyze_read(read_seq)
+        if best_aln_result is None or \
+                (aln_result.aln_score is not None and (best_aln_result.aln_score is None or aln_result.aln_score > best_aln_result.aln_score)):
+            best_site_pair = site_pair
+            best_aln_result = aln_result
+            best_tx_result = tx_result
+
+    return (sites[best_site_pair[0]][0], sites[best_site_pair[1]][0]), best_aln_result, best_tx_result, site_pair_params[best_site_pair]
 
 def analyze_read(read_seq, ref1_seq, ref2_seq,
                     ref1_cut_pos=None,
@@ -85,6 +868,11 @@ def analyze_read(read_seq, ref1_seq, ref2_seq,
                     min_num_bases_before_cut=4,
                     mismatch_tolerance=0,
                     gap_tolerance=0,
+                    band_width=0,
+                    x_drop=0,
+                    min_score=None,
+                    ref_pair=None,
+                    aln_info=None,
 		            debug=False):
     """
     Computes the optimal alignment of a read to two sequences, locating the optimal break between the two reads, refines the site of translocation by identifying sites with at least num_bases_to_check exact matches, and determines whether the sequences are compatible with a translocation event.
@@ -108,6 +896,11 @@ def analyze_read(read_seq, ref1_seq, ref2_seq,
         perimeter_gap_extension_score: score for adding a gap in the first/last column/row, corresponding to gaps at the beginning or ends of sequences
         jump_score: score for jumping between ref1 and ref2
         cut_pos_jump_incentive_score: score incentive for jumping at a predicted cut position
+        band_width: if greater than 0, first align within band_width diagonals of the expected alignment of each reference, and realign fully unless every alignment leaving the band scores less
+        x_drop: if greater than 0, alignments scoring more than x_drop below the best alignment at the same read position are not extended (faster, but the optimal alignment may be missed)
+        min_score: if not None, reads whose alignment scores less than min_score are not aligned (their aln_info has an empty read_path and an aln_score of None)
+        ref_pair: ChromBridGE_aln.ReferencePair prepared for ref1_seq and ref2_seq. If given, it is used for alignment (with its own alignment scores) instead of preparing the references for this read
+        aln_info: alignment of the read already computed by ChromBridGE_aln (e.g. by ReferencePair.align_lanes). If given, the read is not aligned again. Reads that are exact copies of a reference are not aligned either (see get_wild_type_aln_info)
         debug: print intermediate debug information
 
     returns:
@@ -119,8 +912,8 @@ def analyze_read(read_seq, ref1_seq, ref2_seq,
             breakpoints_read: indices in read of the breakpoints discovered
             breakpoints_ref1: indices in ref1 of breakpoints in the optimal alignment
             breakpoints_ref2: indices in ref2 of breakpoints in the optimal alignment
-            aln_score: score of alignment
-            read_path: index of ref that the read is aligned to, corresponding to the break points (there will be len(breakpoints)+1 items in read_path)
+            aln_score: score of alignment (None if it is below min_score)
+            read_path: index of ref that the read is aligned to, corresponding to the break points (there will be len(breakpoints)+1 items in read_path, or none if the alignment score is below min_score)
 
         tx_info: dict with keys:
             final_read_str: string of read alignment
@@ -143,23 +936,30 @@ def analyze_read(read_seq, ref1_seq, ref2_seq,
                 Ref:  AA      > left-distance is -2 because it was within the cut by 2bp
             tx_lucky_insertions: sum of the left- and right- distances if they extend beyond the cut. If the cut actually happened, these would be lucky insertions that happened to match the uncut reference sequence
     """
-    aln_info = ChromBridGE_aln.nw_breakpoint(
-                read_seq,
-                ref1_seq,
-                ref2_seq,
-                match_score=match_score,
-                mismatch_score=mismatch_score,
-                gap_score=gap_score,
-                perimeter_gap_extension_score=perimeter_gap_extension_score,
-                jump_score=jump_score,
-                cut_pos_jump_incentive_score=cut_pos_jump_incentive_score,
-                ref1_cut_pos = ref1_cut_pos,
-                ref2_cut_pos = ref2_cut_pos,
-                debug=debug
-    )
-
+    if aln_info is None:
+        if ref_pair is None:
+            ref_pair = ChromBridGE_aln.ReferencePair(
+                    ref1_seq,
+                    ref2_seq,
+                    match_score=match_score,
+                    mismatch_score=mismatch_score,
+                    gap_score=gap_score,
+                    perimeter_gap_extension_score=perimeter_gap_extension_score,
+                    jump_score=jump_score,
+                    cut_pos_jump_incentive_score=cut_pos_jump_incentive_score,
+                    ref1_cut_pos = ref1_cut_pos,
+                    ref2_cut_pos = ref2_cut_pos,
+                    band_width = band_width,
+                    x_drop = x_drop,
+                    min_score = min_score,
+            )
+        if not debug:
+            aln_info = get_wild_type_aln_info(read_seq, ref_pair)
+        if aln_info is None:
+            aln_info = ref_pair.align(read_seq, debug=debug)
 
-    tx_info = ChromBridGE_tx.analyze_tx_alignment(
+    # the compiled translocation analysis gives the same result as ChromBridGE_tx.analyze_tx_alignment
+    tx_info = ChromBridGE_aln.analyze_tx_alignment(
             read_aln_str=aln_info['read_aln'],
             ref1_aln_str=aln_info['ref1_aln'],
             ref2_aln_str=aln_info['ref2_aln'],
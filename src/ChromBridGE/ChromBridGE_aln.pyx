@@ -1,7 +1,14 @@
 import numpy as np
 import cython
+import os
+from cython.parallel import prange, parallel
+from libc.stdlib cimport malloc, calloc, realloc, free, abs
+from libc.string cimport memcpy, memset
+from libc.limits cimport INT_MAX, INT_MIN, SHRT_MAX
+from cpython.unicode cimport PyUnicode_DecodeUTF8
+from cpython.buffer cimport PyBUF_WRITABLE
 
-cdef int mymax4(int s1, int s2, int s3, int s4):
+cdef int mymax4(int s1, int s2, int s3, int s4) noexcept nogil:
     cdef int mymax = s1
     if s2 > mymax:
         mymax = s2
@@ -11,10 +18,4270 @@ cdef int mymax4(int s1, int s2, int s3, int s4):
         mymax = s4
     return mymax
 
+cdef enum:
+    pointer_match = 1
+    pointer_gap_read = 2 #move from left
+    pointer_gap_ref = 3 #move from up
+    pointer_jump = 4
+
+#pointer tables are packed 4 cells per byte, each cell holding its pointer minus 1 in 2 bits
+cdef inline size_t _packed_size(size_t cells) noexcept nogil:
+    """
+    Returns the number of bytes needed for a packed pointer table of cells cells
+    """
+    return (cells + 3) >> 2
+
+
+cdef inline char _get_pointer(const unsigned char* pointers, Py_ssize_t idx) noexcept nogil:
+    """
+    Returns the pointer of cell idx of a packed pointer table
+    """
+    return ((pointers[idx >> 2] >> ((idx & 3) << 1)) & 3) + 1
+
+
+cdef inline void _set_pointer(unsigned char* pointers, Py_ssize_t idx, char pointer) noexcept nogil:
+    """
+    Sets the pointer of cell idx of a packed pointer table
+    """
+    cdef int shift = (idx & 3) << 1
+    pointers[idx >> 2] = (pointers[idx >> 2] & ~(3 << shift)) | ((pointer - 1) << shift)
+
+
+cdef inline void _pack_pointers(unsigned char* pointers, Py_ssize_t idx, const char* pointer_col, Py_ssize_t num_cells) noexcept nogil:
+    """
+    Sets the pointers of num_cells consecutive cells of a packed pointer table starting at cell idx from pointer_col, writing whole bytes where possible
+    """
+    cdef Py_ssize_t i = 0
+    while i < num_cells and (idx + i) & 3:
+        _set_pointer(pointers, idx + i, pointer_col[i])
+        i += 1
+    while i + 4 <= num_cells:
+        pointers[(idx + i) >> 2] = (pointer_col[i] - 1) | ((pointer_col[i+1] - 1) << 2) | \
+                ((pointer_col[i+2] - 1) << 4) | ((pointer_col[i+3] - 1) << 6)
+        i += 4
+    while i < num_cells:
+        _set_pointer(pointers, idx + i, pointer_col[i])
+        i += 1
+
+#jump source score used to disable jumps, low enough that a jump never wins but far from overflowing when scores are added
+cdef int no_jump_score = -(1 << 29)
+cdef long long no_band_gain = -(<long long> 1 << 60) #no entry or exit (see _band_alignment_may_differ)
+
+#type of the cells of score tables: short when every score of an alignment fits in 16 bits (see _fits_short_scores), which halves the memory read and written while filling the tables and doubles the cells per vector register
+ctypedef fused score_t:
+    short
+    int
+
+cdef struct ScoreParams:
+    int match_score
+    int mismatch_score
+    int gap_score
+    int perimeter_gap_extension_score
+    int jump_score
+
+cdef struct RefInfo:
+    const unsigned char* seq
+    int len
+    const int* jump_incentive #jump incentive for each row (len+1 values)
+    const short* jump_incentive16 #jump_incentive as shorts, used when filling short score tables
+    int prefer_cut_idx #if above/lower than this idx prefer match/mismatch over jump. If below/greater than this idx prefer jump over match/mismatch
+    int cut_pos #position of predicted cut site, or -1 if not given
+    const int* profile #match/mismatch score of each row for each read base code ((len+1) values per code)
+    const short* profile16 #profile as shorts, used when filling short score tables
+    const unsigned char* profile_code #code of each read base in profile (256 values)
+
+cdef struct ScoreOnlyResult:
+    int aln_score #score of the optimal alignment
+    int aln_ref #reference the optimal alignment ends in
+    bint has_jump #whether the optimal alignment jumps between references
+    int single_ref_score #score of the best alignment to a single reference without jumps
+
+cdef struct Band:
+    #cells with diag_lo <= idx_ref - idx_read <= diag_hi or row_lo <= idx_ref <= row_hi are filled
+    int diag_lo
+    int diag_hi
+    int row_lo
+    int row_hi #less than row_lo if no rows are filled in every column
+
+cdef struct BandGains:
+    #most that an alignment can add between unfilled cells (see _band_alignment_may_differ)
+    int step #for each read base
+    int gap_up_cost #at least this less than step for each gap in the reference
+    int gap_left_cost #at least this less than step for each gap in the read
+    int jump_cost #at least this less than step for each jump
+
+cdef struct BandExits:
+    #exits from the unfilled cells of one reference in the columns swept so far, plus BandGains.step for each read base before them (see _add_band_exit)
+    Py_ssize_t num_diags
+    int diag_offset #index of diagonal 0 (diagonals are idx_ref - idx_read)
+    long long* down_tree #Fenwick tree of the best exit by reversed diagonal, less gap_up_cost per diagonal (for entries on lower diagonals)
+    long long* left_tree #Fenwick tree of the best exit by diagonal, plus gap_left_cost per diagonal (for entries on higher diagonals), allocated with down_tree
+    long long best_cell #best exit from a cell (on any diagonal)
+    long long best_jump #best exit by jumping from any unfilled cell
+
+cdef struct ScoreBound:
+    #bounds the final alignment score from the best cell of a column (see _init_score_bound)
+    int min_score #alignments that cannot reach this score are aborted (INT_MIN for no minimum)
+    int column_gain #most that the score can increase for each read base
+    int ref_gain #most that the score can increase through gaps in the reference over the whole alignment
+    int min_incentive1 #lowest jump incentive of ref1 (colmaxes include the jump incentive)
+    int min_incentive2 #lowest jump incentive of ref2
+
+cdef struct TracebackResult:
+    int aln_score
+    int aln_len
+    int num_breakpoints
+    char* read_aln
+    char* ref1_aln
+    char* ref2_aln
+    int* breakpoints_read
+    int* breakpoints_ref1
+    int* breakpoints_ref2
+    int* read_path #num_breakpoints+1 values
+
+cdef struct PanelTracebackResult:
+    int aln_score
+    int aln_len
+    int num_breakpoints
+    int num_refs
+    char* read_aln
+    char* ref_alns #aln_len values for each reference
+    int* breakpoints_read
+    int* breakpoints_ref_from
+    int* breakpoints_ref_to
+    int* read_path #num_breakpoints+1 values
+
+
+cdef inline int _perimeter_score(int idx, const ScoreParams* params) noexcept nogil:
+    """
+    Score of the cell idx along the first row or column
+    """
+    if idx == 1:
+        #this hack keeps references from sliding all the way to the end
+        return params.gap_score
+    return idx * params.perimeter_gap_extension_score
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _fill_perimeter(int len_read, int len_ref, const ScoreParams* params,
+        score_t* score, unsigned char* pointer, int* colmaxes, int* colmaxesInd) noexcept nogil:
+    """
+    Initializes the first row and column of a (len_ref+1) x (len_read+1) score and packed pointer table, and the colmaxes for each column
+    Tables are stored column-major (cell idx_read*(len_ref+1) + idx_ref), so that the rows of a column, which are filled one after the other, are contiguous
+    """
+    cdef int idx_read, idx_ref
+    cdef Py_ssize_t rows = len_ref + 1
+    for idx_ref in range(rows):
+        score[idx_ref] = _perimeter_score(idx_ref, params)
+        _set_pointer(pointer, idx_ref, pointer_gap_ref)
+    for idx_read in range(len_read+1):
+        score[idx_read*rows] = _perimeter_score(idx_read, params)
+        _set_pointer(pointer, idx_read*rows, pointer_gap_read)
+
+    #keep track of where the maximum is for jumping
+    #colmaxesInd keep track of the index (row) which had the max value
+    for idx_read in range(len_read+1):
+        colmaxes[idx_read] = score[idx_read*rows]
+        colmaxesInd[idx_read] = 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _fill_column(int idx_read, unsigned char read_base, int len_read,
+        const RefInfo* ref, int first_row, int last_row, const ScoreParams* params, int jump_source_score,
+        const int* prev_score, int* score, unsigned char* pointer, Py_ssize_t pointer_offset,
+        const char* prev_jumped, char* jumped,
+        int* colmax, int* colmaxInd) noexcept nogil:
+    """
+    Fills rows first_row to last_row (inclusive, at least 1) of column idx_read for one reference
+    prev_score and score are the previous and this column, and score[0] must already be set.
+    jump_source_score is the column max of the other reference in the previous column, used as the source for jumps (no_jump_score to disable jumps)
+    pointer is a packed pointer table filled if it is not NULL, with row 0 of the column at cell pointer_offset
+    jumped is filled if it is not NULL, with whether the optimal path to each cell contains a jump (jumped[0] must already be set)
+    colmax and colmaxInd must be initialized to the row 0 value and are updated with the max of this column (plus the jump incentive) and its row
+    """
+    cdef int idx_ref
+    cdef int len_ref = ref.len
+    cdef int this_match_or_mismatch_score, this_match_score, this_gap_up_score, this_gap_left_score, this_read_gap_score, this_ref_gap_score, this_jump_score, tmax, tmax_plus_jump
+    cdef char this_pointer
+
+    for idx_ref in range(first_row,last_row+1):
+        this_match_or_mismatch_score = params.mismatch_score #keep this separate for the jump score below
+        if read_base == ref.seq[idx_ref-1]:
+            this_match_or_mismatch_score = params.match_score
+        this_match_score = prev_score[idx_ref-1] + this_match_or_mismatch_score
+
+        this_gap_up_score = params.gap_score
+        if idx_read == len_read: #if the last column, no gap penalty
+            this_gap_up_score = params.perimeter_gap_extension_score
+            if idx_ref == len_ref:#except for the bottom right cell with full penalty to shift alignments to the middle
+                this_gap_up_score = params.gap_score
+
+        this_gap_left_score = params.gap_score
+        if idx_ref == len_ref: #if the last row, no gap penalty
+            this_gap_left_score = params.perimeter_gap_extension_score
+            if idx_read == len_read:
+                this_gap_left_score = params.gap_score
+
+        this_read_gap_score = prev_score[idx_ref] + this_gap_left_score
+        this_ref_gap_score = score[idx_ref-1] + this_gap_up_score
+        #technically, a 'jump' is a 'jump and consume' so it's two steps, but because you would never have two jumps in a row, we can consume a base from the read sequence and do two steps (jump and consume) in one step based on the max values from the last column
+        this_jump_score = jump_source_score + params.jump_score + ref.jump_incentive[idx_ref-1] + this_match_or_mismatch_score
+
+        tmax = mymax4(this_match_score,this_ref_gap_score,this_read_gap_score,this_jump_score)
+
+        if idx_ref < ref.prefer_cut_idx:
+            # prefer jump over match/mismatch if above
+            if this_jump_score == tmax:
+                this_pointer = pointer_jump
+            elif this_match_score == tmax:
+                this_pointer = pointer_match
+            elif this_ref_gap_score == tmax:
+                this_pointer = pointer_gap_ref
+            else:
+                this_pointer = pointer_gap_read
+        else:
+            # prefer match/mismatch/gap if below
+            if this_match_score == tmax:
+                this_pointer = pointer_match
+            elif this_ref_gap_score == tmax:
+                this_pointer = pointer_gap_ref
+            elif this_read_gap_score == tmax:
+                this_pointer = pointer_gap_read
+            else:
+                this_pointer = pointer_jump
+
+        score[idx_ref] = tmax
+        if pointer != NULL:
+            _set_pointer(pointer, pointer_offset + idx_ref, this_pointer)
+        if jumped != NULL:
+            if this_pointer == pointer_jump:
+                jumped[idx_ref] = 1
+            elif this_pointer == pointer_match:
+                jumped[idx_ref] = prev_jumped[idx_ref-1]
+            elif this_pointer == pointer_gap_ref:
+                jumped[idx_ref] = jumped[idx_ref-1]
+            else:
+                jumped[idx_ref] = prev_jumped[idx_ref]
+
+        tmax_plus_jump = tmax + ref.jump_incentive[idx_ref]
+        if tmax_plus_jump > colmax[0]:
+            colmax[0] = tmax_plus_jump
+            colmaxInd[0] = idx_ref
+
+
+cdef inline char _choose_pointer(int this_score, int this_match_score, int this_ref_gap_score, int this_read_gap_score,
+        int this_jump_score, bint prefer_jump) noexcept nogil:
+    """
+    Returns the pointer for a cell with score this_score, with the same preferences as _fill_column
+    """
+    if prefer_jump:
+        return pointer_jump if this_jump_score == this_score else (
+                pointer_match if this_match_score == this_score else (
+                pointer_gap_ref if this_ref_gap_score == this_score else pointer_gap_read))
+    return pointer_match if this_match_score == this_score else (
+            pointer_gap_ref if this_ref_gap_score == this_score else (
+            pointer_gap_read if this_read_gap_score == this_score else pointer_jump))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_column_vec(int idx_read, unsigned char read_base, int len_read,
+        const RefInfo* ref, const ScoreParams* params, int jump_source_score,
+        const score_t* prev_score, score_t* score, char* pointer, int* colmax, int* colmaxInd) noexcept nogil:
+    """
+    Fills column idx_read for one reference like _fill_column (with the same scores, pointers and colmax), for columns stored contiguously
+    The column is computed in passes that the compiler can vectorize: the best of the match, gap in read and jump scores for every row, the gaps in the reference down the column, the pointers, and the column max
+    prev_score and score are the previous and this column, and score[0] must already be set. pointer is filled (contiguously) if it is not NULL
+    Columns of shorts are computed in shorts, so every score of the alignment (and jump_source_score) must fit (see _fits_short_scores)
+    """
+    cdef int idx_ref, col_max, col_max_idx
+    cdef score_t this_match_score, this_read_gap_score, this_ref_gap_score, this_jump_score, this_score
+    cdef int len_ref = ref.len
+    cdef const score_t* match_scores
+    cdef const score_t* jump_incentive
+    cdef score_t jump_base_score = jump_source_score + params.jump_score
+    cdef score_t gap_left_score = params.gap_score
+    cdef score_t last_gap_left_score = params.perimeter_gap_extension_score #no gap penalty in the last row...
+    cdef score_t gap_up_score = params.gap_score
+    cdef score_t last_gap_up_score = params.gap_score
+    cdef int prefer_cut_idx = ref.prefer_cut_idx
+    if score_t is short:
+        match_scores = ref.profile16 + <size_t> ref.profile_code[read_base] * (len_ref+1)
+        jump_incentive = ref.jump_incentive16
+    else:
+        match_scores = ref.profile + <size_t> ref.profile_code[read_base] * (len_ref+1)
+        jump_incentive = ref.jump_incentive
+    if idx_read == len_read:
+        last_gap_left_score = params.gap_score #...except for the bottom right cell with full penalty to shift alignments to the middle
+        gap_up_score = params.perimeter_gap_extension_score #no gap penalty in the last column (except for the bottom right cell)
+    if len_ref == 0:
+        return
+
+    #best of match/mismatch, gap in read, and jump
+    for idx_ref in range(1,len_ref+1):
+        this_match_score = prev_score[idx_ref-1] + match_scores[idx_ref]
+        this_read_gap_score = prev_score[idx_ref] + gap_left_score
+        this_jump_score = jump_base_score + jump_incentive[idx_ref-1] + match_scores[idx_ref]
+        this_score = this_match_score if this_match_score > this_read_gap_score else this_read_gap_score
+        score[idx_ref] = this_score if this_score > this_jump_score else this_jump_score
+    this_read_gap_score = prev_score[len_ref] + last_gap_left_score
+    this_score = prev_score[len_ref-1] + match_scores[len_ref]
+    if this_read_gap_score > this_score:
+        this_score = this_read_gap_score
+    this_jump_score = jump_base_score + jump_incentive[len_ref-1] + match_scores[len_ref]
+    score[len_ref] = this_score if this_score > this_jump_score else this_jump_score
+
+    #gaps in the reference depend on the cell above, so they are added down the column
+    for idx_ref in range(1,len_ref):
+        this_ref_gap_score = score[idx_ref-1] + gap_up_score
+        if this_ref_gap_score > score[idx_ref]:
+            score[idx_ref] = this_ref_gap_score
+    this_ref_gap_score = score[len_ref-1] + last_gap_up_score
+    if this_ref_gap_score > score[len_ref]:
+        score[len_ref] = this_ref_gap_score
+
+    if pointer != NULL:
+        # prefer jump over match/mismatch if above the cut
+        for idx_ref in range(1,min(prefer_cut_idx, len_ref)):
+            pointer[idx_ref] = _choose_pointer(score[idx_ref], prev_score[idx_ref-1] + match_scores[idx_ref],
+                    score[idx_ref-1] + gap_up_score, prev_score[idx_ref] + gap_left_score,
+                    jump_base_score + jump_incentive[idx_ref-1] + match_scores[idx_ref], True)
+        # prefer match/mismatch/gap if below
+        for idx_ref in range(max(prefer_cut_idx, 1),len_ref):
+            pointer[idx_ref] = _choose_pointer(score[idx_ref], prev_score[idx_ref-1] + match_scores[idx_ref],
+                    score[idx_ref-1] + gap_up_score, prev_score[idx_ref] + gap_left_score,
+                    jump_base_score + jump_incentive[idx_ref-1] + match_scores[idx_ref], False)
+        pointer[len_ref] = _choose_pointer(score[len_ref], prev_score[len_ref-1] + match_scores[len_ref],
+                score[len_ref-1] + last_gap_up_score, prev_score[len_ref] + last_gap_left_score,
+                jump_base_score + jump_incentive[len_ref-1] + match_scores[len_ref], len_ref < prefer_cut_idx)
+
+    #the first row with the highest score (plus the jump incentive) is the jump source for the next column
+    col_max = score[1] + jump_incentive[1]
+    for idx_ref in range(2,len_ref+1):
+        this_score = score[idx_ref] + jump_incentive[idx_ref]
+        col_max = this_score if this_score > col_max else col_max
+    if col_max > colmax[0]:
+        col_max_idx = 1
+        while score[col_max_idx] + jump_incentive[col_max_idx] != col_max:
+            col_max_idx += 1
+        colmax[0] = col_max
+        colmaxInd[0] = col_max_idx
+
+
+cdef inline bint _in_band(int idx_ref, int idx_read, const Band* band) noexcept nogil:
+    return (band.diag_lo <= idx_ref - idx_read <= band.diag_hi) or (band.row_lo <= idx_ref <= band.row_hi)
+
+
+cdef int _get_band_rows(int idx_read, int len_ref, const Band* band, int* first_rows, int* last_rows) noexcept nogil:
+    """
+    Sets the first and last rows (ordered by row) of the runs of cells in column idx_read inside the band
+
+    returns:
+        the number of runs (1 or 2)
+    """
+    cdef int diag_first = idx_read + band.diag_lo
+    cdef int diag_last = idx_read + band.diag_hi
+    cdef int num_runs = 1
+    if diag_first < 1:
+        diag_first = 1
+    if diag_last > len_ref:
+        diag_last = len_ref
+    first_rows[0] = diag_first
+    last_rows[0] = diag_last
+    if band.row_lo > band.row_hi:
+        return num_runs
+    if band.row_hi + 1 < diag_first:
+        first_rows[0] = band.row_lo
+        last_rows[0] = band.row_hi
+        first_rows[1] = diag_first
+        last_rows[1] = diag_last
+        num_runs = 2
+    elif band.row_lo > diag_last + 1:
+        first_rows[1] = band.row_lo
+        last_rows[1] = band.row_hi
+        num_runs = 2
+    else:
+        if band.row_lo < first_rows[0]:
+            first_rows[0] = band.row_lo
+        if band.row_hi > last_rows[0]:
+            last_rows[0] = band.row_hi
+    return num_runs
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_band_column(int idx_read, unsigned char read_base, int len_read,
+        const RefInfo* ref, const Band* band, const ScoreParams* params, int jump_source_score,
+        int* score, unsigned char* pointer, int* colmaxes, int* colmaxesInd) noexcept nogil:
+    """
+    Fills the cells of column idx_read inside the band in the full (column-major) score and pointer tables of one reference
+    The cells just outside of the band are set to no_jump_score so that they are never chosen by cells in the band
+    """
+    cdef Py_ssize_t rows = ref.len + 1
+    cdef int* curr = score + idx_read*rows
+    cdef int first_rows[2]
+    cdef int last_rows[2]
+    cdef int num_runs, run
+    num_runs = _get_band_rows(idx_read, ref.len, band, first_rows, last_rows)
+    for run in range(num_runs):
+        if first_rows[run] > 1:
+            curr[first_rows[run]-1] = no_jump_score
+        if last_rows[run] < ref.len:
+            curr[last_rows[run]+1] = no_jump_score
+        _fill_column(idx_read, read_base, len_read, ref, first_rows[run], last_rows[run], params, jump_source_score,
+                curr - rows, curr, pointer, idx_read*rows, NULL, NULL,
+                &colmaxes[idx_read], &colmaxesInd[idx_read])
+
+
+cdef void _init_score_bound(const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params, int min_score, ScoreBound* bound) noexcept nogil:
+    """
+    Sets the parameters for bounding the final alignment score from the best cell of a column
+    Each read base adds at most the best of the match, mismatch and gap scores, or a jump followed by a match (with the largest jump incentives of both references). Gaps in the reference add at most the best gap score for each base of the longer reference
+    """
+    cdef int idx_ref
+    cdef int max_incentive1 = ref1.jump_incentive[0]
+    cdef int max_incentive2 = ref2.jump_incentive[0]
+    cdef int best_step_score = mymax4(params.match_score, params.mismatch_score, params.gap_score, params.perimeter_gap_extension_score)
+    cdef int best_gap_score = mymax4(params.gap_score, params.perimeter_gap_extension_score, 0, 0)
+    bound.min_score = min_score
+    bound.min_incentive1 = ref1.jump_incentive[0]
+    bound.min_incentive2 = ref2.jump_incentive[0]
+    for idx_ref in range(1,ref1.len+1):
+        max_incentive1 = max(max_incentive1, ref1.jump_incentive[idx_ref])
+        bound.min_incentive1 = min(bound.min_incentive1, ref1.jump_incentive[idx_ref])
+    for idx_ref in range(1,ref2.len+1):
+        max_incentive2 = max(max_incentive2, ref2.jump_incentive[idx_ref])
+        bound.min_incentive2 = min(bound.min_incentive2, ref2.jump_incentive[idx_ref])
+    bound.column_gain = max(best_step_score, params.jump_score + max_incentive1 + max_incentive2 + max(params.match_score, params.mismatch_score))
+    bound.ref_gain = best_gap_score * max(ref1.len, ref2.len)
+
+
+cdef bint _fits_short_scores(int len_read, const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params) noexcept nogil:
+    """
+    Returns whether every score (and colmax) of aligning a read of length len_read to ref1 and ref2 fits in a short
+    Every score is the score of a path of at most len_read + len_ref steps, each adding at most the largest match, mismatch or gap score (in absolute value), with at most one jump (and jump incentive) per read base
+    """
+    cdef int idx_ref
+    cdef long long step_score = mymax4(abs(params.match_score), abs(params.mismatch_score), abs(params.gap_score), abs(params.perimeter_gap_extension_score))
+    cdef long long max_incentive = 0
+    cdef long long max_score
+    for idx_ref in range(ref1.len+1):
+        max_incentive = max(max_incentive, abs(ref1.jump_incentive[idx_ref]))
+    for idx_ref in range(ref2.len+1):
+        max_incentive = max(max_incentive, abs(ref2.jump_incentive[idx_ref]))
+    #one more step, jump and incentive than any path, for the jump source scores computed from the colmaxes
+    max_score = (len_read + max(ref1.len, ref2.len) + 1) * step_score + (len_read + 1) * (abs(params.jump_score) + max_incentive) + max_incentive
+    return max_score <= SHRT_MAX
+
+
+cdef inline bint _cannot_reach_min_score(const ScoreBound* bound, int max_score, int idx_read, int len_read) noexcept nogil:
+    """
+    Returns whether no alignment through column idx_read, whose best cell scores max_score, can reach bound.min_score
+    """
+    return bound.min_score > INT_MIN and \
+            <long long> max_score + <long long> (len_read - idx_read) * bound.column_gain + bound.ref_gain < bound.min_score
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bint _fill_tables_full(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params,
+        const ScoreBound* bound, char* pointer_col,
+        score_t* score1, unsigned char* pointer1, int* colmaxes1, int* colmaxesInd1,
+        score_t* score2, unsigned char* pointer2, int* colmaxes2, int* colmaxesInd2) noexcept nogil:
+    """
+    Fills the whole score and pointer tables for both references, one read column at a time
+    The tables are column-major, so each column of scores is filled in place with _fill_column_vec, and its pointers are packed into the table afterwards
+    pointer_col must have room for max(ref1.len, ref2.len)+1 values
+    The tables can hold shorts if every score of the alignment fits (see _fits_short_scores)
+
+    returns:
+        False if the tables were not finished because the alignment cannot reach bound.min_score
+    """
+    cdef Py_ssize_t rows1 = ref1.len + 1
+    cdef Py_ssize_t rows2 = ref2.len + 1
+    cdef score_t* curr1
+    cdef score_t* curr2
+    cdef int idx_read
+    _fill_perimeter(len_read, ref1.len, params, score1, pointer1, colmaxes1, colmaxesInd1)
+    _fill_perimeter(len_read, ref2.len, params, score2, pointer2, colmaxes2, colmaxesInd2)
+    for idx_read in range(1,len_read+1):
+        curr1 = score1 + idx_read*rows1
+        _fill_column_vec(idx_read, read_seq[idx_read-1], len_read, ref1, params, colmaxes2[idx_read-1],
+                curr1 - rows1, curr1, pointer_col, &colmaxes1[idx_read], &colmaxesInd1[idx_read])
+        _pack_pointers(pointer1, idx_read*rows1 + 1, pointer_col + 1, rows1 - 1)
+
+        curr2 = score2 + idx_read*rows2
+        _fill_column_vec(idx_read, read_seq[idx_read-1], len_read, ref2, params, colmaxes1[idx_read-1],
+                curr2 - rows2, curr2, pointer_col, &colmaxes2[idx_read], &colmaxesInd2[idx_read])
+        _pack_pointers(pointer2, idx_read*rows2 + 1, pointer_col + 1, rows2 - 1)
+
+        if _cannot_reach_min_score(bound, max(colmaxes1[idx_read] - bound.min_incentive1, colmaxes2[idx_read] - bound.min_incentive2), idx_read, len_read):
+            return False
+    return True
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_xdrop_column(int idx_read, unsigned char read_base, int len_read,
+        const RefInfo* ref, const ScoreParams* params, int jump_source_score, int max_jump_score, int threshold,
+        int prev_filled_first, int prev_filled_last, int live_first, int live_last,
+        int* score, unsigned char* pointer, int* colmax, int* colmaxInd, int* filled_first, int* filled_last) noexcept nogil:
+    """
+    Fills the cells of column idx_read that can be reached from the cells kept in the previous column (rows live_first to live_last) in the full (column-major) score and pointer tables of one reference (see _fill_tables_xdrop)
+    The whole column is filled if a jump could score at least threshold (jump_source_score + max_jump_score is the best possible jump score). Otherwise the rows from live_first to live_last+1 are filled, and then the rows below them while gaps in the reference score at least threshold. The last row is always filled
+    Cells read from the previous column outside of its filled rows (prev_filled_first to prev_filled_last) are set to no_jump_score first, as are the cells just outside of the filled rows of this column, so that they are never chosen
+    filled_first and filled_last are set to the rows filled (other than the last row), or to len_ref+1 and len_ref-1 if none were
+    """
+    cdef int len_ref = ref.len
+    cdef Py_ssize_t rows = len_ref + 1
+    cdef int* prev = score + (idx_read-1)*rows
+    cdef int* curr = score + idx_read*rows
+    cdef int first_row, last_row, idx_ref
+    cdef int gap_up_score = params.gap_score
+    if idx_read == len_read:
+        gap_up_score = params.perimeter_gap_extension_score
+    if jump_source_score + max_jump_score >= threshold:
+        first_row = 1
+        last_row = len_ref - 1
+    else:
+        first_row = max(live_first, 1)
+        last_row = min(live_last + 1, len_ref - 1)
+
+    if first_row <= last_row:
+        for idx_ref in range(max(first_row - 1, 1), last_row + 1):
+            if idx_ref < prev_filled_first - 1 or idx_ref > prev_filled_last + 1:
+                prev[idx_ref] = no_jump_score
+        if first_row > 1:
+            curr[first_row-1] = no_jump_score
+        _fill_column(idx_read, read_base, len_read, ref, first_row, last_row, params, jump_source_score,
+                prev, curr, pointer, idx_read*rows, NULL, NULL, colmax, colmaxInd)
+        while last_row < len_ref - 1 and curr[last_row] + gap_up_score >= threshold:
+            last_row += 1
+            if last_row < prev_filled_first - 1 or last_row > prev_filled_last + 1:
+                prev[last_row] = no_jump_score
+            _fill_column(idx_read, read_base, len_read, ref, last_row, last_row, params, jump_source_score,
+                    prev, curr, pointer, idx_read*rows, NULL, NULL, colmax, colmaxInd)
+        if last_row + 1 < len_ref:
+            curr[last_row+1] = no_jump_score
+        filled_first[0] = first_row
+        filled_last[0] = last_row
+    else:
+        #no rows are filled, so only the last row (and the row above it, set below) can be read in the next column
+        filled_first[0] = len_ref + 1
+        filled_last[0] = len_ref - 1
+
+    #the last row is always filled, and the row above it is either filled or set to no_jump_score
+    if len_ref > 1 and (first_row > last_row or last_row < len_ref - 1):
+        curr[len_ref-1] = no_jump_score
+    if len_ref > 0:
+        _fill_column(idx_read, read_base, len_read, ref, len_ref, len_ref, params, jump_source_score,
+                prev, curr, pointer, idx_read*rows, NULL, NULL, colmax, colmaxInd)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _get_xdrop_column_max(int idx_read, int len_ref, int filled_first, int filled_last, const int* score) noexcept nogil:
+    """
+    Returns the best score in the filled cells of column idx_read (rows filled_first to filled_last, the first row and the last row)
+    """
+    cdef const int* col = score + idx_read*(len_ref+1)
+    cdef int idx_ref
+    cdef int col_max = col[0]
+    if col[len_ref] > col_max:
+        col_max = col[len_ref]
+    for idx_ref in range(filled_first, filled_last+1):
+        if col[idx_ref] > col_max:
+            col_max = col[idx_ref]
+    return col_max
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _prune_xdrop_column(int idx_read, int len_ref, int filled_first, int filled_last, int threshold,
+        int* score, int* live_first, int* live_last) noexcept nogil:
+    """
+    Sets the filled cells of column idx_read (other than the first and last rows) that score less than threshold to no_jump_score so that they are not extended, and sets live_first and live_last to the first and last rows scoring at least threshold (with live_first > live_last if there are none)
+    """
+    cdef int* col = score + idx_read*(len_ref+1)
+    cdef int idx_ref
+    live_first[0] = len_ref + 1
+    live_last[0] = -1
+    if col[0] >= threshold:
+        live_first[0] = 0
+        live_last[0] = 0
+    for idx_ref in range(filled_first, filled_last+1):
+        if col[idx_ref] < threshold:
+            col[idx_ref] = no_jump_score
+        else:
+            if idx_ref < live_first[0]:
+                live_first[0] = idx_ref
+            live_last[0] = idx_ref
+    if len_ref > 0 and col[len_ref] >= threshold:
+        if len_ref < live_first[0]:
+            live_first[0] = len_ref
+        live_last[0] = len_ref
+
+
+cdef bint _fill_tables_xdrop(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params, int x_drop, const ScoreBound* bound,
+        int* score1, unsigned char* pointer1, int* colmaxes1, int* colmaxesInd1,
+        int* score2, unsigned char* pointer2, int* colmaxes2, int* colmaxesInd2) noexcept nogil:
+    """
+    Fills the score and pointer tables for both references one read column at a time like _fill_tables_full, but cells scoring more than x_drop below the best cell of their column (in either reference) are not extended
+    Those cells are set to no_jump_score, and only the cells that can be reached from the remaining cells are filled in the next column (see _fill_xdrop_column). Cells that are not filled are never on the traced path
+    The alignment found may score less than the optimal alignment if the optimal path passes through a pruned cell
+
+    returns:
+        False if the tables were not finished because the alignment cannot reach bound.min_score
+    """
+    cdef int idx_read, idx_ref, col_max, threshold
+    cdef int max_match_score = max(params.match_score, params.mismatch_score)
+    cdef int max_jump_score1 = params.jump_score + max_match_score
+    cdef int max_jump_score2 = params.jump_score + max_match_score
+    cdef int filled_first1 = 1
+    cdef int filled_last1 = ref1.len
+    cdef int filled_first2 = 1
+    cdef int filled_last2 = ref2.len
+    cdef int prev_filled_first1, prev_filled_last1, prev_filled_first2, prev_filled_last2
+    cdef int live_first1 = 0
+    cdef int live_last1 = ref1.len
+    cdef int live_first2 = 0
+    cdef int live_last2 = ref2.len
+    _fill_perimeter(len_read, ref1.len, params, score1, pointer1, colmaxes1, colmaxesInd1)
+    _fill_perimeter(len_read, ref2.len, params, score2, pointer2, colmaxes2, colmaxesInd2)
+    for idx_ref in range(ref1.len+1):
+        max_jump_score1 = max(max_jump_score1, params.jump_score + ref1.jump_incentive[idx_ref] + max_match_score)
+    for idx_ref in range(ref2.len+1):
+        max_jump_score2 = max(max_jump_score2, params.jump_score + ref2.jump_incentive[idx_ref] + max_match_score)
+    col_max = 0
+    for idx_ref in range(max(ref1.len, ref2.len)+1):
+        col_max = max(col_max, _perimeter_score(idx_ref, params))
+    threshold = col_max - x_drop
+
+    for idx_read in range(1,len_read+1):
+        prev_filled_first1, prev_filled_last1 = filled_first1, filled_last1
+        prev_filled_first2, prev_filled_last2 = filled_first2, filled_last2
+        _fill_xdrop_column(idx_read, read_seq[idx_read-1], len_read, ref1, params, colmaxes2[idx_read-1], max_jump_score1, threshold,
+                prev_filled_first1, prev_filled_last1, live_first1, live_last1,
+                score1, pointer1, &colmaxes1[idx_read], &colmaxesInd1[idx_read], &filled_first1, &filled_last1)
+        _fill_xdrop_column(idx_read, read_seq[idx_read-1], len_read, ref2, params, colmaxes1[idx_read-1], max_jump_score2, threshold,
+                prev_filled_first2, prev_filled_last2, live_first2, live_last2,
+                score2, pointer2, &colmaxes2[idx_read], &colmaxesInd2[idx_read], &filled_first2, &filled_last2)
+
+        col_max = max(_get_xdrop_column_max(idx_read, ref1.len, filled_first1, filled_last1, score1),
+                _get_xdrop_column_max(idx_read, ref2.len, filled_first2, filled_last2, score2))
+        if _cannot_reach_min_score(bound, col_max, idx_read, len_read):
+            return False
+        threshold = col_max - x_drop
+        if idx_read < len_read:
+            _prune_xdrop_column(idx_read, ref1.len, filled_first1, filled_last1, threshold, score1, &live_first1, &live_last1)
+            _prune_xdrop_column(idx_read, ref2.len, filled_first2, filled_last2, threshold, score2, &live_first2, &live_last2)
+    return True
+
+
+cdef void _fill_tables(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const Band* band1, const Band* band2, const ScoreParams* params,
+        int* score1, unsigned char* pointer1, int* colmaxes1, int* colmaxesInd1,
+        int* score2, unsigned char* pointer2, int* colmaxes2, int* colmaxesInd2) noexcept nogil:
+    """
+    Fills the score and pointer tables for both references inside their bands, one read column at a time
+    Cells outside of the bands (other than the first row and column) are not filled
+    """
+    cdef int idx_read
+    _fill_perimeter(len_read, ref1.len, params, score1, pointer1, colmaxes1, colmaxesInd1)
+    _fill_perimeter(len_read, ref2.len, params, score2, pointer2, colmaxes2, colmaxesInd2)
+    for idx_read in range(1,len_read+1):
+        _fill_band_column(idx_read, read_seq[idx_read-1], len_read, ref1, band1, params, colmaxes2[idx_read-1],
+                score1, pointer1, colmaxes1, colmaxesInd1)
+        _fill_band_column(idx_read, read_seq[idx_read-1], len_read, ref2, band2, params, colmaxes1[idx_read-1],
+                score2, pointer2, colmaxes2, colmaxesInd2)
+
+
+cdef inline int _match_score(const RefInfo* ref, unsigned char read_base, int idx_ref) noexcept nogil:
+    """
+    Returns the match/mismatch score of read_base against row idx_ref of a reference, as in _fill_column
+    """
+    return ref.profile[<size_t> ref.profile_code[read_base] * (ref.len+1) + idx_ref]
+
+
+cdef inline int _gap_left_score(int idx_ref, int idx_read, int len_read, int len_ref, const ScoreParams* params) noexcept nogil:
+    """
+    Returns the score of the gap in the read that ends at cell (idx_ref, idx_read), as in _fill_column
+    """
+    if idx_ref == len_ref and idx_read < len_read:
+        return params.perimeter_gap_extension_score
+    return params.gap_score
+
+
+cdef inline int _gap_up_score(int idx_ref, int idx_read, int len_read, int len_ref, const ScoreParams* params) noexcept nogil:
+    """
+    Returns the score of the gap in the reference that ends at cell (idx_ref, idx_read), as in _fill_column
+    """
+    if idx_read == len_read and idx_ref < len_ref:
+        return params.perimeter_gap_extension_score
+    return params.gap_score
+
+
+cdef inline bint _has_unfilled_rows(int idx_read, int len_ref, const Band* band) noexcept nogil:
+    """
+    Returns whether column idx_read of a reference has cells outside of the band (other than the first row)
+    """
+    cdef int first_rows[2]
+    cdef int last_rows[2]
+    cdef int num_runs = _get_band_rows(idx_read, len_ref, band, first_rows, last_rows)
+    cdef int num_filled = 0
+    cdef int run
+    for run in range(num_runs):
+        if first_rows[run] <= last_rows[run]:
+            num_filled += last_rows[run] - first_rows[run] + 1
+    return num_filled < len_ref
+
+
+cdef int _get_unfilled_runs(int first_row, int last_row, int idx_read, int len_ref, const Band* band, int* first_rows, int* last_rows) noexcept nogil:
+    """
+    Sets the first and last rows of the runs of cells from row first_row to last_row (within rows 1 to len_ref) of column idx_read outside the band
+
+    returns:
+        the number of runs (at most 3)
+    """
+    cdef int band_first_rows[2]
+    cdef int band_last_rows[2]
+    cdef int num_band_runs = _get_band_rows(idx_read, len_ref, band, band_first_rows, band_last_rows)
+    cdef int num_runs = 0
+    cdef int run
+    first_row = max(first_row, 1)
+    last_row = min(last_row, len_ref)
+    for run in range(num_band_runs):
+        if band_first_rows[run] > band_last_rows[run]:
+            continue
+        if first_row < band_first_rows[run] and first_row <= last_row:
+            first_rows[num_runs] = first_row
+            last_rows[num_runs] = min(last_row, band_first_rows[run] - 1)
+            num_runs += 1
+        first_row = max(first_row, band_last_rows[run] + 1)
+    if first_row <= last_row:
+        first_rows[num_runs] = first_row
+        last_rows[num_runs] = last_row
+        num_runs += 1
+    return num_runs
+
+
+cdef int _get_unfilled_incentive(const RefInfo* ref, const Band* band, int offset) noexcept nogil:
+    """
+    Returns the largest jump incentive of the rows (offset 0) or of the rows above them (offset -1) among the rows that are not filled in every column, or no_jump_score if every row is
+    Jumps from a cell use the jump incentive of its row, and jumps to a cell the jump incentive of the row above
+    """
+    cdef int idx_ref
+    cdef int max_incentive = no_jump_score
+    for idx_ref in range(1,ref.len+1):
+        if idx_ref < band.row_lo or idx_ref > band.row_hi:
+            max_incentive = max(max_incentive, ref.jump_incentive[idx_ref+offset])
+    return max_incentive
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _fill_band_suffix_column(int idx_read, const unsigned char* read_seq, int len_read,
+        const RefInfo* ref, const Band* band, const ScoreParams* params, int jump_target_score,
+        const int* next_suffix, int* suffix) noexcept nogil:
+    """
+    Sets the best score that an alignment can add after each cell of column idx_read inside the band of one reference, staying inside the bands (_fill_band_column run backwards)
+    next_suffix is the same for column idx_read+1 (not read in the last column), and jump_target_score is the best score added by jumping from this column to the other reference (the value returned for its next column)
+    The cells just outside of the band are set to no_jump_score so that they are never chosen by the cells of the previous column, as are the cells from which the end of the alignment cannot be reached
+
+    returns:
+        the best score that an alignment can add by jumping to a cell of this column and finishing from there, without the jump incentive of the jump source
+    """
+    cdef int len_ref = ref.len
+    cdef const int* match_scores = ref.profile + <size_t> ref.profile_code[read_seq[idx_read-1]] * (len_ref+1)
+    cdef const int* next_match_scores = match_scores
+    cdef int gap_up_score = params.gap_score
+    cdef int gap_left_score = params.gap_score
+    cdef int last_gap_left_score = params.perimeter_gap_extension_score #no gap penalty in the last row...
+    cdef int first_rows[2]
+    cdef int last_rows[2]
+    cdef int num_runs, run, idx_ref, best
+    cdef int jump_score = no_jump_score
+    if idx_read == len_read:
+        gap_up_score = params.perimeter_gap_extension_score #no gap penalty in the last column (except for the bottom right cell)
+    else:
+        next_match_scores = ref.profile + <size_t> ref.profile_code[read_seq[idx_read]] * (len_ref+1)
+        if idx_read + 1 == len_read:
+            last_gap_left_score = params.gap_score #...except for the bottom right cell
+    num_runs = _get_band_rows(idx_read, len_ref, band, first_rows, last_rows)
+    for run in range(num_runs):
+        if first_rows[run] > 1:
+            suffix[first_rows[run]-1] = no_jump_score
+        if last_rows[run] < len_ref:
+            suffix[last_rows[run]+1] = no_jump_score
+        #gaps in the reference lead down the column, so the rows are set from the bottom up
+        for idx_ref in range(last_rows[run], first_rows[run]-1, -1):
+            if idx_read == len_read:
+                best = 0 if idx_ref == len_ref else no_jump_score
+            elif idx_ref == len_ref:
+                best = max(ref.jump_incentive[idx_ref] + jump_target_score, next_suffix[idx_ref] + last_gap_left_score)
+            else:
+                best = max(ref.jump_incentive[idx_ref] + jump_target_score, next_suffix[idx_ref] + gap_left_score)
+                best = max(best, next_suffix[idx_ref+1] + next_match_scores[idx_ref+1])
+            if idx_ref + 1 == len_ref:
+                best = max(best, suffix[idx_ref+1] + params.gap_score)
+            elif idx_ref < len_ref:
+                best = max(best, suffix[idx_ref+1] + gap_up_score)
+            suffix[idx_ref] = max(best, no_jump_score)
+            jump_score = max(jump_score, ref.jump_incentive[idx_ref-1] + match_scores[idx_ref] + suffix[idx_ref])
+    return max(jump_score + params.jump_score, no_jump_score)
+
+
+cdef inline void _update_max_tree(long long* tree, Py_ssize_t size, Py_ssize_t idx, long long value) noexcept nogil:
+    """
+    Raises value idx of a Fenwick tree of prefix maxes (of size values) to value
+    """
+    idx += 1
+    while idx <= size:
+        if value > tree[idx-1]:
+            tree[idx-1] = value
+        idx += idx & -idx
+
+
+cdef inline long long _query_max_tree(const long long* tree, Py_ssize_t idx) noexcept nogil:
+    """
+    Returns the max of values 0 to idx of a Fenwick tree of prefix maxes (no_band_gain if idx is negative)
+    """
+    cdef long long best = no_band_gain
+    idx += 1
+    while idx > 0:
+        if tree[idx-1] > best:
+            best = tree[idx-1]
+        idx -= idx & -idx
+    return best
+
+
+cdef inline void _add_band_exit(BandExits* exits, const BandGains* gains, int diag, long long exit_gain) noexcept nogil:
+    """
+    Adds an exit from an unfilled cell on diagonal diag (idx_ref - idx_read) of a reference, where exit_gain is the exit score plus gains.step for each read base before it
+    """
+    cdef Py_ssize_t idx = diag + exits.diag_offset
+    _update_max_tree(exits.down_tree, exits.num_diags, exits.num_diags - 1 - idx, exit_gain - <long long> gains.gap_up_cost * diag)
+    _update_max_tree(exits.left_tree, exits.num_diags, idx, exit_gain + <long long> gains.gap_left_cost * diag)
+    exits.best_cell = max(exits.best_cell, exit_gain)
+
+
+cdef inline long long _get_band_entry_bound(const BandExits* exits, const BandGains* gains, int diag, long long entry_gain) noexcept nogil:
+    """
+    Returns the best score of an alignment that enters unfilled cells of a reference on diagonal diag (idx_ref - idx_read) and leaves them through the exits added so far without jumping in between
+    entry_gain is the entry score minus gains.step for each read base up to the entry. Reaching an exit on another diagonal takes a gap for each diagonal in between, and any diagonal can be left by jumping
+    """
+    cdef Py_ssize_t idx = diag + exits.diag_offset
+    cdef long long best = max(exits.best_jump,
+            _query_max_tree(exits.down_tree, exits.num_diags - 1 - idx) + <long long> gains.gap_up_cost * diag)
+    best = max(best, _query_max_tree(exits.left_tree, idx - 1) - <long long> gains.gap_left_cost * diag)
+    return entry_gain + best
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef long long _get_band_entries_bound(int idx_read, const unsigned char* read_seq, int len_read,
+        const RefInfo* ref, const Band* band, const ScoreParams* params, const BandGains* gains,
+        int jump_source_score, int land_incentive, const int* score, const BandExits* exits, long long* best_entry) noexcept nogil:
+    """
+    Returns the best score of an alignment through unfilled cells of one reference that it enters in column idx_read, from a filled cell (including the first row and column) or by jumping, and leaves through the exits added so far without jumping in between (see _get_band_entry_bound)
+    jump_source_score is the column max of the other reference in the previous column, and land_incentive the largest jump incentive for a jump to an unfilled cell (see _get_unfilled_incentive)
+    best_entry is set to the best entry score minus gains.step for each read base up to the entry
+    """
+    cdef Py_ssize_t rows = ref.len + 1
+    cdef const int* col = score + idx_read*rows
+    cdef const int* prev = col - rows
+    cdef unsigned char read_base = read_seq[idx_read-1]
+    cdef int len_ref = ref.len
+    cdef long long read_gain = <long long> gains.step * idx_read
+    cdef long long best = no_band_gain
+    cdef long long entry_gain
+    cdef int first_rows[2]
+    cdef int last_rows[2]
+    cdef int prev_first_rows[2]
+    cdef int prev_last_rows[2]
+    cdef int unfilled_first_rows[3]
+    cdef int unfilled_last_rows[3]
+    cdef int num_runs, run, num_prev_runs, prev_run, idx_ref
+    best_entry[0] = no_band_gain
+    if not _has_unfilled_rows(idx_read, len_ref, band):
+        return no_band_gain
+    #by jumping to any unfilled row
+    if land_incentive != no_jump_score:
+        best_entry[0] = jump_source_score + params.jump_score + land_incentive + max(params.match_score, params.mismatch_score) - read_gain
+        best = best_entry[0] + max(exits.best_cell, exits.best_jump)
+    #down from the cell above
+    if not _in_band(1, idx_read, band):
+        entry_gain = col[0] + _gap_up_score(1, idx_read, len_read, len_ref, params) - read_gain
+        best_entry[0] = max(best_entry[0], entry_gain)
+        best = max(best, _get_band_entry_bound(exits, gains, 1 - idx_read, entry_gain))
+    num_runs = _get_band_rows(idx_read, len_ref, band, first_rows, last_rows)
+    for run in range(num_runs):
+        if first_rows[run] <= last_rows[run] and last_rows[run] < len_ref:
+            entry_gain = col[last_rows[run]] + _gap_up_score(last_rows[run]+1, idx_read, len_read, len_ref, params) - read_gain
+            best_entry[0] = max(best_entry[0], entry_gain)
+            best = max(best, _get_band_entry_bound(exits, gains, last_rows[run] + 1 - idx_read, entry_gain))
+    #from the previous column, whose first row is always filled (as is the whole first column)
+    if not _in_band(1, idx_read, band):
+        entry_gain = prev[0] + _match_score(ref, read_base, 1) - read_gain
+        best_entry[0] = max(best_entry[0], entry_gain)
+        best = max(best, _get_band_entry_bound(exits, gains, 1 - idx_read, entry_gain))
+    if idx_read == 1:
+        num_prev_runs = 1
+        prev_first_rows[0] = 1
+        prev_last_rows[0] = len_ref
+    else:
+        num_prev_runs = _get_band_rows(idx_read-1, len_ref, band, prev_first_rows, prev_last_rows)
+    for prev_run in range(num_prev_runs):
+        #the unfilled cells to the right of the run
+        num_runs = _get_unfilled_runs(prev_first_rows[prev_run], prev_last_rows[prev_run], idx_read, len_ref, band, unfilled_first_rows, unfilled_last_rows)
+        for run in range(num_runs):
+            for idx_ref in range(unfilled_first_rows[run], unfilled_last_rows[run]+1):
+                entry_gain = prev[idx_ref] + _gap_left_score(idx_ref, idx_read, len_read, len_ref, params) - read_gain
+                best_entry[0] = max(best_entry[0], entry_gain)
+                best = max(best, _get_band_entry_bound(exits, gains, idx_ref - idx_read, entry_gain))
+        #the unfilled cells diagonally below the run
+        num_runs = _get_unfilled_runs(prev_first_rows[prev_run]+1, prev_last_rows[prev_run]+1, idx_read, len_ref, band, unfilled_first_rows, unfilled_last_rows)
+        for run in range(num_runs):
+            for idx_ref in range(unfilled_first_rows[run], unfilled_last_rows[run]+1):
+                entry_gain = prev[idx_ref-1] + _match_score(ref, read_base, idx_ref) - read_gain
+                best_entry[0] = max(best_entry[0], entry_gain)
+                best = max(best, _get_band_entry_bound(exits, gains, idx_ref - idx_read, entry_gain))
+    return best
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _add_band_exits(int idx_read, const unsigned char* read_seq, int len_read,
+        const RefInfo* ref, const Band* band, const ScoreParams* params, const BandGains* gains,
+        int jump_target_score, int source_incentive, const int* next_suffix, const int* suffix, BandExits* exits) noexcept nogil:
+    """
+    Adds the exits from the unfilled cells of column idx_read of one reference, by a step or a jump to a filled cell followed by the best score to the end through the bands (see _add_band_exit)
+    suffix and next_suffix are the best scores after the filled cells of this column and the next one (see _fill_band_suffix_column), jump_target_score is the best score added by jumping to the next column of the other reference (see _fill_band_suffix_column), and source_incentive the largest jump incentive of an unfilled cell (see _get_unfilled_incentive)
+    """
+    cdef int len_ref = ref.len
+    cdef long long read_gain = <long long> gains.step * idx_read
+    cdef int first_rows[2]
+    cdef int last_rows[2]
+    cdef int next_first_rows[2]
+    cdef int next_last_rows[2]
+    cdef int unfilled_first_rows[3]
+    cdef int unfilled_last_rows[3]
+    cdef int num_runs, run, num_next_runs, next_run, idx_ref
+    cdef unsigned char next_base
+    if not _has_unfilled_rows(idx_read, len_ref, band):
+        return
+    #down to the first cell of a run
+    num_runs = _get_band_rows(idx_read, len_ref, band, first_rows, last_rows)
+    for run in range(num_runs):
+        if 1 < first_rows[run] <= last_rows[run]:
+            _add_band_exit(exits, gains, first_rows[run] - 1 - idx_read,
+                    suffix[first_rows[run]] + _gap_up_score(first_rows[run], idx_read, len_read, len_ref, params) + read_gain)
+    if idx_read == len_read:
+        return
+    #by jumping from any unfilled row
+    if source_incentive != no_jump_score:
+        exits.best_jump = max(exits.best_jump, source_incentive + jump_target_score + read_gain)
+    #to the next column
+    next_base = read_seq[idx_read]
+    num_next_runs = _get_band_rows(idx_read+1, len_ref, band, next_first_rows, next_last_rows)
+    for next_run in range(num_next_runs):
+        #the unfilled cells to the left of the run
+        num_runs = _get_unfilled_runs(next_first_rows[next_run], next_last_rows[next_run], idx_read, len_ref, band, unfilled_first_rows, unfilled_last_rows)
+        for run in range(num_runs):
+            for idx_ref in range(unfilled_first_rows[run], unfilled_last_rows[run]+1):
+                _add_band_exit(exits, gains, idx_ref - idx_read,
+                        next_suffix[idx_ref] + _gap_left_score(idx_ref, idx_read+1, len_read, len_ref, params) + read_gain)
+        #the unfilled cells diagonally above the run
+        num_runs = _get_unfilled_runs(next_first_rows[next_run]-1, next_last_rows[next_run]-1, idx_read, len_ref, band, unfilled_first_rows, unfilled_last_rows)
+        for run in range(num_runs):
+            for idx_ref in range(unfilled_first_rows[run], unfilled_last_rows[run]+1):
+                _add_band_exit(exits, gains, idx_ref - idx_read, next_suffix[idx_ref+1] + _match_score(ref, next_base, idx_ref+1) + read_gain)
+
+
+cdef void _init_band_gains(const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params, BandGains* gains) noexcept nogil:
+    """
+    Sets the most that an alignment can add between unfilled cells (see BandGains)
+    Each read base adds at most the best of the match, mismatch and gap scores, each gap less the best gap score, and each jump (with the largest jump incentives of both references, or none from the first row) a match plus the jump score and incentives
+    """
+    cdef int idx_ref
+    cdef int max_incentive1 = 0
+    cdef int max_incentive2 = 0
+    cdef int best_gap_score = max(params.gap_score, params.perimeter_gap_extension_score)
+    for idx_ref in range(ref1.len+1):
+        max_incentive1 = max(max_incentive1, ref1.jump_incentive[idx_ref])
+    for idx_ref in range(ref2.len+1):
+        max_incentive2 = max(max_incentive2, ref2.jump_incentive[idx_ref])
+    gains.step = mymax4(params.match_score, params.mismatch_score, params.gap_score, params.perimeter_gap_extension_score)
+    gains.gap_up_cost = -best_gap_score
+    gains.gap_left_cost = gains.step - best_gap_score
+    gains.jump_cost = gains.step - (params.jump_score + max_incentive1 + max_incentive2 + max(params.match_score, params.mismatch_score))
+
+
+cdef int _init_band_exits(int len_read, int len_ref, BandExits* exits) noexcept nogil:
+    """
+    Allocates the Fenwick trees of a BandExits for the diagonals of a table (with no exits)
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef Py_ssize_t idx
+    exits.diag_offset = len_read
+    exits.num_diags = len_read + len_ref + 1
+    exits.best_cell = no_band_gain
+    exits.best_jump = no_band_gain
+    exits.down_tree = <long long*> malloc(2 * exits.num_diags * sizeof(long long))
+    exits.left_tree = exits.down_tree + exits.num_diags
+    if exits.down_tree == NULL:
+        return -1
+    for idx in range(2 * exits.num_diags):
+        exits.down_tree[idx] = no_band_gain
+    return 0
+
+
+cdef bint _band_alignment_may_differ(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const Band* band1, const Band* band2, const ScoreParams* params,
+        const int* score1, const int* colmaxes1, const int* score2, const int* colmaxes2, int* suffix_cols) noexcept nogil:
+    """
+    Returns whether an alignment through a cell outside of the bands may score at least as much as the alignment in the filled tables, in which case the whole tables must be filled
+    Otherwise every alignment through an unfilled cell scores less, so the optimal alignment, and every score, pointer and column max on its path, is the same as in the whole tables
+    An alignment through unfilled cells is bounded by its score up to the first unfilled cell it enters (see _get_band_entries_bound), the best score it can add from the last unfilled cell it leaves (see _add_band_exits), and the most it can add in between (see BandGains)
+    The best scores after the filled cells are computed backwards one column at a time in suffix_cols, which must have room for 2*(ref1.len+1) + 2*(ref2.len+1) values
+    Gaps or jumps that do not lower the score always give True, as does running out of memory
+    """
+    cdef Py_ssize_t rows1 = ref1.len + 1
+    cdef Py_ssize_t rows2 = ref2.len + 1
+    cdef int* next_suffix1 = suffix_cols
+    cdef int* suffix1 = suffix_cols + rows1
+    cdef int* next_suffix2 = suffix_cols + 2*rows1
+    cdef int* suffix2 = suffix_cols + 2*rows1 + rows2
+    cdef int* swap_suffix
+    cdef int end_score = max(score1[len_read*rows1 + ref1.len], score2[len_read*rows2 + ref2.len])
+    cdef int land_incentive1 = _get_unfilled_incentive(ref1, band1, -1)
+    cdef int land_incentive2 = _get_unfilled_incentive(ref2, band2, -1)
+    cdef int source_incentive1 = _get_unfilled_incentive(ref1, band1, 0)
+    cdef int source_incentive2 = _get_unfilled_incentive(ref2, band2, 0)
+    cdef int jump_target_score1 = no_jump_score #best score added by jumping to the column after idx_read of ref1 (see _fill_band_suffix_column)
+    cdef int jump_target_score2 = no_jump_score
+    cdef int next_jump_target_score1, next_jump_target_score2
+    cdef int idx_read
+    cdef long long best, best_entry1, best_entry2, best_exit1, best_exit2
+    cdef bint may_differ = False
+    cdef BandGains gains
+    cdef BandExits exits1, exits2
+    _init_band_gains(ref1, ref2, params, &gains)
+    if gains.gap_up_cost < 0 or gains.jump_cost <= 0:
+        return True
+    exits2.down_tree = NULL
+    if _init_band_exits(len_read, ref1.len, &exits1) != 0 or _init_band_exits(len_read, ref2.len, &exits2) != 0:
+        free(exits1.down_tree)
+        free(exits2.down_tree)
+        return True
+    for idx_read in range(len_read, 0, -1):
+        #jumps from this column land in the next one
+        next_jump_target_score1 = jump_target_score1
+        next_jump_target_score2 = jump_target_score2
+        jump_target_score1 = _fill_band_suffix_column(idx_read, read_seq, len_read, ref1, band1, params, next_jump_target_score2, next_suffix1, suffix1)
+        jump_target_score2 = _fill_band_suffix_column(idx_read, read_seq, len_read, ref2, band2, params, next_jump_target_score1, next_suffix2, suffix2)
+        _add_band_exits(idx_read, read_seq, len_read, ref1, band1, params, &gains, next_jump_target_score2, source_incentive1, next_suffix1, suffix1, &exits1)
+        _add_band_exits(idx_read, read_seq, len_read, ref2, band2, params, &gains, next_jump_target_score1, source_incentive2, next_suffix2, suffix2, &exits2)
+        #without jumps between the entry and the exit, which are then in the same reference
+        best = max(_get_band_entries_bound(idx_read, read_seq, len_read, ref1, band1, params, &gains, colmaxes2[idx_read-1], land_incentive1, score1, &exits1, &best_entry1),
+                _get_band_entries_bound(idx_read, read_seq, len_read, ref2, band2, params, &gains, colmaxes1[idx_read-1], land_incentive2, score2, &exits2, &best_entry2))
+        #with at least one jump between them to change references, or two to come back
+        best_exit1 = max(exits1.best_cell, exits1.best_jump)
+        best_exit2 = max(exits2.best_cell, exits2.best_jump)
+        best = max(best, best_entry1 + max(best_exit2 - gains.jump_cost, best_exit1 - 2*gains.jump_cost))
+        best = max(best, best_entry2 + max(best_exit1 - gains.jump_cost, best_exit2 - 2*gains.jump_cost))
+        if best >= end_score:
+            may_differ = True
+            break
+        swap_suffix = next_suffix1
+        next_suffix1 = suffix1
+        suffix1 = swap_suffix
+        swap_suffix = next_suffix2
+        next_suffix2 = suffix2
+        suffix2 = swap_suffix
+    free(exits1.down_tree)
+    free(exits2.down_tree)
+    return may_differ
+
+
+cdef void _init_score_column(int len_ref, const ScoreParams* params, score_t* score, char* jumped) noexcept nogil:
+    """
+    Initializes the first column of a reference (and whether it has jumped, if jumped is not NULL)
+    """
+    cdef int idx_ref
+    for idx_ref in range(len_ref+1):
+        score[idx_ref] = _perimeter_score(idx_ref, params)
+        if jumped != NULL:
+            jumped[idx_ref] = 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _score_only(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params,
+        bint compute_single_ref, int* score_cols, char* jumped_cols, ScoreOnlyResult* result) noexcept nogil:
+    """
+    Computes the optimal alignment score (and without jumps if compute_single_ref) keeping only two columns per reference and no pointers
+    score_cols must have room for 4*(ref1.len+1) + 4*(ref2.len+1) values, and jumped_cols for 2*(ref1.len+1) + 2*(ref2.len+1) values
+    """
+    cdef int rows1 = ref1.len + 1
+    cdef int rows2 = ref2.len + 1
+    #columns for the alignment with jumps
+    cdef int* prev1 = score_cols
+    cdef int* curr1 = score_cols + rows1
+    cdef int* prev2 = score_cols + 2*rows1
+    cdef int* curr2 = score_cols + 2*rows1 + rows2
+    #columns for the alignment to each reference without jumps
+    cdef int* single_prev1 = score_cols + 2*rows1 + 2*rows2
+    cdef int* single_curr1 = score_cols + 3*rows1 + 2*rows2
+    cdef int* single_prev2 = score_cols + 4*rows1 + 2*rows2
+    cdef int* single_curr2 = score_cols + 4*rows1 + 3*rows2
+    cdef char* prev_jumped1 = jumped_cols
+    cdef char* curr_jumped1 = jumped_cols + rows1
+    cdef char* prev_jumped2 = jumped_cols + 2*rows1
+    cdef char* curr_jumped2 = jumped_cols + 2*rows1 + rows2
+    cdef int idx_read, colmax1, colmax2, colmaxInd, prev_colmax1, prev_colmax2, unused_colmax, score1, score2
+
+    _init_score_column(ref1.len, params, prev1, prev_jumped1)
+    _init_score_column(ref2.len, params, prev2, prev_jumped2)
+    _init_score_column(ref1.len, params, single_prev1, NULL)
+    _init_score_column(ref2.len, params, single_prev2, NULL)
+    prev_colmax1 = 0
+    prev_colmax2 = 0
+
+    for idx_read in range(1,len_read+1):
+        colmax1 = _perimeter_score(idx_read, params)
+        colmax2 = colmax1
+        curr1[0] = colmax1
+        curr2[0] = colmax1
+        single_curr1[0] = colmax1
+        single_curr2[0] = colmax1
+        curr_jumped1[0] = 0
+        curr_jumped2[0] = 0
+
+        _fill_column(idx_read, read_seq[idx_read-1], len_read, ref1, 1, ref1.len, params, prev_colmax2,
+                prev1, curr1, NULL, 0, prev_jumped1, curr_jumped1, &colmax1, &colmaxInd)
+        _fill_column(idx_read, read_seq[idx_read-1], len_read, ref2, 1, ref2.len, params, prev_colmax1,
+                prev2, curr2, NULL, 0, prev_jumped2, curr_jumped2, &colmax2, &colmaxInd)
+        prev_colmax1 = colmax1
+        prev_colmax2 = colmax2
+        if compute_single_ref:
+            _fill_column_vec(idx_read, read_seq[idx_read-1], len_read, ref1, params, no_jump_score,
+                    single_prev1, single_curr1, NULL, &unused_colmax, &colmaxInd)
+            _fill_column_vec(idx_read, read_seq[idx_read-1], len_read, ref2, params, no_jump_score,
+                    single_prev2, single_curr2, NULL, &unused_colmax, &colmaxInd)
+
+        prev1, curr1 = curr1, prev1
+        prev2, curr2 = curr2, prev2
+        single_prev1, single_curr1 = single_curr1, single_prev1
+        single_prev2, single_curr2 = single_curr2, single_prev2
+        prev_jumped1, curr_jumped1 = curr_jumped1, prev_jumped1
+        prev_jumped2, curr_jumped2 = curr_jumped2, prev_jumped2
+
+    #after the last swap, the last column is in prev
+    #choose the final reference the same way as the traceback
+    score1 = prev1[ref1.len]
+    score2 = prev2[ref2.len]
+    result.aln_ref = 1
+    result.aln_score = score1
+    result.has_jump = prev_jumped1[ref1.len]
+    if score1 < score2:
+        result.aln_ref = 2
+        result.aln_score = score2
+        result.has_jump = prev_jumped2[ref2.len]
+    result.single_ref_score = 0
+    if compute_single_ref:
+        result.single_ref_score = single_prev1[ref1.len]
+        if single_prev2[ref2.len] > result.single_ref_score:
+            result.single_ref_score = single_prev2[ref2.len]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _traceback(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2,
+        int end_score1, const unsigned char* pointer1, const int* colmaxesInd1,
+        int end_score2, const unsigned char* pointer2, const int* colmaxesInd2,
+        Py_ssize_t offset, Py_ssize_t stride, TracebackResult* result) noexcept nogil:
+    """
+    Traces through an optimal alignment in the filled tables
+    end_score1 and end_score2 are the scores of the bottom right cells. Pointers (packed) and colmaxesInd are read every stride values starting at offset (stride is 1 and offset is 0 unless several tables are interleaved)
+    The path is walked twice: once to get the alignment length and number of breakpoints, and once to fill the result buffers (allocated here) from the end backwards
+
+    returns:
+        0 on success, -1 if buffers could not be allocated
+    """
+    cdef Py_ssize_t rows1 = ref1.len + 1
+    cdef Py_ssize_t rows2 = ref2.len + 1
+    cdef int idx_read, idx_ref, curr_matrix, start_matrix, start_ref
+    cdef int aln_len = 0
+    cdef int num_breakpoints = 0
+    cdef int aln_pos, bp_pos
+    cdef char this_pointer
+
+    start_ref = ref1.len
+    start_matrix = 1
+    result.aln_score = end_score1
+    if end_score1 < end_score2:
+        start_ref = ref2.len
+        start_matrix = 2
+        result.aln_score = end_score2
+
+    #first pass - count alignment length and breakpoints
+    idx_read = len_read
+    idx_ref = start_ref
+    curr_matrix = start_matrix
+    while idx_read > 0 or idx_ref > 0:
+        if curr_matrix == 1:
+            this_pointer = _get_pointer(pointer1, (idx_read*rows1 + idx_ref)*stride + offset)
+        else:
+            this_pointer = _get_pointer(pointer2, (idx_read*rows2 + idx_ref)*stride + offset)
+        aln_len += 1
+        if this_pointer == pointer_match:
+            idx_read -= 1
+            idx_ref -= 1
+        elif this_pointer == pointer_gap_read:
+            idx_read -= 1
+        elif this_pointer == pointer_gap_ref:
+            idx_ref -= 1
+        elif this_pointer == pointer_jump:
+            idx_read -= 1
+            num_breakpoints += 1
+            if curr_matrix == 1:
+                curr_matrix = 2
+                idx_ref = colmaxesInd2[idx_read*stride + offset]
+            else:
+                curr_matrix = 1
+                idx_ref = colmaxesInd1[idx_read*stride + offset]
+
+    result.aln_len = aln_len
+    result.num_breakpoints = num_breakpoints
+    result.read_aln = <char*> malloc(3*aln_len + 1)
+    result.breakpoints_read = <int*> malloc((4*num_breakpoints + 1) * sizeof(int))
+    if result.read_aln == NULL or result.breakpoints_read == NULL:
+        free(result.read_aln)
+        free(result.breakpoints_read)
+        result.read_aln = NULL
+        result.breakpoints_read = NULL
+        return -1
+    result.ref1_aln = result.read_aln + aln_len
+    result.ref2_aln = result.read_aln + 2*aln_len
+    result.breakpoints_ref1 = result.breakpoints_read + num_breakpoints
+    result.breakpoints_ref2 = result.breakpoints_read + 2*num_breakpoints
+    result.read_path = result.breakpoints_read + 3*num_breakpoints
+
+    #second pass - fill alignment from the end
+    idx_read = len_read
+    idx_ref = start_ref
+    curr_matrix = start_matrix
+    aln_pos = aln_len
+    bp_pos = num_breakpoints
+    result.read_path[bp_pos] = curr_matrix
+    while idx_read > 0 or idx_ref > 0:
+        aln_pos -= 1
+        if curr_matrix == 1:
+            this_pointer = _get_pointer(pointer1, (idx_read*rows1 + idx_ref)*stride + offset)
+            result.ref2_aln[aln_pos] = b' '
+            if this_pointer == pointer_gap_read:
+                result.ref1_aln[aln_pos] = b'-'
+            else:
+                result.ref1_aln[aln_pos] = ref1.seq[idx_ref-1]
+        else:
+            this_pointer = _get_pointer(pointer2, (idx_read*rows2 + idx_ref)*stride + offset)
+            result.ref1_aln[aln_pos] = b' '
+            if this_pointer == pointer_gap_read:
+                result.ref2_aln[aln_pos] = b'-'
+            else:
+                result.ref2_aln[aln_pos] = ref2.seq[idx_ref-1]
+
+        if this_pointer == pointer_gap_ref:
+            result.read_aln[aln_pos] = b'-'
+            idx_ref -= 1
+        else:
+            result.read_aln[aln_pos] = read_seq[idx_read-1]
+            idx_read -= 1
+            if this_pointer == pointer_match:
+                idx_ref -= 1
+            elif this_pointer == pointer_jump:
+                bp_pos -= 1
+                result.breakpoints_read[bp_pos] = idx_read
+                if curr_matrix == 1:
+                    curr_matrix = 2
+                    result.breakpoints_ref1[bp_pos] = idx_ref-1
+                    idx_ref = colmaxesInd2[idx_read*stride + offset]
+                    result.breakpoints_ref2[bp_pos] = idx_ref
+                else:
+                    curr_matrix = 1
+                    result.breakpoints_ref2[bp_pos] = idx_ref-1
+                    idx_ref = colmaxesInd1[idx_read*stride + offset]
+                    result.breakpoints_ref1[bp_pos] = idx_ref
+                result.read_path[bp_pos] = curr_matrix
+    return 0
+
+
+cdef void _free_traceback_result(TracebackResult* result) noexcept nogil:
+    free(result.read_aln)
+    free(result.breakpoints_read)
+    result.read_aln = NULL
+    result.breakpoints_read = NULL
+
+
+cdef inline str _aln_str(const char* aln, Py_ssize_t aln_len):
+    """
+    Returns an alignment buffer as a str, decoded straight from the buffer without making an intermediate bytes object
+    """
+    return PyUnicode_DecodeUTF8(aln, aln_len, NULL)
+
+
+cdef dict _traceback_result_to_dict(const TracebackResult* result):
+    """
+    Converts a traceback result to the dict returned by nw_breakpoint
+    """
+    cdef int num_breakpoints = result.num_breakpoints
+    return({
+        "read_aln":_aln_str(result.read_aln, result.aln_len),
+        "ref1_aln":_aln_str(result.ref1_aln, result.aln_len),
+        "ref2_aln":_aln_str(result.ref2_aln, result.aln_len),
+        "breakpoints_read":[result.breakpoints_read[i] for i in range(num_breakpoints)],
+        "breakpoints_ref1":[result.breakpoints_ref1[i] for i in range(num_breakpoints)],
+        "breakpoints_ref2":[result.breakpoints_ref2[i] for i in range(num_breakpoints)],
+        "aln_score":result.aln_score,
+        "read_path":[result.read_path[i] for i in range(num_breakpoints+1)]
+        })
+
+
+cdef dict _get_below_min_score_dict(str read_seq):
+    """
+    Returns the result for a read whose alignment score is below the minimum score, with the same keys as nw_breakpoint
+    The read is not aligned to either reference: the reference alignments are blank, there are no breakpoints, read_path is empty and aln_score is None
+    """
+    return({
+        "read_aln":read_seq,
+        "ref1_aln":" " * len(read_seq),
+        "ref2_aln":" " * len(read_seq),
+        "breakpoints_read":[],
+        "breakpoints_ref1":[],
+        "breakpoints_ref2":[],
+        "aln_score":None,
+        "read_path":[],
+        })
+
+
+cdef struct Workspace:
+    size_t capacity1 #number of cells allocated for the ref1 tables
+    size_t capacity2 #number of cells allocated for the ref2 tables
+    size_t capacity_cols #number of columns allocated for the colmax arrays
+    int* score1
+    int* score2
+    unsigned char* pointer1 #packed pointer tables (see _set_pointer)
+    unsigned char* pointer2
+    int* colmaxes1
+    int* colmaxesInd1
+    int* colmaxes2
+    int* colmaxesInd2
+    bint short_scores #whether score1 and score2 were last filled with shorts (see _fits_short_scores)
+    size_t capacity_rows #number of rows allocated for the score-only columns
+    int* score_cols
+    char* jumped_cols #also used for a column of pointers when filling whole tables
+
+
+cdef int _workspace_reserve_columns(Workspace* ws, int len_ref1, int len_ref2) noexcept nogil:
+    """
+    Makes sure the workspace has room for the rolling columns used by _score_only
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef size_t rows = (len_ref1 + 1) + (len_ref2 + 1)
+    if rows > ws.capacity_rows:
+        free(ws.score_cols)
+        free(ws.jumped_cols)
+        ws.score_cols = <int*> malloc(4 * rows * sizeof(int))
+        ws.jumped_cols = <char*> malloc(2 * rows)
+        ws.capacity_rows = rows
+        if ws.score_cols == NULL or ws.jumped_cols == NULL:
+            _workspace_free(ws)
+            return -1
+    return 0
+
+
+cdef int _workspace_reserve(Workspace* ws, int len_read, int len_ref1, int len_ref2) noexcept nogil:
+    """
+    Makes sure the workspace tables are large enough to align a read of length len_read, growing them if necessary
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef size_t cols = len_read + 1
+    cdef size_t cells1 = (len_ref1 + 1) * cols
+    cdef size_t cells2 = (len_ref2 + 1) * cols
+    if cells1 > ws.capacity1:
+        free(ws.score1)
+        free(ws.pointer1)
+        ws.score1 = <int*> malloc(cells1 * sizeof(int))
+        ws.pointer1 = <unsigned char*> malloc(_packed_size(cells1))
+        ws.capacity1 = cells1
+        if ws.score1 == NULL or ws.pointer1 == NULL:
+            _workspace_free(ws)
+            return -1
+    if cells2 > ws.capacity2:
+        free(ws.score2)
+        free(ws.pointer2)
+        ws.score2 = <int*> malloc(cells2 * sizeof(int))
+        ws.pointer2 = <unsigned char*> malloc(_packed_size(cells2))
+        ws.capacity2 = cells2
+        if ws.score2 == NULL or ws.pointer2 == NULL:
+            _workspace_free(ws)
+            return -1
+    return _workspace_reserve_colmaxes(ws, len_read)
+
+
+cdef int _workspace_reserve_colmaxes(Workspace* ws, int len_read) noexcept nogil:
+    """
+    Makes sure the workspace colmax arrays are large enough to align a read of length len_read
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef size_t cols = len_read + 1
+    if cols > ws.capacity_cols:
+        free(ws.colmaxes1)
+        ws.colmaxes1 = <int*> malloc(4 * cols * sizeof(int))
+        ws.capacity_cols = cols
+        if ws.colmaxes1 == NULL:
+            _workspace_free(ws)
+            return -1
+    ws.colmaxesInd1 = ws.colmaxes1 + cols
+    ws.colmaxes2 = ws.colmaxes1 + 2*cols
+    ws.colmaxesInd2 = ws.colmaxes1 + 3*cols
+    return 0
+
+
+cdef void _workspace_free(Workspace* ws) noexcept nogil:
+    free(ws.score1)
+    free(ws.score2)
+    free(ws.pointer1)
+    free(ws.pointer2)
+    free(ws.colmaxes1)
+    free(ws.score_cols)
+    free(ws.jumped_cols)
+    ws.score1 = NULL
+    ws.score2 = NULL
+    ws.pointer1 = NULL
+    ws.pointer2 = NULL
+    ws.colmaxes1 = NULL
+    ws.score_cols = NULL
+    ws.jumped_cols = NULL
+    ws.capacity1 = 0
+    ws.capacity2 = 0
+    ws.capacity_cols = 0
+    ws.capacity_rows = 0
+    ws.short_scores = False
+
+
+cdef object _unpack_pointers(const unsigned char* pointers, Py_ssize_t rows, Py_ssize_t cols):
+    """
+    Returns a packed pointer table as a rows x cols numpy array (in the order of its cells), for printing
+    """
+    cdef Py_ssize_t cells = rows * cols
+    packed = np.frombuffer(pointers[:_packed_size(cells)], dtype=np.uint8)
+    unpacked = (packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3
+    return (unpacked.reshape(-1)[:cells] + 1).astype(np.byte).reshape(rows, cols)
+
+
+cdef void _get_band(int len_read, const RefInfo* ref, const RefInfo* other_ref, int band_width, Band* band) noexcept nogil:
+    """
+    Sets the band of cells to fill for a reference: band_width diagonals on either side of the diagonals where the read starts (0) or ends (len_ref - len_read) aligned to the reference, and where the read continues into the reference after jumping at the cut sites (cut_pos - other cut_pos)
+    Jumps are most likely to land near the cut site, so the band_width rows on either side of the cut site are also filled in every column
+    A band_width of 0 or less gives a band covering the whole table
+    """
+    cdef int diag_end = ref.len - len_read
+    cdef int diag_cut
+    band.row_lo = 1
+    band.row_hi = 0
+    if band_width <= 0:
+        band.diag_lo = -len_read
+        band.diag_hi = ref.len
+        return
+    if ref.cut_pos >= 0:
+        band.row_lo = ref.cut_pos - band_width
+        band.row_hi = ref.cut_pos + band_width
+        if band.row_lo < 1:
+            band.row_lo = 1
+        if band.row_hi > ref.len:
+            band.row_hi = ref.len
+    band.diag_lo = 0
+    band.diag_hi = 0
+    if diag_end < band.diag_lo:
+        band.diag_lo = diag_end
+    if diag_end > band.diag_hi:
+        band.diag_hi = diag_end
+    if ref.cut_pos >= 0 and other_ref.cut_pos >= 0:
+        diag_cut = ref.cut_pos - other_ref.cut_pos
+        if diag_cut < band.diag_lo:
+            band.diag_lo = diag_cut
+        if diag_cut > band.diag_hi:
+            band.diag_hi = diag_cut
+    band.diag_lo -= band_width
+    band.diag_hi += band_width
+
+
+cdef struct PathSteps:
+    #cells of an alignment path, from the end of the alignment to the start
+    size_t num_steps
+    size_t capacity
+    char* matrix #reference table of each cell (1 or 2)
+    char* pointer #pointer of each cell
+    int* idx_ref #row of each cell
+
+
+cdef int _path_steps_add(PathSteps* steps, char matrix, char pointer, int idx_ref) noexcept nogil:
+    """
+    Appends a cell to the path, growing the buffers if necessary
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef size_t capacity
+    cdef void* new_buffer
+    if steps.num_steps == steps.capacity:
+        capacity = 2*steps.capacity + 64
+        new_buffer = realloc(steps.matrix, capacity)
+        if new_buffer == NULL:
+            return -1
+        steps.matrix = <char*> new_buffer
+        new_buffer = realloc(steps.pointer, capacity)
+        if new_buffer == NULL:
+            return -1
+        steps.pointer = <char*> new_buffer
+        new_buffer = realloc(steps.idx_ref, capacity * sizeof(int))
+        if new_buffer == NULL:
+            return -1
+        steps.idx_ref = <int*> new_buffer
+        steps.capacity = capacity
+    steps.matrix[steps.num_steps] = matrix
+    steps.pointer[steps.num_steps] = pointer
+    steps.idx_ref[steps.num_steps] = idx_ref
+    steps.num_steps += 1
+    return 0
+
+
+cdef struct LinearAlignment:
+    #shared state for aligning a read in linear memory
+    const unsigned char* read_seq
+    int len_read
+    const RefInfo* ref1
+    const RefInfo* ref2
+    const ScoreParams* params
+    int* work #two columns per reference
+    int* colmaxes1
+    int* colmaxesInd1
+    int* colmaxes2
+    int* colmaxesInd2
+    PathSteps* steps
+
+
+#tracebacks over at most this many cells (both references) are computed from a pointer table of their columns, larger ones are divided in two
+cdef size_t linear_block_cells = 1 << 20
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_linear_column(const LinearAlignment* la, int idx_read,
+        const int* prev1, int* curr1, const int* prev2, int* curr2,
+        char* pointer1, char* pointer2) noexcept nogil:
+    """
+    Fills column idx_read for both references from the previous column (and the pointers of the column if pointer1 and pointer2 are not NULL), and sets the colmaxes of the column
+    """
+    cdef int perimeter = _perimeter_score(idx_read, la.params)
+    curr1[0] = perimeter
+    curr2[0] = perimeter
+    la.colmaxes1[idx_read] = perimeter
+    la.colmaxesInd1[idx_read] = 0
+    la.colmaxes2[idx_read] = perimeter
+    la.colmaxesInd2[idx_read] = 0
+    if pointer1 != NULL:
+        pointer1[0] = pointer_gap_read
+        pointer2[0] = pointer_gap_read
+    _fill_column_vec(idx_read, la.read_seq[idx_read-1], la.len_read, la.ref1, la.params, la.colmaxes2[idx_read-1],
+            prev1, curr1, pointer1, &la.colmaxes1[idx_read], &la.colmaxesInd1[idx_read])
+    _fill_column_vec(idx_read, la.read_seq[idx_read-1], la.len_read, la.ref2, la.params, la.colmaxes1[idx_read-1],
+            prev2, curr2, pointer2, &la.colmaxes2[idx_read], &la.colmaxesInd2[idx_read])
+
+
+cdef void _forward_linear(const LinearAlignment* la, int col_from, const int* from1, const int* from2,
+        int col_to, int* to1, int* to2) noexcept nogil:
+    """
+    Computes column col_to of both references from column col_from, keeping two columns per reference
+    """
+    cdef int rows1 = la.ref1.len + 1
+    cdef int rows2 = la.ref2.len + 1
+    cdef int* prev1 = la.work
+    cdef int* curr1 = la.work + rows1
+    cdef int* prev2 = la.work + 2*rows1
+    cdef int* curr2 = la.work + 2*rows1 + rows2
+    cdef int idx_read
+    memcpy(prev1, from1, rows1 * sizeof(int))
+    memcpy(prev2, from2, rows2 * sizeof(int))
+    for idx_read in range(col_from+1, col_to+1):
+        _fill_linear_column(la, idx_read, prev1, curr1, prev2, curr2, NULL, NULL)
+        prev1, curr1 = curr1, prev1
+        prev2, curr2 = curr2, prev2
+    memcpy(to1, prev1, rows1 * sizeof(int))
+    memcpy(to2, prev2, rows2 * sizeof(int))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _traceback_linear(const LinearAlignment* la, int col_lo, const int* col_lo1, const int* col_lo2,
+        int col_hi, int* matrix, int* idx_ref) noexcept nogil:
+    """
+    Traces the optimal path back from the cell idx_ref in column col_hi of matrix to column col_lo, adding its cells to la.steps
+    col_lo1 and col_lo2 are the scores of column col_lo for each reference
+    If the columns between col_lo and col_hi are too large for a pointer table, the column halfway between them is computed and the two halves are traced back separately (the second half first)
+    On return, matrix and idx_ref are set to the cell where the path reaches column col_lo
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef int rows1 = la.ref1.len + 1
+    cdef int rows2 = la.ref2.len + 1
+    cdef int num_cols = col_hi - col_lo
+    cdef int col_mid, idx_read, ret
+    cdef int* mid_cols
+    cdef char* pointers
+    cdef char* pointer1
+    cdef char* pointer2
+    cdef int* prev1
+    cdef int* curr1
+    cdef int* prev2
+    cdef int* curr2
+    cdef char this_pointer
+    if num_cols == 0:
+        return 0
+
+    if num_cols > 1 and <size_t> num_cols * (rows1 + rows2) > linear_block_cells:
+        col_mid = col_lo + num_cols // 2
+        mid_cols = <int*> malloc((rows1 + rows2) * sizeof(int))
+        if mid_cols == NULL:
+            return -1
+        _forward_linear(la, col_lo, col_lo1, col_lo2, col_mid, mid_cols, mid_cols + rows1)
+        ret = _traceback_linear(la, col_mid, mid_cols, mid_cols + rows1, col_hi, matrix, idx_ref)
+        free(mid_cols)
+        if ret != 0:
+            return -1
+        return _traceback_linear(la, col_lo, col_lo1, col_lo2, col_mid, matrix, idx_ref)
+
+    #fill the pointers of columns col_lo+1 to col_hi (stored column-major)
+    pointers = <char*> malloc(<size_t> num_cols * (rows1 + rows2))
+    if pointers == NULL:
+        return -1
+    pointer1 = pointers
+    pointer2 = pointers + <size_t> num_cols * rows1
+    prev1 = la.work
+    curr1 = la.work + rows1
+    prev2 = la.work + 2*rows1
+    curr2 = la.work + 2*rows1 + rows2
+    memcpy(prev1, col_lo1, rows1 * sizeof(int))
+    memcpy(prev2, col_lo2, rows2 * sizeof(int))
+    for idx_read in range(col_lo+1, col_hi+1):
+        _fill_linear_column(la, idx_read, prev1, curr1, prev2, curr2,
+                pointer1 + <size_t> (idx_read-col_lo-1) * rows1, pointer2 + <size_t> (idx_read-col_lo-1) * rows2)
+        prev1, curr1 = curr1, prev1
+        prev2, curr2 = curr2, prev2
+
+    idx_read = col_hi
+    while idx_read > col_lo:
+        if matrix[0] == 1:
+            this_pointer = pointer1[<size_t> (idx_read-col_lo-1) * rows1 + idx_ref[0]]
+        else:
+            this_pointer = pointer2[<size_t> (idx_read-col_lo-1) * rows2 + idx_ref[0]]
+        if _path_steps_add(la.steps, matrix[0], this_pointer, idx_ref[0]) != 0:
+            free(pointers)
+            return -1
+        if this_pointer == pointer_match:
+            idx_read -= 1
+            idx_ref[0] -= 1
+        elif this_pointer == pointer_gap_read:
+            idx_read -= 1
+        elif this_pointer == pointer_gap_ref:
+            idx_ref[0] -= 1
+        elif this_pointer == pointer_jump:
+            idx_read -= 1
+            if matrix[0] == 1:
+                matrix[0] = 2
+                idx_ref[0] = la.colmaxesInd2[idx_read]
+            else:
+                matrix[0] = 1
+                idx_ref[0] = la.colmaxesInd1[idx_read]
+    free(pointers)
+    return 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _path_steps_to_result(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const PathSteps* steps, int start_matrix,
+        TracebackResult* result) noexcept nogil:
+    """
+    Fills the alignment in result (allocated here) from the cells of the path, as in the second pass of _traceback
+
+    returns:
+        0 on success, -1 if buffers could not be allocated
+    """
+    cdef int aln_len = steps.num_steps
+    cdef int num_breakpoints = 0
+    cdef int idx_read = len_read
+    cdef int idx_ref, next_idx_ref, curr_matrix, aln_pos, bp_pos, i
+    cdef char this_pointer
+    for i in range(aln_len):
+        if steps.pointer[i] == pointer_jump:
+            num_breakpoints += 1
+
+    result.aln_len = aln_len
+    result.num_breakpoints = num_breakpoints
+    result.read_aln = <char*> malloc(3*aln_len + 1)
+    result.breakpoints_read = <int*> malloc((4*num_breakpoints + 1) * sizeof(int))
+    if result.read_aln == NULL or result.breakpoints_read == NULL:
+        free(result.read_aln)
+        free(result.breakpoints_read)
+        result.read_aln = NULL
+        result.breakpoints_read = NULL
+        return -1
+    result.ref1_aln = result.read_aln + aln_len
+    result.ref2_aln = result.read_aln + 2*aln_len
+    result.breakpoints_ref1 = result.breakpoints_read + num_breakpoints
+    result.breakpoints_ref2 = result.breakpoints_read + 2*num_breakpoints
+    result.read_path = result.breakpoints_read + 3*num_breakpoints
+
+    bp_pos = num_breakpoints
+    result.read_path[bp_pos] = start_matrix
+    for i in range(aln_len):
+        aln_pos = aln_len - 1 - i
+        curr_matrix = steps.matrix[i]
+        this_pointer = steps.pointer[i]
+        idx_ref = steps.idx_ref[i]
+        if curr_matrix == 1:
+            result.ref2_aln[aln_pos] = b' '
+            if this_pointer == pointer_gap_read:
+                result.ref1_aln[aln_pos] = b'-'
+            else:
+                result.ref1_aln[aln_pos] = ref1.seq[idx_ref-1]
+        else:
+            result.ref1_aln[aln_pos] = b' '
+            if this_pointer == pointer_gap_read:
+                result.ref2_aln[aln_pos] = b'-'
+            else:
+                result.ref2_aln[aln_pos] = ref2.seq[idx_ref-1]
+
+        if this_pointer == pointer_gap_ref:
+            result.read_aln[aln_pos] = b'-'
+        else:
+            result.read_aln[aln_pos] = read_seq[idx_read-1]
+            idx_read -= 1
+            if this_pointer == pointer_jump:
+                #the next cell of the path is where the jump comes from (row 0 if the path ends with the jump)
+                next_idx_ref = 0
+                if i + 1 < aln_len:
+                    next_idx_ref = steps.idx_ref[i+1]
+                bp_pos -= 1
+                result.breakpoints_read[bp_pos] = idx_read
+                if curr_matrix == 1:
+                    result.breakpoints_ref1[bp_pos] = idx_ref-1
+                    result.breakpoints_ref2[bp_pos] = next_idx_ref
+                    result.read_path[bp_pos] = 2
+                else:
+                    result.breakpoints_ref2[bp_pos] = idx_ref-1
+                    result.breakpoints_ref1[bp_pos] = next_idx_ref
+                    result.read_path[bp_pos] = 1
+    return 0
+
+
+cdef int _align_read_linear(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params,
+        Workspace* ws, TracebackResult* result) noexcept nogil:
+    """
+    Computes the same alignment as _align_read without filling whole tables, keeping a few columns per reference and the colmaxes of every column
+    Scores are computed once to find where the alignment ends, and the traceback recomputes blocks of columns from saved columns (see _traceback_linear)
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef int rows1 = ref1.len + 1
+    cdef int rows2 = ref2.len + 1
+    cdef int rows = rows1 + rows2
+    cdef LinearAlignment la
+    cdef PathSteps steps
+    cdef int* first_col1
+    cdef int* first_col2
+    cdef int* last_col1
+    cdef int* last_col2
+    cdef int matrix, idx_ref, ret
+
+    if _workspace_reserve_columns(ws, ref1.len, ref2.len) != 0 or _workspace_reserve_colmaxes(ws, len_read) != 0:
+        return -1
+    #score_cols has room for four columns per reference: two for the rolling columns, the first column, and the last column
+    first_col1 = ws.score_cols + 2*rows
+    first_col2 = first_col1 + rows1
+    last_col1 = ws.score_cols + 3*rows
+    last_col2 = last_col1 + rows1
+    la.read_seq = read_seq
+    la.len_read = len_read
+    la.ref1 = ref1
+    la.ref2 = ref2
+    la.params = params
+    la.work = ws.score_cols
+    la.colmaxes1 = ws.colmaxes1
+    la.colmaxesInd1 = ws.colmaxesInd1
+    la.colmaxes2 = ws.colmaxes2
+    la.colmaxesInd2 = ws.colmaxesInd2
+    la.steps = &steps
+    steps.num_steps = 0
+    steps.capacity = 0
+    steps.matrix = NULL
+    steps.pointer = NULL
+    steps.idx_ref = NULL
+
+    _init_score_column(ref1.len, params, first_col1, NULL)
+    _init_score_column(ref2.len, params, first_col2, NULL)
+    la.colmaxes1[0] = first_col1[0]
+    la.colmaxesInd1[0] = 0
+    la.colmaxes2[0] = first_col2[0]
+    la.colmaxesInd2[0] = 0
+    _forward_linear(&la, 0, first_col1, first_col2, len_read, last_col1, last_col2)
+
+    #choose the final reference the same way as _traceback
+    matrix = 1
+    idx_ref = ref1.len
+    result.aln_score = last_col1[ref1.len]
+    if last_col1[ref1.len] < last_col2[ref2.len]:
+        matrix = 2
+        idx_ref = ref2.len
+        result.aln_score = last_col2[ref2.len]
+
+    ret = _traceback_linear(&la, 0, first_col1, first_col2, len_read, &matrix, &idx_ref)
+    #the path ends going up the first column
+    while ret == 0 and idx_ref > 0:
+        ret = _path_steps_add(&steps, matrix, pointer_gap_ref, idx_ref)
+        idx_ref -= 1
+    if ret == 0:
+        ret = _path_steps_to_result(read_seq, len_read, ref1, ref2, &steps,
+                steps.matrix[0] if steps.num_steps > 0 else matrix, result)
+    free(steps.matrix)
+    free(steps.pointer)
+    free(steps.idx_ref)
+    return ret
+
+
+cdef inline bint _uses_linear_memory(int len_read, const RefInfo* ref1, const RefInfo* ref2, Py_ssize_t max_table_cells) noexcept nogil:
+    """
+    Returns whether the tables for a read would have more than max_table_cells cells (if max_table_cells is greater than 0)
+    """
+    return max_table_cells > 0 and <Py_ssize_t> (len_read + 1) * (ref1.len + ref2.len + 2) > max_table_cells
+
+
+#returned by _align_read for aligned reads (align_ok) and reads whose alignment score is below the minimum score
+cdef enum:
+    align_ok = 0
+    below_min_score = 1
+
+
+cdef int _align_read(const unsigned char* read_seq, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params, int band_width, Py_ssize_t max_table_cells,
+        int x_drop, int min_score, Workspace* ws, TracebackResult* result) noexcept nogil:
+    """
+    Fills the tables in ws for one read, and traces back an optimal alignment into result
+    If band_width is greater than 0, only cells in a band around the expected diagonals are filled first (see _get_band), and the whole tables are filled if a path through an unfilled cell may score as much (see _band_alignment_may_differ)
+    If x_drop is greater than 0, the whole tables are filled without extending cells more than x_drop below the best cell of their column (see _fill_tables_xdrop)
+    If the tables would have more than max_table_cells cells, the alignment is computed in linear memory instead (see _align_read_linear), without a band or x_drop
+    Filling the whole tables stops as soon as the alignment cannot reach min_score. Whole tables are filled with shorts when every score fits (see _fits_short_scores)
+
+    returns:
+        0 on success, below_min_score if the alignment score is less than min_score (result is not set), -1 if memory could not be allocated
+    """
+    cdef Band band1, band2
+    cdef ScoreBound bound
+    cdef bint fill_whole_tables = band_width <= 0
+    cdef bint filled = True
+    cdef int end_score1, end_score2, status
+    if _uses_linear_memory(len_read, ref1, ref2, max_table_cells):
+        status = _align_read_linear(read_seq, len_read, ref1, ref2, params, ws, result)
+        if status == 0 and result.aln_score < min_score:
+            _free_traceback_result(result)
+            return below_min_score
+        return status
+    if _workspace_reserve(ws, len_read, ref1.len, ref2.len) != 0 or _workspace_reserve_columns(ws, ref1.len, ref2.len) != 0:
+        return -1
+    ws.short_scores = False
+    if band_width > 0:
+        _get_band(len_read, ref1, ref2, band_width, &band1)
+        _get_band(len_read, ref2, ref1, band_width, &band2)
+        _fill_tables(read_seq, len_read, ref1, ref2, &band1, &band2, params,
+                ws.score1, ws.pointer1, ws.colmaxes1, ws.colmaxesInd1,
+                ws.score2, ws.pointer2, ws.colmaxes2, ws.colmaxesInd2)
+        fill_whole_tables = _band_alignment_may_differ(read_seq, len_read, ref1, ref2, &band1, &band2, params,
+                ws.score1, ws.colmaxes1, ws.score2, ws.colmaxes2, ws.score_cols)
+    if fill_whole_tables:
+        _init_score_bound(ref1, ref2, params, min_score, &bound)
+        if x_drop > 0:
+            filled = _fill_tables_xdrop(read_seq, len_read, ref1, ref2, params, x_drop, &bound,
+                    ws.score1, ws.pointer1, ws.colmaxes1, ws.colmaxesInd1,
+                    ws.score2, ws.pointer2, ws.colmaxes2, ws.colmaxesInd2)
+        elif _fits_short_scores(len_read, ref1, ref2, params):
+            ws.short_scores = True
+            filled = _fill_tables_full(read_seq, len_read, ref1, ref2, params, &bound, ws.jumped_cols,
+                    <short*> ws.score1, ws.pointer1, ws.colmaxes1, ws.colmaxesInd1,
+                    <short*> ws.score2, ws.pointer2, ws.colmaxes2, ws.colmaxesInd2)
+        else:
+            filled = _fill_tables_full(read_seq, len_read, ref1, ref2, params, &bound, ws.jumped_cols,
+                    ws.score1, ws.pointer1, ws.colmaxes1, ws.colmaxesInd1,
+                    ws.score2, ws.pointer2, ws.colmaxes2, ws.colmaxesInd2)
+    if ws.short_scores:
+        end_score1 = (<short*> ws.score1)[<Py_ssize_t> len_read*(ref1.len+1) + ref1.len]
+        end_score2 = (<short*> ws.score2)[<Py_ssize_t> len_read*(ref2.len+1) + ref2.len]
+    else:
+        end_score1 = ws.score1[<Py_ssize_t> len_read*(ref1.len+1) + ref1.len]
+        end_score2 = ws.score2[<Py_ssize_t> len_read*(ref2.len+1) + ref2.len]
+    if not filled or max(end_score1, end_score2) < min_score:
+        return below_min_score
+    return _traceback(read_seq, len_read, ref1, ref2,
+            end_score1, ws.pointer1, ws.colmaxesInd1,
+            end_score2, ws.pointer2, ws.colmaxesInd2, 0, 1, result)
+
+
+#number of reads of the same length that are aligned together by align_lanes, one per lane of each table cell
+cdef enum:
+    num_lanes = 16
+    lane_pointer_bytes = 4 #bytes of packed pointers for the lanes of a cell (num_lanes / 4)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_lane_column(int idx_read, const unsigned char* read_bases, int len_read,
+        const RefInfo* ref, const ScoreParams* params, const int* jump_source_scores,
+        const score_t* prev_score, score_t* score, unsigned char* pointer, Py_ssize_t pointer_stride,
+        int* colmax, int* colmaxInd) noexcept nogil:
+    """
+    Fills column idx_read for one reference for num_lanes reads of the same length at once, with the same scores and pointers as _fill_column
+    Each cell holds num_lanes values (one per read) next to each other. read_bases are the bases of the reads in this column
+    prev_score and score point to row 0 of the previous and this column, and score[0] (all lanes) must already be set. pointer points to the packed pointers of row 0 of this column, with rows pointer_stride bytes apart
+    jump_source_scores are the column maxes of the other reference in the previous column, and colmax and colmaxInd must be initialized to the row 0 values
+    Values used by every row are copied to local arrays so that the compiler can vectorize the loop over lanes
+    Columns of shorts are computed in shorts (twice as many lanes per vector register), so every score of the alignments must fit (see _fits_short_scores)
+    """
+    cdef int idx_ref, lane
+    cdef int len_ref = ref.len
+    cdef score_t this_match_or_mismatch_score, this_match_score, this_gap_up_score, this_gap_left_score, this_read_gap_score, this_ref_gap_score, this_jump_score, tmax, tmax_plus_jump
+    cdef score_t jump_row_score, jump_incentive, match_score, mismatch_score
+    cdef unsigned char ref_base
+    cdef const score_t* diag_score
+    cdef const score_t* left_score
+    cdef score_t* this_score
+    cdef unsigned char* this_pointer
+    cdef char lane_pointers[num_lanes]
+    cdef unsigned char lane_bases[num_lanes]
+    cdef score_t lane_jump_sources[num_lanes]
+    cdef score_t lane_up_scores[num_lanes]
+    cdef score_t lane_colmax[num_lanes]
+    cdef int lane_colmaxInd[num_lanes]
+    match_score = params.match_score
+    mismatch_score = params.mismatch_score
+    for lane in range(num_lanes):
+        lane_bases[lane] = read_bases[lane]
+        lane_jump_sources[lane] = jump_source_scores[lane]
+        lane_up_scores[lane] = score[lane]
+        lane_colmax[lane] = colmax[lane]
+        lane_colmaxInd[lane] = colmaxInd[lane]
+
+    for idx_ref in range(1,len_ref+1):
+        ref_base = ref.seq[idx_ref-1]
+        this_gap_up_score = params.gap_score
+        if idx_read == len_read: #if the last column, no gap penalty
+            this_gap_up_score = params.perimeter_gap_extension_score
+            if idx_ref == len_ref:#except for the bottom right cell with full penalty to shift alignments to the middle
+                this_gap_up_score = params.gap_score
+        this_gap_left_score = params.gap_score
+        if idx_ref == len_ref: #if the last row, no gap penalty
+            this_gap_left_score = params.perimeter_gap_extension_score
+            if idx_read == len_read:
+                this_gap_left_score = params.gap_score
+        jump_row_score = params.jump_score + ref.jump_incentive[idx_ref-1]
+        jump_incentive = ref.jump_incentive[idx_ref]
+        diag_score = prev_score + (idx_ref-1)*num_lanes
+        left_score = prev_score + idx_ref*num_lanes
+        this_score = score + idx_ref*num_lanes
+        this_pointer = pointer + idx_ref*pointer_stride
+
+        if idx_ref < ref.prefer_cut_idx:
+            # prefer jump over match/mismatch if above
+            for lane in range(num_lanes):
+                this_match_or_mismatch_score = match_score if lane_bases[lane] == ref_base else mismatch_score
+                this_match_score = diag_score[lane] + this_match_or_mismatch_score
+                this_ref_gap_score = lane_up_scores[lane] + this_gap_up_score
+                this_read_gap_score = left_score[lane] + this_gap_left_score
+                this_jump_score = lane_jump_sources[lane] + jump_row_score + this_match_or_mismatch_score
+                tmax = this_match_score if this_match_score > this_ref_gap_score else this_ref_gap_score
+                tmax = tmax if tmax > this_read_gap_score else this_read_gap_score
+                tmax = tmax if tmax > this_jump_score else this_jump_score
+                lane_up_scores[lane] = tmax
+                this_score[lane] = tmax
+                lane_pointers[lane] = _choose_pointer(tmax, this_match_score, this_ref_gap_score, this_read_gap_score, this_jump_score, True)
+                tmax_plus_jump = tmax + jump_incentive
+                lane_colmaxInd[lane] = idx_ref if tmax_plus_jump > lane_colmax[lane] else lane_colmaxInd[lane]
+                lane_colmax[lane] = tmax_plus_jump if tmax_plus_jump > lane_colmax[lane] else lane_colmax[lane]
+        else:
+            # prefer match/mismatch/gap if below
+            for lane in range(num_lanes):
+                this_match_or_mismatch_score = match_score if lane_bases[lane] == ref_base else mismatch_score
+                this_match_score = diag_score[lane] + this_match_or_mismatch_score
+                this_ref_gap_score = lane_up_scores[lane] + this_gap_up_score
+                this_read_gap_score = left_score[lane] + this_gap_left_score
+                this_jump_score = lane_jump_sources[lane] + jump_row_score + this_match_or_mismatch_score
+                tmax = this_match_score if this_match_score > this_ref_gap_score else this_ref_gap_score
+                tmax = tmax if tmax > this_read_gap_score else this_read_gap_score
+                tmax = tmax if tmax > this_jump_score else this_jump_score
+                lane_up_scores[lane] = tmax
+                this_score[lane] = tmax
+                lane_pointers[lane] = _choose_pointer(tmax, this_match_score, this_ref_gap_score, this_read_gap_score, this_jump_score, False)
+                tmax_plus_jump = tmax + jump_incentive
+                lane_colmaxInd[lane] = idx_ref if tmax_plus_jump > lane_colmax[lane] else lane_colmaxInd[lane]
+                lane_colmax[lane] = tmax_plus_jump if tmax_plus_jump > lane_colmax[lane] else lane_colmax[lane]
+
+        #the lanes of a cell fill whole bytes of the packed table
+        for lane in range(lane_pointer_bytes):
+            this_pointer[lane] = (lane_pointers[4*lane] - 1) | ((lane_pointers[4*lane+1] - 1) << 2) | \
+                    ((lane_pointers[4*lane+2] - 1) << 4) | ((lane_pointers[4*lane+3] - 1) << 6)
+
+    for lane in range(num_lanes):
+        colmax[lane] = lane_colmax[lane]
+        colmaxInd[lane] = lane_colmaxInd[lane]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_lane_perimeter(int len_read, int len_ref, const ScoreParams* params,
+        score_t* score_col, unsigned char* pointer, int* colmaxes, int* colmaxesInd) noexcept nogil:
+    """
+    Initializes the first column of scores, the pointers of the first row and column, and the colmaxes for num_lanes interleaved tables (see _fill_perimeter)
+    """
+    cdef int idx_read, idx_ref, lane
+    cdef Py_ssize_t rows = len_ref + 1
+    cdef int perimeter_score
+    for idx_ref in range(rows):
+        perimeter_score = _perimeter_score(idx_ref, params)
+        for lane in range(num_lanes):
+            score_col[idx_ref*num_lanes + lane] = perimeter_score
+            _set_pointer(pointer, idx_ref*num_lanes + lane, pointer_gap_ref)
+    for idx_read in range(len_read+1):
+        perimeter_score = _perimeter_score(idx_read, params)
+        for lane in range(num_lanes):
+            _set_pointer(pointer, idx_read*rows*num_lanes + lane, pointer_gap_read)
+            colmaxes[idx_read*num_lanes + lane] = perimeter_score
+            colmaxesInd[idx_read*num_lanes + lane] = 0
+
+
+cdef void _fill_lane_tables(const unsigned char* read_bases, int len_read,
+        const RefInfo* ref1, const RefInfo* ref2, const ScoreParams* params, score_t* score_cols,
+        unsigned char* pointer1, int* colmaxes1, int* colmaxesInd1, int* end_scores1,
+        unsigned char* pointer2, int* colmaxes2, int* colmaxesInd2, int* end_scores2) noexcept nogil:
+    """
+    Fills the pointer tables of num_lanes reads of length len_read, keeping two columns of scores for each reference
+    The bases of the reads in column idx_read are read_bases[(idx_read-1)*num_lanes:idx_read*num_lanes]
+    Tables are column-major (see _fill_perimeter) and interleaved: the value for a lane of a cell (or colmax) is at (cell index)*num_lanes + lane, and the pointer tables are packed
+    score_cols must have room for 2*num_lanes*(ref1.len+1 + ref2.len+1) values, and can hold shorts if every score of the alignments fits (see _fits_short_scores). On return, end_scores1 and end_scores2 are the scores of the bottom right cells of each read
+    """
+    cdef Py_ssize_t rows1 = ref1.len + 1
+    cdef Py_ssize_t rows2 = ref2.len + 1
+    cdef score_t* prev1 = score_cols
+    cdef score_t* curr1 = score_cols + rows1*num_lanes
+    cdef score_t* prev2 = score_cols + 2*rows1*num_lanes
+    cdef score_t* curr2 = score_cols + (2*rows1 + rows2)*num_lanes
+    cdef int idx_read, lane, perimeter_score
+    _fill_lane_perimeter(len_read, ref1.len, params, prev1, pointer1, colmaxes1, colmaxesInd1)
+    _fill_lane_perimeter(len_read, ref2.len, params, prev2, pointer2, colmaxes2, colmaxesInd2)
+    for idx_read in range(1,len_read+1):
+        perimeter_score = _perimeter_score(idx_read, params)
+        for lane in range(num_lanes):
+            curr1[lane] = perimeter_score
+            curr2[lane] = perimeter_score
+        _fill_lane_column(idx_read, read_bases + (idx_read-1)*num_lanes, len_read, ref1, params, colmaxes2 + (idx_read-1)*num_lanes,
+                prev1, curr1, pointer1 + idx_read*rows1*lane_pointer_bytes, lane_pointer_bytes,
+                colmaxes1 + idx_read*num_lanes, colmaxesInd1 + idx_read*num_lanes)
+        _fill_lane_column(idx_read, read_bases + (idx_read-1)*num_lanes, len_read, ref2, params, colmaxes1 + (idx_read-1)*num_lanes,
+                prev2, curr2, pointer2 + idx_read*rows2*lane_pointer_bytes, lane_pointer_bytes,
+                colmaxes2 + idx_read*num_lanes, colmaxesInd2 + idx_read*num_lanes)
+        prev1, curr1 = curr1, prev1
+        prev2, curr2 = curr2, prev2
+    for lane in range(num_lanes):
+        end_scores1[lane] = prev1[(rows1-1)*num_lanes + lane]
+        end_scores2[lane] = prev2[(rows2-1)*num_lanes + lane]
+
+
+cdef struct PanelWorkspace:
+    size_t capacity_cells #number of cells allocated for the tables of all references
+    size_t capacity_cols #number of columns allocated for the colmax and jump source arrays
+    size_t capacity_rows #number of rows allocated for pointer_col
+    int* score
+    unsigned char* pointer #packed pointer tables (see _set_pointer)
+    char* pointer_col #pointers of one column, before they are packed
+    int* colmaxes #colmaxes of each reference (len_read+1 values per reference)
+    int* colmaxesInd
+    int* best_refs #reference with the best colmax in each column
+    int* second_refs #reference with the second best colmax in each column (-1 if there is only one reference)
+
+
+cdef int _panel_workspace_reserve(PanelWorkspace* ws, int len_read, int num_refs, int total_rows) noexcept nogil:
+    """
+    Makes sure the panel workspace is large enough to align a read of length len_read to num_refs references with total_rows rows in all (len+1 for each reference), growing it if necessary
+
+    returns:
+        0 on success, -1 if memory could not be allocated
+    """
+    cdef size_t cols = len_read + 1
+    cdef size_t cells = <size_t> total_rows * cols
+    if cells > ws.capacity_cells:
+        free(ws.score)
+        free(ws.pointer)
+        ws.score = <int*> malloc(cells * sizeof(int))
+        ws.pointer = <unsigned char*> malloc(_packed_size(cells))
+        ws.capacity_cells = cells
+        if ws.score == NULL or ws.pointer == NULL:
+            _panel_workspace_free(ws)
+            return -1
+    if <size_t> total_rows > ws.capacity_rows:
+        free(ws.pointer_col)
+        ws.pointer_col = <char*> malloc(total_rows)
+        ws.capacity_rows = total_rows
+        if ws.pointer_col == NULL:
+            _panel_workspace_free(ws)
+            return -1
+    if cols > ws.capacity_cols:
+        free(ws.colmaxes)
+        ws.colmaxes = <int*> malloc((2*num_refs + 2) * cols * sizeof(int))
+        ws.capacity_cols = cols
+        if ws.colmaxes == NULL:
+            _panel_workspace_free(ws)
+            return -1
+    ws.colmaxesInd = ws.colmaxes + num_refs*cols
+    ws.best_refs = ws.colmaxes + 2*num_refs*cols
+    ws.second_refs = ws.best_refs + cols
+    return 0
+
+
+cdef void _panel_workspace_free(PanelWorkspace* ws) noexcept nogil:
+    free(ws.score)
+    free(ws.pointer)
+    free(ws.pointer_col)
+    free(ws.colmaxes)
+    ws.score = NULL
+    ws.pointer = NULL
+    ws.pointer_col = NULL
+    ws.colmaxes = NULL
+    ws.capacity_cells = 0
+    ws.capacity_cols = 0
+    ws.capacity_rows = 0
+
+
+cdef inline int _get_panel_jump_source(int ref_idx, int best_ref, int second_ref) noexcept nogil:
+    """
+    Returns the reference that ref_idx jumps from: the reference with the best colmax in the previous column, or the second best if that is ref_idx itself (-1 if there is no other reference)
+    """
+    if best_ref == ref_idx:
+        return second_ref
+    return best_ref
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _set_panel_jump_sources(int num_refs, const int* colmaxes, Py_ssize_t cols, int* best_ref, int* second_ref) noexcept nogil:
+    """
+    Sets the references with the best and second best colmax (ties go to the first reference), from the colmaxes of one column (cols values apart)
+    """
+    cdef int ref_idx
+    best_ref[0] = -1
+    second_ref[0] = -1
+    for ref_idx in range(num_refs):
+        if best_ref[0] < 0 or colmaxes[ref_idx*cols] > colmaxes[best_ref[0]*cols]:
+            second_ref[0] = best_ref[0]
+            best_ref[0] = ref_idx
+        elif second_ref[0] < 0 or colmaxes[ref_idx*cols] > colmaxes[second_ref[0]*cols]:
+            second_ref[0] = ref_idx
+
 
 @cython.boundscheck(False)
-@cython.nonecheck(False)
-@cython.initializedcheck(False)
+@cython.wraparound(False)
+cdef void _fill_panel_tables(const unsigned char* read_seq, int len_read, const RefInfo* refs, int num_refs,
+        const int* ref_rows_before, const ScoreParams* params, PanelWorkspace* ws) noexcept nogil:
+    """
+    Fills the score and pointer tables of every reference in a panel, one read column at a time
+    The table of each reference starts at cell ref_rows_before[ref_idx]*(len_read+1) and is stored column-major (the rows of a column are contiguous), so each column of scores is filled in place with _fill_column_vec, and its pointers are packed into the table afterwards
+    The jump source of each reference is the best colmax of the other references in the previous column, so each column costs the same for every reference whatever the number of references. The best and second best references of each column are kept for the traceback
+    """
+    cdef Py_ssize_t cols = len_read + 1
+    cdef Py_ssize_t rows, table_start
+    cdef int idx_read, idx_ref, ref_idx, source_ref, jump_source_score
+    cdef int* score
+    for ref_idx in range(num_refs):
+        rows = refs[ref_idx].len + 1
+        table_start = ref_rows_before[ref_idx]*cols
+        score = ws.score + table_start
+        _init_score_column(refs[ref_idx].len, params, score, NULL)
+        for idx_ref in range(rows):
+            _set_pointer(ws.pointer, table_start + idx_ref, pointer_gap_ref)
+        for idx_read in range(cols):
+            score[idx_read*rows] = _perimeter_score(idx_read, params)
+            _set_pointer(ws.pointer, table_start + idx_read*rows, pointer_gap_read)
+            ws.colmaxes[ref_idx*cols + idx_read] = score[idx_read*rows]
+            ws.colmaxesInd[ref_idx*cols + idx_read] = 0
+
+    for idx_read in range(1,len_read+1):
+        _set_panel_jump_sources(num_refs, ws.colmaxes + idx_read-1, cols, &ws.best_refs[idx_read-1], &ws.second_refs[idx_read-1])
+        for ref_idx in range(num_refs):
+            rows = refs[ref_idx].len + 1
+            table_start = ref_rows_before[ref_idx]*cols + idx_read*rows
+            score = ws.score + table_start
+            source_ref = _get_panel_jump_source(ref_idx, ws.best_refs[idx_read-1], ws.second_refs[idx_read-1])
+            jump_source_score = no_jump_score
+            if source_ref >= 0:
+                jump_source_score = ws.colmaxes[source_ref*cols + idx_read-1]
+            _fill_column_vec(idx_read, read_seq[idx_read-1], len_read, &refs[ref_idx], params, jump_source_score,
+                    score - rows, score, ws.pointer_col, &ws.colmaxes[ref_idx*cols + idx_read], &ws.colmaxesInd[ref_idx*cols + idx_read])
+            _pack_pointers(ws.pointer, table_start + 1, ws.pointer_col + 1, rows - 1)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _traceback_panel(const unsigned char* read_seq, int len_read, const RefInfo* refs, int num_refs,
+        const int* ref_rows_before, const PanelWorkspace* ws, PanelTracebackResult* result) noexcept nogil:
+    """
+    Traces through an optimal alignment in the tables filled by _fill_panel_tables, like _traceback
+    The alignment ends in the reference with the best bottom right cell (ties go to the first reference)
+
+    returns:
+        0 on success, -1 if buffers could not be allocated
+    """
+    cdef Py_ssize_t cols = len_read + 1
+    cdef int idx_read, idx_ref, curr_ref, start_ref, ref_idx, end_score
+    cdef int aln_len = 0
+    cdef int num_breakpoints = 0
+    cdef int aln_pos, bp_pos
+    cdef char this_pointer
+    cdef char* ref_aln
+
+    start_ref = 0
+    result.aln_score = ws.score[(ref_rows_before[0] + refs[0].len + 1)*cols - 1]
+    for ref_idx in range(1,num_refs):
+        end_score = ws.score[(ref_rows_before[ref_idx] + refs[ref_idx].len + 1)*cols - 1]
+        if end_score > result.aln_score:
+            start_ref = ref_idx
+            result.aln_score = end_score
+
+    #first pass - count alignment length and breakpoints
+    idx_read = len_read
+    idx_ref = refs[start_ref].len
+    curr_ref = start_ref
+    while idx_read > 0 or idx_ref > 0:
+        this_pointer = _get_pointer(ws.pointer, ref_rows_before[curr_ref]*cols + idx_read*(refs[curr_ref].len+1) + idx_ref)
+        aln_len += 1
+        if this_pointer == pointer_match:
+            idx_read -= 1
+            idx_ref -= 1
+        elif this_pointer == pointer_gap_read:
+            idx_read -= 1
+        elif this_pointer == pointer_gap_ref:
+            idx_ref -= 1
+        elif this_pointer == pointer_jump:
+            idx_read -= 1
+            num_breakpoints += 1
+            curr_ref = _get_panel_jump_source(curr_ref, ws.best_refs[idx_read], ws.second_refs[idx_read])
+            idx_ref = ws.colmaxesInd[curr_ref*cols + idx_read]
+
+    result.aln_len = aln_len
+    result.num_breakpoints = num_breakpoints
+    result.num_refs = num_refs
+    result.read_aln = <char*> malloc((num_refs + 1)*aln_len + 1)
+    result.breakpoints_read = <int*> malloc((4*num_breakpoints + 1) * sizeof(int))
+    if result.read_aln == NULL or result.breakpoints_read == NULL:
+        free(result.read_aln)
+        free(result.breakpoints_read)
+        result.read_aln = NULL
+        result.breakpoints_read = NULL
+        return -1
+    result.ref_alns = result.read_aln + aln_len
+    memset(result.ref_alns, b' ', num_refs*aln_len)
+    result.breakpoints_ref_from = result.breakpoints_read + num_breakpoints
+    result.breakpoints_ref_to = result.breakpoints_read + 2*num_breakpoints
+    result.read_path = result.breakpoints_read + 3*num_breakpoints
+
+    #second pass - fill alignment from the end
+    idx_read = len_read
+    idx_ref = refs[start_ref].len
+    curr_ref = start_ref
+    aln_pos = aln_len
+    bp_pos = num_breakpoints
+    result.read_path[bp_pos] = curr_ref + 1
+    while idx_read > 0 or idx_ref > 0:
+        aln_pos -= 1
+        this_pointer = _get_pointer(ws.pointer, ref_rows_before[curr_ref]*cols + idx_read*(refs[curr_ref].len+1) + idx_ref)
+        ref_aln = result.ref_alns + curr_ref*aln_len
+        if this_pointer == pointer_gap_read:
+            ref_aln[aln_pos] = b'-'
+        else:
+            ref_aln[aln_pos] = refs[curr_ref].seq[idx_ref-1]
+
+        if this_pointer == pointer_gap_ref:
+            result.read_aln[aln_pos] = b'-'
+            idx_ref -= 1
+        else:
+            result.read_aln[aln_pos] = read_seq[idx_read-1]
+            idx_read -= 1
+            if this_pointer == pointer_match:
+                idx_ref -= 1
+            elif this_pointer == pointer_jump:
+                bp_pos -= 1
+                result.breakpoints_read[bp_pos] = idx_read
+                result.breakpoints_ref_to[bp_pos] = idx_ref-1
+                curr_ref = _get_panel_jump_source(curr_ref, ws.best_refs[idx_read], ws.second_refs[idx_read])
+                idx_ref = ws.colmaxesInd[curr_ref*cols + idx_read]
+                result.breakpoints_ref_from[bp_pos] = idx_ref
+                result.read_path[bp_pos] = curr_ref + 1
+    return 0
+
+
+cdef void _free_panel_traceback_result(PanelTracebackResult* result) noexcept nogil:
+    free(result.read_aln)
+    free(result.breakpoints_read)
+    result.read_aln = NULL
+    result.breakpoints_read = NULL
+
+
+cdef dict _panel_traceback_result_to_dict(const PanelTracebackResult* result):
+    """
+    Converts a panel traceback result to the dict returned by nw_breakpoint_panel
+    """
+    cdef int num_breakpoints = result.num_breakpoints
+    cdef int aln_len = result.aln_len
+    return({
+        "read_aln":_aln_str(result.read_aln, aln_len),
+        "ref_alns":[_aln_str(result.ref_alns + ref_idx*aln_len, aln_len) for ref_idx in range(result.num_refs)],
+        "breakpoints_read":[result.breakpoints_read[i] for i in range(num_breakpoints)],
+        "breakpoints_ref_from":[result.breakpoints_ref_from[i] for i in range(num_breakpoints)],
+        "breakpoints_ref_to":[result.breakpoints_ref_to[i] for i in range(num_breakpoints)],
+        "aln_score":result.aln_score,
+        "read_path":[result.read_path[i] for i in range(num_breakpoints+1)]
+        })
+
+
+#operations of compact alignments (see _encode_operations), each stored as (run length << 2) | operation
+cdef enum:
+    op_match = 0 #read bases aligned to reference bases (matches or mismatches)
+    op_insertion = 1 #read bases aligned to gaps in the reference
+    op_deletion = 2 #reference bases aligned to gaps in the read
+    op_jump = 3 #jump to the next segment of the path (run length 0)
+
+#CIGAR character of each operation
+cdef str operation_chars = 'MID'
+
+
+cdef struct SegmentInfo:
+    #the reference of one segment of the path of an alignment
+    const unsigned char* ref_seq
+    int ref_len
+    char* ref_aln
+    char* other_ref_aln
+    int ref_pos #position in the reference at which the segment starts
+    int ref_end #position in the reference at which the segment jumps to the next segment (-1 for the last segment)
+
+
+cdef void _get_segment_info(const TracebackResult* result, int segment, const unsigned char* ref1_seq, int len_ref1,
+        const unsigned char* ref2_seq, int len_ref2, char* ref1_aln, char* ref2_aln, SegmentInfo* info) noexcept nogil:
+    """
+    Sets the reference of a segment of the path of an alignment, which starts where the jump before it lands (or at the start of the reference) and ends where the jump after it leaves
+    """
+    cdef const int* breakpoints_ref
+    if result.read_path[segment] == 1:
+        info.ref_seq = ref1_seq
+        info.ref_len = len_ref1
+        info.ref_aln = ref1_aln
+        info.other_ref_aln = ref2_aln
+        breakpoints_ref = result.breakpoints_ref1
+    else:
+        info.ref_seq = ref2_seq
+        info.ref_len = len_ref2
+        info.ref_aln = ref2_aln
+        info.other_ref_aln = ref1_aln
+        breakpoints_ref = result.breakpoints_ref2
+    info.ref_pos = 0 if segment == 0 else breakpoints_ref[segment-1]
+    info.ref_end = breakpoints_ref[segment] if segment < result.num_breakpoints else -1
+
+
+cdef int _encode_operations(const TracebackResult* result, const unsigned char* read_seq, int len_read,
+        const unsigned char* ref1_seq, int len_ref1, const unsigned char* ref2_seq, int len_ref2, int* ops) noexcept nogil:
+    """
+    Run-length encodes the columns of an alignment as the operations of each segment of its path, separated by jumps, into ops (which must have room for aln_len + num_breakpoints operations)
+    Every column is checked against the read and reference sequences, so that _decode_operations gives back exactly the same alignment
+    Returns the number of operations, or -1 if the alignment can't be encoded
+    """
+    cdef SegmentInfo info
+    cdef int segment = 0
+    cdef int num_ops = 0
+    cdef int run_op = -1
+    cdef int run_len = 0
+    cdef int read_pos = 0
+    cdef int col, op
+    cdef char read_char, ref_char
+    _get_segment_info(result, 0, ref1_seq, len_ref1, ref2_seq, len_ref2, result.ref1_aln, result.ref2_aln, &info)
+    for col in range(result.aln_len + 1):
+        #a segment ends once it has aligned all of its read and reference bases (segments may be empty)
+        while segment < result.num_breakpoints and read_pos == result.breakpoints_read[segment] and info.ref_pos == info.ref_end:
+            if run_len > 0:
+                ops[num_ops] = (run_len << 2) | run_op
+                num_ops += 1
+            run_len = 0
+            ops[num_ops] = op_jump
+            num_ops += 1
+            segment += 1
+            _get_segment_info(result, segment, ref1_seq, len_ref1, ref2_seq, len_ref2, result.ref1_aln, result.ref2_aln, &info)
+        if col == result.aln_len:
+            break
+        read_char = result.read_aln[col]
+        ref_char = info.ref_aln[col]
+        if info.other_ref_aln[col] != b' ':
+            return -1
+        if read_char == b'-':
+            if ref_char == b'-':
+                return -1
+            op = op_deletion
+        elif ref_char == b'-':
+            op = op_insertion
+        else:
+            op = op_match
+        if read_char != b'-':
+            if read_pos >= len_read or read_seq[read_pos] != read_char:
+                return -1
+            read_pos += 1
+        if ref_char != b'-':
+            if info.ref_pos < 0 or info.ref_pos >= info.ref_len or info.ref_seq[info.ref_pos] != ref_char:
+                return -1
+            info.ref_pos += 1
+        if op == run_op and run_len > 0:
+            run_len += 1
+        else:
+            if run_len > 0:
+                ops[num_ops] = (run_len << 2) | run_op
+                num_ops += 1
+            run_op = op
+            run_len = 1
+    if run_len > 0:
+        ops[num_ops] = (run_len << 2) | run_op
+        num_ops += 1
+    if segment != result.num_breakpoints or read_pos != len_read:
+        return -1
+    return num_ops
+
+
+cdef void _decode_operations(const int* ops, int num_ops, const TracebackResult* result, const unsigned char* read_seq,
+        const unsigned char* ref1_seq, int len_ref1, const unsigned char* ref2_seq, int len_ref2,
+        char* read_aln, char* ref1_aln, char* ref2_aln) noexcept nogil:
+    """
+    Fills the alignment buffers (aln_len characters each) of an alignment encoded by _encode_operations
+    """
+    cdef SegmentInfo info
+    cdef int segment = 0
+    cdef int read_pos = 0
+    cdef int col = 0
+    cdef int i, op, run_len
+    memset(ref1_aln, b' ', result.aln_len)
+    memset(ref2_aln, b' ', result.aln_len)
+    _get_segment_info(result, 0, ref1_seq, len_ref1, ref2_seq, len_ref2, ref1_aln, ref2_aln, &info)
+    for i in range(num_ops):
+        op = ops[i] & 3
+        run_len = ops[i] >> 2
+        if op == op_jump:
+            segment += 1
+            _get_segment_info(result, segment, ref1_seq, len_ref1, ref2_seq, len_ref2, ref1_aln, ref2_aln, &info)
+            continue
+        if op == op_deletion:
+            memset(read_aln + col, b'-', run_len)
+        else:
+            memcpy(read_aln + col, read_seq + read_pos, run_len)
+            read_pos += run_len
+        if op == op_insertion:
+            memset(info.ref_aln + col, b'-', run_len)
+        else:
+            memcpy(info.ref_aln + col, info.ref_seq + info.ref_pos, run_len)
+            info.ref_pos += run_len
+        col += run_len
+
+
+cdef list _get_segments(const TracebackResult* result, const int* ops, int num_ops):
+    """
+    Returns the segments of an alignment encoded by _encode_operations as a list of tuples of (reference index, start position in the reference, CIGAR string)
+    """
+    segments = []
+    cigar = []
+    cdef int segment = 0
+    cdef int ref_start = 0
+    cdef int i
+    for i in range(num_ops + 1):
+        if i == num_ops or ops[i] & 3 == op_jump:
+            if segment > 0:
+                if result.read_path[segment] == 1:
+                    ref_start = result.breakpoints_ref1[segment-1]
+                else:
+                    ref_start = result.breakpoints_ref2[segment-1]
+            segments.append((result.read_path[segment], ref_start, ''.join(cigar)))
+            cigar = []
+            segment += 1
+        else:
+            cigar.append(str(ops[i] >> 2) + operation_chars[ops[i] & 3])
+    return segments
+
+
+#status codes of alignment results
+ALIGNMENT_STATUS_ALIGNED = align_ok
+ALIGNMENT_STATUS_BELOW_MIN_SCORE = below_min_score
+
+#value of integer fields of result arrays that are not set (e.g. the breakpoints of an alignment without breakpoints)
+MISSING_VALUE = INT_MIN
+
+#one row of the array filled by ReferencePair.align_batch_array
+ALIGNMENT_RESULT_DTYPE = np.dtype([
+    ('status', np.int8),
+    ('aln_score', np.int32),
+    ('num_breakpoints', np.int32),
+    ('first_breakpoint_read', np.int32),
+    ('first_breakpoint_ref1', np.int32),
+    ('first_breakpoint_ref2', np.int32),
+    ('last_breakpoint_read', np.int32),
+    ('last_breakpoint_ref1', np.int32),
+    ('last_breakpoint_ref2', np.int32),
+    ('path_start', np.int8),
+    ('path_end', np.int8),
+    ])
+
+ALIGNMENT_RESULT_KEYS = ("read_aln", "ref1_aln", "ref2_aln", "breakpoints_read", "breakpoints_ref1", "breakpoints_ref2", "aln_score", "read_path")
+
+
+cdef class AlignmentResult:
+    """
+    The alignment of a read to two references, stored as the breakpoints and path of the traceback and a compact list of operations: the run lengths of matches, insertions and deletions of each segment of the path, separated by jumps (see segments).
+    The alignment buffers and Python strings and lists are only made for the fields that are read, so that callers that only look at the score, the number of breakpoints, the path or the segments do not pay for them (or keep them in memory).
+    Fields can be read as attributes, or by key like the dict returned by nw_breakpoint (see to_dict)
+    The alignment buffers can also be read without copying them through the buffer protocol, as a read-only 3 x aln_len array of characters (one row each for read_aln, ref1_aln and ref2_aln), e.g. np.asarray(result) (dtype S1) or np.asarray(result).view(np.uint8)
+    """
+    cdef TracebackResult result #read_aln is NULL until the alignment buffers are made
+    cdef readonly int status
+    cdef str read_seq
+    cdef bytes ref1_seq_bytes
+    cdef bytes ref2_seq_bytes
+    cdef int* ops #NULL if the alignment is kept in its buffers (see _make_alignment_result)
+    cdef int num_ops
+    cdef Py_ssize_t buffer_shape[2]
+    cdef Py_ssize_t buffer_strides[2]
+
+    def __cinit__(self):
+        self.result.read_aln = NULL
+        self.result.breakpoints_read = NULL
+        self.result.num_breakpoints = 0
+        self.status = align_ok
+        self.ops = NULL
+        self.num_ops = 0
+
+    def __dealloc__(self):
+        _free_traceback_result(&self.result)
+        free(self.ops)
+
+    @property
+    def aligned(self):
+        return self.status == align_ok
+
+    @property
+    def num_breakpoints(self):
+        return self.result.num_breakpoints
+
+    @property
+    def aln_score(self):
+        if self.status != align_ok:
+            return None
+        return self.result.aln_score
+
+    @property
+    def read_aln(self):
+        if self.status != align_ok:
+            return self.read_seq
+        self._make_buffers()
+        return _aln_str(self.result.read_aln, self.result.aln_len)
+
+    @property
+    def ref1_aln(self):
+        if self.status != align_ok:
+            return " " * len(self.read_seq)
+        self._make_buffers()
+        return _aln_str(self.result.ref1_aln, self.result.aln_len)
+
+    @property
+    def ref2_aln(self):
+        if self.status != align_ok:
+            return " " * len(self.read_seq)
+        self._make_buffers()
+        return _aln_str(self.result.ref2_aln, self.result.aln_len)
+
+    @property
+    def segments(self):
+        """
+        The segments of the path of the alignment, as a list of tuples of (reference index (1 or 2), position in the reference at which the segment starts, CIGAR string of the segment (with M for read bases aligned to reference bases, I for insertions and D for deletions))
+        Segments are separated by the jumps given by the breakpoints, and may be empty ('' CIGAR)
+        """
+        if self.status != align_ok:
+            return []
+        if self.ops == NULL:
+            raise ValueError('alignment is not stored as operations')
+        return _get_segments(&self.result, self.ops, self.num_ops)
+
+    @property
+    def breakpoints_read(self):
+        return [self.result.breakpoints_read[i] for i in range(self.result.num_breakpoints)]
+
+    @property
+    def breakpoints_ref1(self):
+        return [self.result.breakpoints_ref1[i] for i in range(self.result.num_breakpoints)]
+
+    @property
+    def breakpoints_ref2(self):
+        return [self.result.breakpoints_ref2[i] for i in range(self.result.num_breakpoints)]
+
+    @property
+    def read_path(self):
+        if self.status != align_ok:
+            return []
+        return [self.result.read_path[i] for i in range(self.result.num_breakpoints+1)]
+
+    def __getitem__(self, key):
+        if key not in ALIGNMENT_RESULT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self):
+        return ALIGNMENT_RESULT_KEYS
+
+    def to_dict(self):
+        """
+        Returns the dict returned by nw_breakpoint for this alignment
+        """
+        if self.status != align_ok:
+            return _get_below_min_score_dict(self.read_seq)
+        self._make_buffers()
+        return _traceback_result_to_dict(&self.result)
+
+    cdef int _make_buffers(self) except -1:
+        """
+        Makes the alignment buffers from the operations of the alignment (or of a read that was not aligned, see _fill_unaligned_buffers) if they haven't been made yet
+        """
+        if self.result.read_aln != NULL:
+            return 0
+        if self.status != align_ok:
+            return self._fill_unaligned_buffers()
+        cdef bytes read_seq_bytes = self.read_seq.encode()
+        self.result.read_aln = <char*> malloc(3*self.result.aln_len + 1)
+        if self.result.read_aln == NULL:
+            raise MemoryError()
+        self.result.ref1_aln = self.result.read_aln + self.result.aln_len
+        self.result.ref2_aln = self.result.read_aln + 2*self.result.aln_len
+        _decode_operations(self.ops, self.num_ops, &self.result, <const unsigned char*> read_seq_bytes,
+                <const unsigned char*> self.ref1_seq_bytes, len(self.ref1_seq_bytes), <const unsigned char*> self.ref2_seq_bytes, len(self.ref2_seq_bytes),
+                self.result.read_aln, self.result.ref1_aln, self.result.ref2_aln)
+        return 0
+
+    cdef int _fill_unaligned_buffers(self) except -1:
+        """
+        Fills the alignment buffers of a read that was not aligned with the read and blank reference alignments (see _get_below_min_score_dict)
+        """
+        cdef bytes read_seq_bytes = self.read_seq.encode()
+        cdef Py_ssize_t len_read = len(read_seq_bytes)
+        self.result.read_aln = <char*> malloc(3*len_read + 1)
+        if self.result.read_aln == NULL:
+            raise MemoryError()
+        self.result.ref1_aln = self.result.read_aln + len_read
+        self.result.ref2_aln = self.result.read_aln + 2*len_read
+        memcpy(self.result.read_aln, <const char*> read_seq_bytes, len_read)
+        memset(self.result.ref1_aln, b' ', 2*len_read)
+        self.result.aln_len = len_read
+        return 0
+
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        if flags & PyBUF_WRITABLE:
+            raise BufferError('alignment buffers are read-only')
+        self._make_buffers()
+        self.buffer_shape[0] = 3
+        self.buffer_shape[1] = self.result.aln_len
+        self.buffer_strides[0] = self.result.aln_len
+        self.buffer_strides[1] = 1
+        buffer.buf = self.result.read_aln
+        buffer.format = b'c'
+        buffer.internal = NULL
+        buffer.itemsize = 1
+        buffer.len = 3*self.result.aln_len
+        buffer.ndim = 2
+        buffer.obj = self
+        buffer.readonly = 1
+        buffer.shape = self.buffer_shape
+        buffer.strides = self.buffer_strides
+        buffer.suboffsets = NULL
+
+    def __releasebuffer__(self, Py_buffer* buffer):
+        pass
+
+    def __repr__(self):
+        return 'AlignmentResult(' + repr(self.to_dict()) + ')'
+
+
+cdef AlignmentResult _make_alignment_result(str read_seq, int status, TracebackResult* result, bytes ref1_seq_bytes, bytes ref2_seq_bytes):
+    """
+    Returns an AlignmentResult for a read, taking over the breakpoints of result if the read was aligned (result no longer owns them)
+    The alignment buffers of result are encoded as operations and freed, unless the alignment can't be encoded (see _encode_operations), in which case the AlignmentResult takes them over too
+    """
+    cdef AlignmentResult aln_result = AlignmentResult.__new__(AlignmentResult)
+    aln_result.read_seq = read_seq
+    aln_result.status = status
+    if status != align_ok:
+        return aln_result
+    aln_result.ref1_seq_bytes = ref1_seq_bytes
+    aln_result.ref2_seq_bytes = ref2_seq_bytes
+    aln_result.result = result[0]
+    result.read_aln = NULL
+    result.breakpoints_read = NULL
+    cdef bytes read_seq_bytes = read_seq.encode()
+    cdef int* ops = <int*> malloc((aln_result.result.aln_len + aln_result.result.num_breakpoints + 1) * sizeof(int))
+    if ops == NULL:
+        return aln_result
+    cdef int num_ops = _encode_operations(&aln_result.result, <const unsigned char*> read_seq_bytes, len(read_seq_bytes),
+            <const unsigned char*> ref1_seq_bytes, len(ref1_seq_bytes), <const unsigned char*> ref2_seq_bytes, len(ref2_seq_bytes), ops)
+    if num_ops < 0:
+        free(ops)
+        return aln_result
+    aln_result.ops = <int*> realloc(ops, max(num_ops, 1) * sizeof(int))
+    if aln_result.ops == NULL:
+        aln_result.ops = ops
+    aln_result.num_ops = num_ops
+    free(aln_result.result.read_aln)
+    aln_result.result.read_aln = NULL
+    return aln_result
+
+
+cdef void _fill_alignment_row(int status, const TracebackResult* result, signed char* row_status, int* aln_score, int* num_breakpoints,
+        int* first_breakpoints, int* last_breakpoints, signed char* path_ends) noexcept nogil:
+    """
+    Sets the fields of one row of an ALIGNMENT_RESULT_DTYPE array from a traceback result
+    first_breakpoints and last_breakpoints are the (read, ref1, ref2) breakpoints, path_ends the start and end of the path
+    """
+    cdef int last
+    row_status[0] = status
+    aln_score[0] = INT_MIN
+    num_breakpoints[0] = 0
+    first_breakpoints[0] = first_breakpoints[1] = first_breakpoints[2] = INT_MIN
+    last_breakpoints[0] = last_breakpoints[1] = last_breakpoints[2] = INT_MIN
+    path_ends[0] = path_ends[1] = 0
+    if status != 0:
+        return
+    aln_score[0] = result.aln_score
+    num_breakpoints[0] = result.num_breakpoints
+    path_ends[0] = result.read_path[0]
+    path_ends[1] = result.read_path[result.num_breakpoints]
+    if result.num_breakpoints > 0:
+        last = result.num_breakpoints - 1
+        first_breakpoints[0] = result.breakpoints_read[0]
+        first_breakpoints[1] = result.breakpoints_ref1[0]
+        first_breakpoints[2] = result.breakpoints_ref2[0]
+        last_breakpoints[0] = result.breakpoints_read[last]
+        last_breakpoints[1] = result.breakpoints_ref1[last]
+        last_breakpoints[2] = result.breakpoints_ref2[last]
+
+
+cdef class _AlignedBatch:
+    """
+    The traceback results of a batch of reads aligned by ReferencePair._align_batch, freed with the batch
+    """
+    cdef Py_ssize_t num_reads
+    cdef int* statuses
+    cdef TracebackResult* results
+
+    def __cinit__(self, Py_ssize_t num_reads):
+        self.num_reads = num_reads
+        self.statuses = <int*> malloc(max(num_reads, 1) * sizeof(int))
+        self.results = <TracebackResult*> malloc(max(num_reads, 1) * sizeof(TracebackResult))
+        if self.statuses == NULL or self.results == NULL:
+            raise MemoryError()
+        cdef Py_ssize_t i
+        for i in range(num_reads):
+            self.statuses[i] = -1
+            self.results[i].read_aln = NULL
+            self.results[i].breakpoints_read = NULL
+
+    def __dealloc__(self):
+        cdef Py_ssize_t i
+        if self.results != NULL:
+            for i in range(self.num_reads):
+                _free_traceback_result(&self.results[i])
+        free(self.statuses)
+        free(self.results)
+
+    cdef void check_statuses(self) except *:
+        cdef Py_ssize_t i
+        for i in range(self.num_reads):
+            if self.statuses[i] != 0 and self.statuses[i] != below_min_score:
+                raise MemoryError()
+
+
+#translocation analysis of alignments (a compiled version of ChromBridGE_tx.get_tx_result, which is kept as the reference implementation)
+#tx status codes (same as ChromBridGE_tx.TxStatus)
+cdef enum:
+    tx_unknown = 0
+    tx_not_aligned = 1
+    tx_no_breakpoints = 2
+    tx_multiple_breakpoints = 3
+    tx_invalid_breakpoints = 4
+    tx_a_b = 5
+    tx_b_a = 6
+    tx_incompatible_breakpoints = 7
+
+#tx status strings of each code (see ChromBridGE_tx.get_tx_status_str)
+TX_STATUS_STRS = ('', 'Not aligned (score below min_score)', 'No breakpoints detected', 'Multiple breakpoints detected',
+        'Valid breakpoints could not be identified', 'Tx A>B', 'Tx B>A', 'Breakpoints incompatible with given cuts')
+
+cdef struct TxParams:
+    bint has_ref1_cut_pos
+    bint has_ref2_cut_pos
+    int ref1_cut_pos
+    int ref2_cut_pos
+    int min_num_bases_beyond_cut
+    int min_num_bases_before_cut
+    int mismatch_tolerance
+    int gap_tolerance
+
+cdef struct TxAlignment:
+    #the alignment and the breakpoints of a read, of which the translocation analysis only uses the first and last breakpoints and the ends of the path
+    const char* read_aln
+    const char* ref1_aln
+    const char* ref2_aln
+    int aln_len
+    int path_len #0 if the read was not aligned
+    int path_start
+    int path_end
+    int first_breakpoint_read
+    int first_breakpoint_ref1
+    int first_breakpoint_ref2
+    int last_breakpoint_read
+    int last_breakpoint_ref1
+    int last_breakpoint_ref2
+
+cdef struct TxOffset:
+    #see ChromBridGE_tx.get_tx_offset
+    int num_bases_beyond_cut
+    int num_bases_before_cut
+    int num_bases_offset
+    bint found_break
+    int breakpoint_in_aln
+    int breakpoint_in_ref
+
+cdef struct TxSummary:
+    #fields of ChromBridGE_tx.TxResult, with INT_MIN for fields that are None
+    int status
+    bint is_tx
+    int final_path_start #0 if there is no final path
+    int final_path_end
+    int final_breakpoint_ref1
+    int final_breakpoint_ref2
+    int bp_match_ref1
+    int bp_match_ref2
+    int left_dist
+    int right_dist
+    int tx_lucky_insertions
+    int marked_start #positions marked with '~' in final_ref1_str and final_ref2_str (range(marked_start, marked_end), none if marked_end <= marked_start)
+    int marked_end
+
+
+cdef inline int _aln_char(const char* aln, int aln_len, Py_ssize_t idx) noexcept nogil:
+    """
+    Returns the character at idx of an alignment, counting negative indices from the end like Python strings, or -1 if idx is out of range
+    """
+    if idx < 0:
+        idx += aln_len
+    if idx < 0 or idx >= aln_len:
+        return -1
+    return aln[idx]
+
+
+cdef int _get_first_matching_pos(const char* read_aln, const char* ref_aln, int aln_len,
+        int aln_idx_break, int read_idx_break, int ref_idx_break, int num_bases_to_check, int increment, int* match_pos) noexcept nogil:
+    """
+    Finds the first position from a break where num_bases_to_check bases of the read and ref match exactly (see ChromBridGE_tx.get_first_matching_pos)
+    Returns 1 and sets match_pos to the (aln, read, ref) indices of the match if it is found, 0 if it is not found, or -1 if the alignment is indexed out of range
+    """
+    cdef int stop_idx = num_bases_to_check - 2
+    cdef int left_right_adjustment = -1
+    if increment > 0:
+        stop_idx = aln_len - num_bases_to_check + 1
+        left_right_adjustment = 0
+    cdef int curr_aln_idx = aln_idx_break + left_right_adjustment
+    cdef int curr_read_idx = read_idx_break
+    cdef int curr_ref_idx = ref_idx_break
+    cdef int offset, ref_char, read_char
+    cdef bint bases_match
+    while (stop_idx - curr_aln_idx) * increment > 0:
+        bases_match = True
+        for offset in range(num_bases_to_check):
+            ref_char = _aln_char(ref_aln, aln_len, curr_aln_idx + offset * increment)
+            if ref_char == -1:
+                return -1
+            if ref_char == b' ':
+                return 0
+            if ref_char != _aln_char(read_aln, aln_len, curr_aln_idx + offset * increment):
+                bases_match = False
+                break
+        if bases_match:
+            match_pos[0] = curr_aln_idx - left_right_adjustment
+            match_pos[1] = curr_read_idx
+            match_pos[2] = curr_ref_idx
+            return 1
+        curr_aln_idx += increment
+        ref_char = _aln_char(ref_aln, aln_len, curr_aln_idx)
+        read_char = _aln_char(read_aln, aln_len, curr_aln_idx)
+        if ref_char == -1:
+            #stepped past the end of the alignment, where there are no more bases to check
+            return 0
+        if ref_char != b'-':
+            curr_ref_idx += increment
+        if read_char != b'-':
+            curr_read_idx += increment
+    return 0
+
+
+cdef int _get_last_matching_pos(const char* read_aln, const char* ref_aln, int aln_len,
+        int aln_idx_break, int increment, int mismatch_tolerance, int gap_tolerance, int* match_counts) noexcept nogil:
+    """
+    Counts the bases from a break until the mismatch or gap tolerance is exceeded (see ChromBridGE_tx.get_last_matching_pos)
+    Sets match_counts to the (aln, read, ref) bases counted, and returns 0, or -1 if the alignment is indexed out of range
+    """
+    cdef int stop_idx = -1
+    cdef int left_right_adjustment = -1
+    if increment > 0:
+        stop_idx = aln_len
+        left_right_adjustment = 0
+    cdef int curr_aln_idx = aln_idx_break + left_right_adjustment
+    cdef int gap_count = 0
+    cdef int mismatch_count = 0
+    cdef int ref_char, read_char
+    match_counts[0] = match_counts[1] = match_counts[2] = 0
+    while curr_aln_idx != stop_idx:
+        ref_char = _aln_char(ref_aln, aln_len, curr_aln_idx)
+        read_char = _aln_char(read_aln, aln_len, curr_aln_idx)
+        if ref_char == -1:
+            return -1
+        if ref_char == b' ':
+            return 0
+        if ref_char == b'-' or read_char == b'-':
+            gap_count += 1
+            if gap_count > gap_tolerance:
+                return 0
+        if ref_char != read_char:
+            mismatch_count += 1
+            if mismatch_count > mismatch_tolerance:
+                return 0
+        if ref_char != b'-':
+            match_counts[2] += 1
+        if read_char != b'-':
+            match_counts[1] += 1
+        match_counts[0] += 1
+        curr_aln_idx += increment
+    return 0
+
+
+cdef int _get_ref_cut_pos_in_aln(const char* read_aln, const char* ref_aln, int aln_len,
+        int aln_idx_break, int read_idx_break, int ref_idx_break, int ref_cut_pos, int* cut_pos) noexcept nogil:
+    """
+    Finds the index in the alignment and the read of the reference cut position (see ChromBridGE_tx.get_ref_cut_pos_in_aln)
+    Returns 1 and sets cut_pos to the (aln, read) indices if they are found, 0 if the alignment reaches a space before the cut position, or -1 if the alignment is indexed out of range
+    """
+    cdef int increment = -1 if ref_cut_pos < ref_idx_break else 1
+    cdef int curr_pos_in_ref = ref_idx_break
+    cdef int curr_pos_in_aln = aln_idx_break
+    cdef int curr_pos_in_read = read_idx_break
+    cdef int ref_char, read_char
+    while curr_pos_in_ref != ref_cut_pos:
+        curr_pos_in_aln += increment
+        ref_char = _aln_char(ref_aln, aln_len, curr_pos_in_aln)
+        read_char = _aln_char(read_aln, aln_len, curr_pos_in_read)
+        if ref_char == -1 or read_char == -1:
+            return -1
+        if ref_char != b'-':
+            curr_pos_in_ref += increment
+        if read_char != b'-':
+            curr_pos_in_read += increment
+        if ref_char == b' ':
+            return 0
+    cut_pos[0] = curr_pos_in_aln
+    cut_pos[1] = curr_pos_in_read
+    return 1
+
+
+cdef int _get_tx_offset(const char* read_aln, const char* ref_aln, int aln_len,
+        int aln_idx_break, int read_idx_break, int ref_idx_break, bint has_ref_cut_pos, int ref_cut_pos, int direction,
+        const TxParams* params, TxOffset* offset) noexcept nogil:
+    """
+    Gets the possible offset for translocation before or after a cut (see ChromBridGE_tx.get_tx_offset)
+    Returns 0, or -1 if the alignment is indexed out of range
+    """
+    cdef int cut_pos[2]
+    cdef int match_pos[3]
+    cdef int match_counts[3]
+    cdef int found
+    offset.found_break = False
+    offset.breakpoint_in_aln = 0
+    offset.breakpoint_in_ref = 0
+    offset.num_bases_beyond_cut = -1
+    offset.num_bases_before_cut = -1
+    if has_ref_cut_pos:
+        found = _get_ref_cut_pos_in_aln(read_aln, ref_aln, aln_len, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos, cut_pos)
+        if found == -1:
+            return -1
+        if found == 1:
+            if _get_last_matching_pos(read_aln, ref_aln, aln_len, cut_pos[0], -1*direction,
+                    params.mismatch_tolerance, params.gap_tolerance, match_counts) == -1:
+                return -1
+            found = _get_first_matching_pos(read_aln, ref_aln, aln_len, cut_pos[0], cut_pos[1], ref_cut_pos,
+                    params.min_num_bases_before_cut, direction, match_pos)
+            if found == -1:
+                return -1
+            offset.num_bases_beyond_cut = match_counts[2]
+            if found == 1:
+                offset.num_bases_before_cut = match_pos[0] - cut_pos[0]
+                offset.found_break = True
+                if offset.num_bases_before_cut == 0 and offset.num_bases_beyond_cut >= params.min_num_bases_beyond_cut:
+                    offset.breakpoint_in_ref = ref_cut_pos + (-1*direction*offset.num_bases_beyond_cut)
+                    offset.breakpoint_in_aln = cut_pos[0] + (-1*direction*offset.num_bases_beyond_cut)
+                else:
+                    offset.breakpoint_in_aln = match_pos[0]
+                    offset.breakpoint_in_ref = match_pos[2]
+            else:
+                offset.breakpoint_in_aln = aln_idx_break
+                offset.breakpoint_in_ref = ref_idx_break
+        else:
+            found = _get_first_matching_pos(read_aln, ref_aln, aln_len, aln_idx_break, read_idx_break, ref_idx_break,
+                    params.min_num_bases_before_cut, direction, match_pos)
+            if found == -1:
+                return -1
+            if found == 1:
+                offset.found_break = True
+                offset.num_bases_beyond_cut = 0
+                offset.num_bases_before_cut = -1*direction*(ref_cut_pos - match_pos[2])
+                offset.breakpoint_in_aln = match_pos[0]
+                offset.breakpoint_in_ref = match_pos[2]
+            else:
+                offset.breakpoint_in_aln = aln_idx_break
+                offset.breakpoint_in_ref = ref_idx_break
+    else:
+        found = _get_first_matching_pos(read_aln, ref_aln, aln_len, aln_idx_break, read_idx_break, ref_idx_break,
+                params.min_num_bases_before_cut, direction, match_pos)
+        if found == -1:
+            return -1
+        if found == 1:
+            offset.breakpoint_in_aln = match_pos[0]
+            offset.num_bases_before_cut = direction*(offset.breakpoint_in_aln - aln_idx_break)
+            offset.breakpoint_in_ref = match_pos[2]
+            offset.found_break = True
+    offset.num_bases_offset = -1*offset.num_bases_before_cut
+    if offset.num_bases_before_cut == 0 and offset.num_bases_beyond_cut > 0:
+        offset.num_bases_offset = offset.num_bases_beyond_cut
+    return 0
+
+
+cdef int _get_read_ind_in_aln(const char* read_aln, int aln_len, int read_idx, int* aln_idx) noexcept nogil:
+    """
+    Sets aln_idx to the index in the alignment of base read_idx of the read (0 past the last base of the read, like read_ind_in_aln in ChromBridGE_tx.get_tx_result)
+    Returns 0, or -1 if read_idx is out of range
+    """
+    cdef int idx, num_bases = 0
+    if read_idx < 0:
+        read_idx += aln_len
+    if read_idx < 0 or read_idx >= aln_len:
+        return -1
+    aln_idx[0] = 0
+    for idx in range(aln_len):
+        if read_aln[idx] != b'-':
+            if num_bases == read_idx:
+                aln_idx[0] = idx
+                return 0
+            num_bases += 1
+    return 0
+
+
+cdef int _count_matches(const char* read_aln, const char* ref_aln, int start, int end) noexcept nogil:
+    """
+    Returns the number of positions in [start, end) where the read and ref alignments have the same character
+    """
+    cdef int idx, num_matches = 0
+    for idx in range(start, end):
+        num_matches += read_aln[idx] == ref_aln[idx]
+    return num_matches
+
+
+cdef int _analyze_tx(const TxAlignment* aln, const TxParams* params, TxSummary* summary) noexcept nogil:
+    """
+    Refines the breakpoints of an alignment and determines whether it is compatible with a translocation (see ChromBridGE_tx.get_tx_result)
+    Returns 0, or -1 if the alignment is indexed out of range (where ChromBridGE_tx raises an IndexError)
+    """
+    cdef TxOffset left_offset, right_offset
+    cdef const char* left_ref_aln
+    cdef const char* right_ref_aln
+    cdef int left_ref_idx_break, right_ref_idx_break, left_cut_pos, right_cut_pos
+    cdef bint has_left_cut_pos, has_right_cut_pos
+    cdef int left_aln_idx_break, right_aln_idx_break
+    cdef int marked_first, marked_last
+    cdef bint has_offsets = False
+    cdef int aln_len = aln.aln_len
+
+    summary.status = tx_unknown
+    summary.is_tx = False
+    summary.final_path_start = summary.final_path_end = 0
+    summary.final_breakpoint_ref1 = summary.final_breakpoint_ref2 = INT_MIN
+    summary.left_dist = summary.right_dist = INT_MIN
+    summary.tx_lucky_insertions = 0
+    summary.marked_start = summary.marked_end = 0
+
+    if aln.path_len > 0 and aln.path_start != aln.path_end and \
+            (aln.path_start == 1 or aln.path_start == 2) and (aln.path_end == 1 or aln.path_end == 2):
+        has_offsets = True
+        summary.final_path_start = aln.path_start
+        summary.final_path_end = aln.path_end
+        if aln.path_start == 1: # transition ref1 to ref2
+            left_ref_aln = aln.ref1_aln
+            left_ref_idx_break = aln.first_breakpoint_ref1
+            has_left_cut_pos = params.has_ref1_cut_pos
+            left_cut_pos = params.ref1_cut_pos
+            right_ref_aln = aln.ref2_aln
+            right_ref_idx_break = aln.last_breakpoint_ref2
+            has_right_cut_pos = params.has_ref2_cut_pos
+            right_cut_pos = params.ref2_cut_pos
+        else: #transition from ref2 to ref1
+            left_ref_aln = aln.ref2_aln
+            left_ref_idx_break = aln.first_breakpoint_ref2
+            has_left_cut_pos = params.has_ref2_cut_pos
+            left_cut_pos = params.ref2_cut_pos
+            right_ref_aln = aln.ref1_aln
+            right_ref_idx_break = aln.last_breakpoint_ref1
+            has_right_cut_pos = params.has_ref1_cut_pos
+            right_cut_pos = params.ref1_cut_pos
+        if _get_read_ind_in_aln(aln.read_aln, aln_len, aln.first_breakpoint_read, &left_aln_idx_break) == -1 or \
+                _get_read_ind_in_aln(aln.read_aln, aln_len, aln.last_breakpoint_read, &right_aln_idx_break) == -1:
+            return -1
+        if _get_tx_offset(aln.read_aln, left_ref_aln, aln_len, left_aln_idx_break, aln.first_breakpoint_read, left_ref_idx_break,
+                has_left_cut_pos, left_cut_pos, -1, params, &left_offset) == -1:
+            return -1
+        summary.left_dist = left_offset.num_bases_offset
+        if _get_tx_offset(aln.read_aln, right_ref_aln, aln_len, right_aln_idx_break, aln.last_breakpoint_read, right_ref_idx_break,
+                has_right_cut_pos, right_cut_pos, 1, params, &right_offset) == -1:
+            return -1
+        summary.right_dist = right_offset.num_bases_offset
+        if aln.path_start == 1:
+            if has_left_cut_pos:
+                summary.final_breakpoint_ref1 = left_offset.breakpoint_in_ref
+            if has_right_cut_pos:
+                summary.final_breakpoint_ref2 = right_offset.breakpoint_in_ref
+        else:
+            if has_left_cut_pos:
+                summary.final_breakpoint_ref2 = left_offset.breakpoint_in_ref
+            if has_right_cut_pos:
+                summary.final_breakpoint_ref1 = right_offset.breakpoint_in_ref
+
+    #positions between the refined breakpoints are marked with '~' in both references, and don't count as matches
+    summary.bp_match_ref1 = _count_matches(aln.read_aln, aln.ref1_aln, 0, aln_len)
+    summary.bp_match_ref2 = _count_matches(aln.read_aln, aln.ref2_aln, 0, aln_len)
+    if has_offsets and left_offset.found_break and right_offset.found_break and \
+            left_offset.breakpoint_in_aln < right_offset.breakpoint_in_aln:
+        summary.marked_start = left_offset.breakpoint_in_aln
+        summary.marked_end = right_offset.breakpoint_in_aln
+        if summary.marked_start < -aln_len or summary.marked_end > aln_len:
+            return -1
+        #negative positions count from the end like Python indices, so the marked positions may wrap around to the start
+        marked_first = summary.marked_start
+        marked_last = summary.marked_end
+        if marked_first < 0 and marked_last <= 0:
+            marked_first += aln_len
+            marked_last += aln_len
+        elif marked_first < 0:
+            if marked_last >= marked_first + aln_len:
+                marked_first = 0
+            else:
+                summary.bp_match_ref1 -= _count_matches(aln.read_aln, aln.ref1_aln, 0, marked_last)
+                summary.bp_match_ref2 -= _count_matches(aln.read_aln, aln.ref2_aln, 0, marked_last)
+                marked_first += aln_len
+            marked_last = aln_len
+        summary.bp_match_ref1 -= _count_matches(aln.read_aln, aln.ref1_aln, marked_first, marked_last)
+        summary.bp_match_ref2 -= _count_matches(aln.read_aln, aln.ref2_aln, marked_first, marked_last)
+
+    if aln.path_len == 0:
+        summary.status = tx_not_aligned
+    elif params.has_ref1_cut_pos and params.has_ref2_cut_pos:
+        if aln.path_len == 1:
+            summary.status = tx_no_breakpoints
+        elif aln.path_len > 2 and summary.final_path_start == 0:
+            summary.status = tx_multiple_breakpoints
+        elif summary.final_path_start == 0:
+            summary.status = tx_invalid_breakpoints
+        else:
+            summary.tx_lucky_insertions = max(summary.left_dist, 0) + max(summary.right_dist, 0)
+            if summary.final_path_start == 1:
+                if summary.final_breakpoint_ref1 <= params.ref1_cut_pos and summary.final_breakpoint_ref2 >= params.ref2_cut_pos:
+                    summary.is_tx = True
+                    summary.status = tx_a_b
+                else:
+                    summary.status = tx_incompatible_breakpoints
+            else:
+                if summary.final_breakpoint_ref2 <= params.ref2_cut_pos and summary.final_breakpoint_ref1 >= params.ref1_cut_pos:
+                    summary.is_tx = True
+                    summary.status = tx_b_a
+                else:
+                    summary.status = tx_incompatible_breakpoints
+    return 0
+
+
+cdef str _get_marked_aln_str(const char* aln, int aln_len, const TxSummary* summary):
+    """
+    Returns a reference alignment with the positions between the refined breakpoints marked with '~' (see TxSummary)
+    """
+    if summary.marked_end <= summary.marked_start:
+        return _aln_str(aln, aln_len)
+    cdef bytearray marked_aln = bytearray(aln[:aln_len])
+    cdef int idx
+    for idx in range(summary.marked_start, summary.marked_end):
+        marked_aln[idx] = 126 # '~'
+    return marked_aln.decode()
+
+
+cdef str _get_tx_status_str(int status, ref1_cut_pos, ref2_cut_pos):
+    if status == tx_unknown:
+        return 'Unknown/breakpoints not given (' + str(ref1_cut_pos) + ' and ' + str(ref2_cut_pos) + ')'
+    return TX_STATUS_STRS[status]
+
+
+cdef dict _tx_summary_to_dict(const TxAlignment* aln, const TxSummary* summary, str read_aln_str, ref1_cut_pos, ref2_cut_pos):
+    """
+    Converts a tx summary to the dict returned by ChromBridGE_tx.analyze_tx_alignment
+    """
+    tx_status = _get_tx_status_str(summary.status, ref1_cut_pos, ref2_cut_pos)
+    return({
+        "final_read_str":read_aln_str,
+        "final_ref1_str":_get_marked_aln_str(aln.ref1_aln, aln.aln_len, summary),
+        "final_ref2_str":_get_marked_aln_str(aln.ref2_aln, aln.aln_len, summary),
+        "final_path":[summary.final_path_start, summary.final_path_end] if summary.final_path_start != 0 else [],
+        "final_breakpoint_ref1":summary.final_breakpoint_ref1 if summary.final_breakpoint_ref1 != INT_MIN else None,
+        "final_breakpoint_ref2":summary.final_breakpoint_ref2 if summary.final_breakpoint_ref2 != INT_MIN else None,
+        "bp_match_ref1":summary.bp_match_ref1,
+        "bp_match_ref2":summary.bp_match_ref2,
+        "bp_insertion":0,
+        "is_tx":summary.is_tx,
+        "tx_status":tx_status,
+        "left_dist":summary.left_dist if summary.left_dist != INT_MIN else None,
+        "right_dist":summary.right_dist if summary.right_dist != INT_MIN else None,
+        "tx_lucky_insertions":summary.tx_lucky_insertions,
+        })
+
+
+cdef void _set_tx_params(TxParams* params, ref1_cut_pos, ref2_cut_pos, int min_num_bases_beyond_cut, int min_num_bases_before_cut,
+        int mismatch_tolerance, int gap_tolerance) except *:
+    params.has_ref1_cut_pos = ref1_cut_pos is not None
+    params.has_ref2_cut_pos = ref2_cut_pos is not None
+    params.ref1_cut_pos = 0 if ref1_cut_pos is None else ref1_cut_pos
+    params.ref2_cut_pos = 0 if ref2_cut_pos is None else ref2_cut_pos
+    params.min_num_bases_beyond_cut = min_num_bases_beyond_cut
+    params.min_num_bases_before_cut = min_num_bases_before_cut
+    params.mismatch_tolerance = mismatch_tolerance
+    params.gap_tolerance = gap_tolerance
+
+
+cdef void _set_tx_alignment(TxAlignment* aln, const TracebackResult* result) noexcept nogil:
+    """
+    Points a TxAlignment at the buffers of a traceback result of an aligned read
+    """
+    cdef int last = result.num_breakpoints - 1
+    aln.read_aln = result.read_aln
+    aln.ref1_aln = result.ref1_aln
+    aln.ref2_aln = result.ref2_aln
+    aln.aln_len = result.aln_len
+    aln.path_len = result.num_breakpoints + 1
+    aln.path_start = result.read_path[0]
+    aln.path_end = result.read_path[result.num_breakpoints]
+    if result.num_breakpoints > 0:
+        aln.first_breakpoint_read = result.breakpoints_read[0]
+        aln.first_breakpoint_ref1 = result.breakpoints_ref1[0]
+        aln.first_breakpoint_ref2 = result.breakpoints_ref2[0]
+        aln.last_breakpoint_read = result.breakpoints_read[last]
+        aln.last_breakpoint_ref1 = result.breakpoints_ref1[last]
+        aln.last_breakpoint_ref2 = result.breakpoints_ref2[last]
+
+
+TX_RESULT_KEYS = ("final_read_str", "final_ref1_str", "final_ref2_str", "final_path",
+        "final_breakpoint_ref1", "final_breakpoint_ref2", "bp_match_ref1", "bp_match_ref2", "bp_insertion",
+        "is_tx", "tx_status", "left_dist", "right_dist", "tx_lucky_insertions")
+
+
+cdef class AlignmentTxResult:
+    """
+    Result of the translocation analysis of an alignment made by ReferencePair.analyze_read, stored as the tx summary of the alignment
+    The final alignment strings are only made (from the operations of the alignment, see AlignmentResult) when they are read. Fields can be read as attributes, or by key like the dict returned by ChromBridGE_tx.analyze_tx_alignment (see to_dict)
+    """
+    cdef TxSummary summary
+    cdef readonly AlignmentResult aln_result
+    cdef object ref1_cut_pos
+    cdef object ref2_cut_pos
+
+    @property
+    def status(self):
+        return self.summary.status
+
+    @property
+    def final_read_str(self):
+        return self.aln_result.read_aln
+
+    @property
+    def final_ref1_str(self):
+        self.aln_result._make_buffers()
+        return _get_marked_aln_str(self.aln_result.result.ref1_aln, self.aln_result.result.aln_len, &self.summary)
+
+    @property
+    def final_ref2_str(self):
+        self.aln_result._make_buffers()
+        return _get_marked_aln_str(self.aln_result.result.ref2_aln, self.aln_result.result.aln_len, &self.summary)
+
+    @property
+    def final_path(self):
+        if self.summary.final_path_start == 0:
+            return []
+        return [self.summary.final_path_start, self.summary.final_path_end]
+
+    @property
+    def final_breakpoint_ref1(self):
+        return self.summary.final_breakpoint_ref1 if self.summary.final_breakpoint_ref1 != INT_MIN else None
+
+    @property
+    def final_breakpoint_ref2(self):
+        return self.summary.final_breakpoint_ref2 if self.summary.final_breakpoint_ref2 != INT_MIN else None
+
+    @property
+    def bp_match_ref1(self):
+        return self.summary.bp_match_ref1
+
+    @property
+    def bp_match_ref2(self):
+        return self.summary.bp_match_ref2
+
+    @property
+    def bp_insertion(self):
+        return 0
+
+    @property
+    def is_tx(self):
+        return self.summary.is_tx
+
+    @property
+    def tx_status(self):
+        return _get_tx_status_str(self.summary.status, self.ref1_cut_pos, self.ref2_cut_pos)
+
+    @property
+    def left_dist(self):
+        return self.summary.left_dist if self.summary.left_dist != INT_MIN else None
+
+    @property
+    def right_dist(self):
+        return self.summary.right_dist if self.summary.right_dist != INT_MIN else None
+
+    @property
+    def tx_lucky_insertions(self):
+        return self.summary.tx_lucky_insertions
+
+    def __getitem__(self, key):
+        if key not in TX_RESULT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self):
+        return TX_RESULT_KEYS
+
+    def to_dict(self):
+        """
+        Returns the dict returned by ChromBridGE_tx.analyze_tx_alignment for this result
+        """
+        return {key: getattr(self, key) for key in TX_RESULT_KEYS}
+
+    def __repr__(self):
+        return 'AlignmentTxResult(' + repr(self.to_dict()) + ')'
+
+
+def _get_match_profile(bytes ref_seq, int match_score, int mismatch_score):
+    """
+    Returns the match/mismatch score of each row of a reference for each read base (the query profile, with one row per code), and the code of each read base
+    Code 0 is used for read bases that are not in the reference
+    """
+    profile_code = np.zeros(256, dtype=np.uint8)
+    ref_bases = sorted(set(ref_seq))
+    profile = np.full((len(ref_bases) + 1, len(ref_seq) + 1), mismatch_score, dtype=np.intc)
+    ref_seq_array = np.frombuffer(ref_seq, dtype=np.uint8)
+    for code, base in enumerate(ref_bases, 1):
+        profile_code[base] = code
+        profile[code, 1:][ref_seq_array == base] = match_score
+    return profile, profile_code
+
+
+def _get_jump_incentive(int len_ref, ref_cut_pos, int cut_pos_jump_incentive_score):
+    """
+    Returns the jump incentive array (where jumping is less penalized at cut sites) and the index at which jumps are preferred for a reference
+    """
+    jump_incentive = np.zeros(len_ref + 1, dtype=np.intc)
+    prefer_cut_idx = len_ref
+    if ref_cut_pos is not None:
+        jump_incentive[ref_cut_pos] = cut_pos_jump_incentive_score
+        prefer_cut_idx = ref_cut_pos + 1
+    return jump_incentive, prefer_cut_idx
+
+
+cdef class ReferencePair:
+    """
+    A pair of reference sequences and alignment scores, prepared once for aligning many reads.
+    The encoded references and jump incentives are computed when the ReferencePair is created, and alignment tables are kept in a workspace that grows to fit the longest read seen, so aligning a read does not allocate new tables.
+
+    params:
+        ref1_seq: first sequence to align to
+        ref2_seq: second sequence to align to
+        match_score: score for adding a match in alignment (positive)
+        mismatch_score: score for adding a mismatch in alignment
+        gap_score: score for adding a gap in alignment
+        perimeter_gap_extension_score: score for adding a gap in the first/last column/row, corresponding to gaps at the beginning or ends of sequences
+        jump_score: score for jumping between ref1 and ref2
+        cut_pos_jump_incentive_score: score incentive for jumping at a predicted cut position
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
+        band_width: if greater than 0, first fill only cells within band_width diagonals of the expected alignment diagonals of each reference, falling back to filling the whole tables unless every alignment leaving the band scores less, so that the alignments are the same (0 always fills the whole tables)
+        max_table_cells: if the alignment tables for a read would have more than this many cells, the same alignment is computed keeping only a few columns of the tables at a time (slower, but using memory proportional to the read and reference lengths). 0 always fills whole tables
+        x_drop: if greater than 0, cells scoring more than x_drop below the best cell of their column are not extended, so only cells near the best alignments are filled (faster, but the alignment found may not be optimal). Not used for reads aligned with a band (unless the band is too narrow) or in linear memory
+        min_score: if not None, reads whose alignment score is less than min_score are not aligned. Filling the tables stops as soon as the score cannot be reached, and the read is returned without an alignment (see _get_below_min_score_dict)
+    """
+    cdef readonly str ref1_seq
+    cdef readonly str ref2_seq
+    cdef readonly int match_score
+    cdef readonly int mismatch_score
+    cdef readonly int gap_score
+    cdef readonly int perimeter_gap_extension_score
+    cdef readonly int jump_score
+    cdef readonly int cut_pos_jump_incentive_score
+    cdef readonly object ref1_cut_pos
+    cdef readonly object ref2_cut_pos
+    cdef readonly int band_width
+    cdef readonly Py_ssize_t max_table_cells
+    cdef readonly int x_drop
+    cdef readonly object min_score
+
+    cdef bytes ref1_seq_bytes
+    cdef bytes ref2_seq_bytes
+    cdef object jump_incentive_ref1_py
+    cdef object jump_incentive_ref2_py
+    cdef object profile_ref1_py
+    cdef object profile_code_ref1_py
+    cdef object profile_ref2_py
+    cdef object profile_code_ref2_py
+    cdef object short_arrays_py #jump incentives and profiles as shorts (see RefInfo)
+    cdef ScoreParams params
+    cdef int aln_min_score #min_score, or INT_MIN if there is no minimum
+    cdef RefInfo ref1
+    cdef RefInfo ref2
+    cdef Workspace workspace
+
+    def __cinit__(self):
+        self.workspace.capacity1 = 0
+        self.workspace.capacity2 = 0
+        self.workspace.capacity_cols = 0
+        self.workspace.score1 = NULL
+        self.workspace.score2 = NULL
+        self.workspace.pointer1 = NULL
+        self.workspace.pointer2 = NULL
+        self.workspace.colmaxes1 = NULL
+        self.workspace.capacity_rows = 0
+        self.workspace.score_cols = NULL
+        self.workspace.jumped_cols = NULL
+        self.workspace.short_scores = False
+
+    def __init__(self,
+                    str ref1_seq,
+                    str ref2_seq,
+                    int match_score=3,
+                    int mismatch_score=-1,
+                    int gap_score=-2,
+                    int perimeter_gap_extension_score=0,
+                    int jump_score=-12, # four matches
+                    int cut_pos_jump_incentive_score=1,
+                    ref1_cut_pos=None,
+                    ref2_cut_pos=None,
+                    int band_width=0,
+                    Py_ssize_t max_table_cells=1 << 24,
+                    int x_drop=0,
+                    min_score=None):
+        self.ref1_seq = ref1_seq
+        self.ref2_seq = ref2_seq
+        self.match_score = match_score
+        self.mismatch_score = mismatch_score
+        self.gap_score = gap_score
+        self.perimeter_gap_extension_score = perimeter_gap_extension_score
+        self.jump_score = jump_score
+        self.cut_pos_jump_incentive_score = cut_pos_jump_incentive_score
+        self.ref1_cut_pos = ref1_cut_pos
+        self.ref2_cut_pos = ref2_cut_pos
+        self.band_width = band_width
+        self.max_table_cells = max_table_cells
+        self.x_drop = x_drop
+        self.min_score = min_score
+        self.aln_min_score = INT_MIN if min_score is None else min_score
+
+        self.params.match_score = match_score
+        self.params.mismatch_score = mismatch_score
+        self.params.gap_score = gap_score
+        self.params.perimeter_gap_extension_score = perimeter_gap_extension_score
+        self.params.jump_score = jump_score
+
+        self.ref1_seq_bytes = ref1_seq.encode()
+        self.ref2_seq_bytes = ref2_seq.encode()
+
+        #set jump incentive arrays (where jumping is less penalized at cut sites)
+        self.jump_incentive_ref1_py, prefer_cut_ref1_idx = _get_jump_incentive(len(self.ref1_seq_bytes), ref1_cut_pos, cut_pos_jump_incentive_score)
+        self.jump_incentive_ref2_py, prefer_cut_ref2_idx = _get_jump_incentive(len(self.ref2_seq_bytes), ref2_cut_pos, cut_pos_jump_incentive_score)
+        cdef int[::1] jump_incentive_ref1 = self.jump_incentive_ref1_py
+        cdef int[::1] jump_incentive_ref2 = self.jump_incentive_ref2_py
+        self.profile_ref1_py, self.profile_code_ref1_py = _get_match_profile(self.ref1_seq_bytes, match_score, mismatch_score)
+        self.profile_ref2_py, self.profile_code_ref2_py = _get_match_profile(self.ref2_seq_bytes, match_score, mismatch_score)
+        cdef int[:, ::1] profile_ref1 = self.profile_ref1_py
+        cdef int[:, ::1] profile_ref2 = self.profile_ref2_py
+        cdef unsigned char[::1] profile_code_ref1 = self.profile_code_ref1_py
+        cdef unsigned char[::1] profile_code_ref2 = self.profile_code_ref2_py
+        #values that do not fit are only used if the scores do not fit either, in which case the short arrays are never read
+        self.short_arrays_py = [np.array(array, dtype=np.int16) for array in (self.jump_incentive_ref1_py, self.profile_ref1_py, self.jump_incentive_ref2_py, self.profile_ref2_py)]
+        cdef short[::1] jump_incentive16_ref1 = self.short_arrays_py[0]
+        cdef short[:, ::1] profile16_ref1 = self.short_arrays_py[1]
+        cdef short[::1] jump_incentive16_ref2 = self.short_arrays_py[2]
+        cdef short[:, ::1] profile16_ref2 = self.short_arrays_py[3]
+
+        self.ref1.seq = <const unsigned char*> self.ref1_seq_bytes
+        self.ref1.len = len(self.ref1_seq_bytes)
+        self.ref1.jump_incentive = &jump_incentive_ref1[0]
+        self.ref1.jump_incentive16 = &jump_incentive16_ref1[0]
+        self.ref1.prefer_cut_idx = prefer_cut_ref1_idx
+        self.ref1.cut_pos = -1 if ref1_cut_pos is None else ref1_cut_pos
+        self.ref1.profile = &profile_ref1[0, 0]
+        self.ref1.profile16 = &profile16_ref1[0, 0]
+        self.ref1.profile_code = &profile_code_ref1[0]
+
+        self.ref2.seq = <const unsigned char*> self.ref2_seq_bytes
+        self.ref2.len = len(self.ref2_seq_bytes)
+        self.ref2.jump_incentive = &jump_incentive_ref2[0]
+        self.ref2.jump_incentive16 = &jump_incentive16_ref2[0]
+        self.ref2.prefer_cut_idx = prefer_cut_ref2_idx
+        self.ref2.cut_pos = -1 if ref2_cut_pos is None else ref2_cut_pos
+        self.ref2.profile = &profile_ref2[0, 0]
+        self.ref2.profile16 = &profile16_ref2[0, 0]
+        self.ref2.profile_code = &profile_code_ref2[0]
+
+    def __dealloc__(self):
+        _workspace_free(&self.workspace)
+
+    def __reduce__(self):
+        return (ReferencePair, (self.ref1_seq, self.ref2_seq, self.match_score, self.mismatch_score, self.gap_score,
+            self.perimeter_gap_extension_score, self.jump_score, self.cut_pos_jump_incentive_score, self.ref1_cut_pos, self.ref2_cut_pos, self.band_width, self.max_table_cells,
+            self.x_drop, self.min_score))
+
+    cpdef dict align(self, str read_seq_py, bint debug=False):
+        """
+        Computes the optimal alignment of a read to the two references (see nw_breakpoint)
+
+        params:
+            read_seq: read to align to the two references
+            debug: print intermediate tables
+
+        returns:
+            dict with the same keys as nw_breakpoint
+        """
+        cdef TracebackResult result
+        if self._align_read_bytes(read_seq_py.encode(), debug, &result) != align_ok:
+            return _get_below_min_score_dict(read_seq_py)
+        try:
+            return _traceback_result_to_dict(&result)
+        finally:
+            _free_traceback_result(&result)
+
+    cpdef AlignmentResult align_result(self, str read_seq_py, bint debug=False):
+        """
+        Computes the optimal alignment of a read to the two references, like align, without converting it to a dict
+
+        params:
+            read_seq: read to align to the two references
+            debug: print intermediate tables
+
+        returns:
+            AlignmentResult, whose fields have the same keys as nw_breakpoint
+        """
+        cdef TracebackResult result
+        cdef int status = self._align_read_bytes(read_seq_py.encode(), debug, &result)
+        return _make_alignment_result(read_seq_py, status, &result, self.ref1_seq_bytes, self.ref2_seq_bytes)
+
+    cdef int _align_read_bytes(self, bytes read_seq_bytes, bint debug, TracebackResult* result) except -1:
+        """
+        Aligns a read to the two references, filling result (which the caller must free) if the read was aligned
+
+        returns:
+            align_ok or below_min_score
+        """
+        cdef int len_read = len(read_seq_bytes)
+        cdef int status = _align_read(<const unsigned char*> read_seq_bytes, len_read, &self.ref1, &self.ref2, &self.params,
+                self.band_width, self.max_table_cells, self.x_drop, self.aln_min_score, &self.workspace, result)
+        if status != align_ok and status != below_min_score:
+            raise MemoryError()
+        if debug and status == align_ok and not _uses_linear_memory(len_read, &self.ref1, &self.ref2, self.max_table_cells):
+            self._print_tables(len_read)
+        return status
+
+    cpdef tuple analyze_read(self, str read_seq_py, int min_num_bases_beyond_cut=4, int min_num_bases_before_cut=4, int mismatch_tolerance=0, int gap_tolerance=0):
+        """
+        Aligns a read to the two references and refines its translocation breakpoints at the cut positions of the pair in one native call (see ChromBridGE_tx.get_tx_result, which is the reference implementation)
+        The refinement reads the traceback buffers directly before they are encoded as operations (see AlignmentResult), so no alignment strings are made unless the final strings are read
+
+        params:
+            read_seq: read to align to the two references
+            min_num_bases_beyond_cut: Min number of matching bases that must be seen beyond the cut site for a breakpoint to be reported beyond the cut site
+            min_num_bases_before_cut: Min number of matching bases that must be seen before the cut site - the position of this first match will be reported
+            mismatch_tolerance: int How many mismatches to tolerate beyond the cut
+            gap_tolerance: int How many gaps to tolerate beyond the cut
+
+        returns:
+            tuple of:
+            aln_result: AlignmentResult of the read
+            tx_result: AlignmentTxResult with the same keys as ChromBridGE_tx.analyze_tx_alignment
+        """
+        cdef TxParams params
+        _set_tx_params(&params, self.ref1_cut_pos, self.ref2_cut_pos, min_num_bases_beyond_cut, min_num_bases_before_cut, mismatch_tolerance, gap_tolerance)
+        return self._analyze_read(read_seq_py, &params)
+
+    cdef tuple _analyze_read(self, str read_seq_py, const TxParams* params):
+        """
+        Aligns a read and refines its translocation breakpoints with the given parameters (see analyze_read)
+        """
+        cdef TracebackResult result
+        cdef int status = self._align_read_bytes(read_seq_py.encode(), False, &result)
+        return self._analyze_traceback(read_seq_py, status, &result, params)
+
+    cdef tuple _analyze_traceback(self, str read_seq_py, int status, TracebackResult* result, const TxParams* params):
+        """
+        Refines the translocation breakpoints of the alignment of a read in result (see analyze_read), which is taken over by the returned AlignmentResult if the read was aligned
+        """
+        cdef TxAlignment aln
+        cdef AlignmentTxResult tx_result = AlignmentTxResult.__new__(AlignmentTxResult)
+        tx_result.ref1_cut_pos = self.ref1_cut_pos
+        tx_result.ref2_cut_pos = self.ref2_cut_pos
+        if status == align_ok:
+            _set_tx_alignment(&aln, result)
+            if _analyze_tx(&aln, params, &tx_result.summary) == -1:
+                _free_traceback_result(result)
+                raise IndexError('alignment index out of range')
+            tx_result.aln_result = _make_alignment_result(read_seq_py, status, result, self.ref1_seq_bytes, self.ref2_seq_bytes)
+            return tx_result.aln_result, tx_result
+        tx_result.aln_result = _make_alignment_result(read_seq_py, status, result, self.ref1_seq_bytes, self.ref2_seq_bytes)
+        tx_result.aln_result._fill_unaligned_buffers()
+        aln.read_aln = tx_result.aln_result.result.read_aln
+        aln.ref1_aln = tx_result.aln_result.result.ref1_aln
+        aln.ref2_aln = tx_result.aln_result.result.ref2_aln
+        aln.aln_len = tx_result.aln_result.result.aln_len
+        aln.path_len = 0
+        if _analyze_tx(&aln, params, &tx_result.summary) == -1:
+            raise IndexError('alignment index out of range')
+        return tx_result.aln_result, tx_result
+
+    cpdef dict align_score(self, str read_seq_py, bint compute_single_ref=True):
+        """
+        Computes the optimal alignment score of a read to the two references without computing the alignment itself (see nw_breakpoint_score)
+
+        params:
+            read_seq: read to align to the two references
+            compute_single_ref: whether to compute single_ref_score (this doubles the work; if False single_ref_score is None)
+
+        returns:
+            dict with the same keys as nw_breakpoint_score
+        """
+        cdef bytes read_seq_bytes = read_seq_py.encode()
+        cdef ScoreOnlyResult result
+        if _workspace_reserve_columns(&self.workspace, self.ref1.len, self.ref2.len) != 0:
+            raise MemoryError()
+        _score_only(<const unsigned char*> read_seq_bytes, len(read_seq_bytes), &self.ref1, &self.ref2, &self.params,
+                compute_single_ref, self.workspace.score_cols, self.workspace.jumped_cols, &result)
+        return({
+            "aln_score":result.aln_score,
+            "aln_ref":result.aln_ref,
+            "has_jump":result.has_jump,
+            "single_ref_score":result.single_ref_score if compute_single_ref else None,
+            })
+
+    def _print_tables(self, int len_read):
+        cdef int cols = len_read + 1
+        cdef int len_ref1 = self.ref1.len
+        cdef int len_ref2 = self.ref2.len
+        np.set_printoptions(threshold=np.inf)
+        print('jump_incentive_ref1')
+        print(np.array(self.jump_incentive_ref1_py))
+        print('score1:')
+        if self.workspace.short_scores:
+            print(np.array(<short[:cols, :len_ref1+1]> <short*> self.workspace.score1).T)
+        else:
+            print(np.array(<int[:cols, :len_ref1+1]> self.workspace.score1).T)
+        print('pointer1:')
+        print(_unpack_pointers(self.workspace.pointer1, cols, len_ref1+1).T)
+        print('colmaxes1:')
+        print(np.array(<int[:cols]> self.workspace.colmaxes1))
+        print('colmaxesInd1:')
+        print(np.array(<int[:cols]> self.workspace.colmaxesInd1))
+
+        print('jump_incentive_ref2')
+        print(np.array(self.jump_incentive_ref2_py))
+        print('score2:')
+        if self.workspace.short_scores:
+            print(np.array(<short[:cols, :len_ref2+1]> <short*> self.workspace.score2).T)
+        else:
+            print(np.array(<int[:cols, :len_ref2+1]> self.workspace.score2).T)
+        print('pointer2:')
+        print(_unpack_pointers(self.workspace.pointer2, cols, len_ref2+1).T)
+        print('colmaxes2:')
+        print(np.array(<int[:cols]> self.workspace.colmaxes2))
+        print('colmaxesInd2:')
+        print(np.array(<int[:cols]> self.workspace.colmaxesInd2))
+
+    def align_lanes(self, reads):
+        """
+        Computes the optimal alignment of each read in a list to the two references, giving the same results as align
+        Reads are grouped by length, and groups of num_lanes (16) reads of the same length are aligned together, with each table cell holding one value per read so that the compiler can compute the cell for all of the reads with vector instructions.
+        The last group of each length is padded with copies of one of its reads. Reads in lengths with only a few reads, reads aligned in linear memory, and reads aligned with a band or x_drop are aligned one at a time with align
+
+        params:
+            reads: list of reads to align to the two references
+
+        returns:
+            list of dicts (one per read) with the same keys as nw_breakpoint
+        """
+        return self._align_lanes(reads, NULL)
+
+    def analyze_lanes(self, reads, int min_num_bases_beyond_cut=4, int min_num_bases_before_cut=4, int mismatch_tolerance=0, int gap_tolerance=0):
+        """
+        Aligns each read in a list to the two references and refines its translocation breakpoints like analyze_read, aligning reads of the same length together like align_lanes
+        No alignment strings are made unless they are read from the results
+
+        params:
+            reads: list of reads to align to the two references
+            min_num_bases_beyond_cut: Min number of matching bases that must be seen beyond the cut site for a breakpoint to be reported beyond the cut site
+            min_num_bases_before_cut: Min number of matching bases that must be seen before the cut site - the position of this first match will be reported
+            mismatch_tolerance: int How many mismatches to tolerate beyond the cut
+            gap_tolerance: int How many gaps to tolerate beyond the cut
+
+        returns:
+            list of tuples (one per read) of the AlignmentResult and AlignmentTxResult of the read (see analyze_read)
+        """
+        cdef TxParams params
+        _set_tx_params(&params, self.ref1_cut_pos, self.ref2_cut_pos, min_num_bases_beyond_cut, min_num_bases_before_cut, mismatch_tolerance, gap_tolerance)
+        return self._align_lanes(reads, &params)
+
+    cdef list _align_lanes(self, reads, const TxParams* tx_params):
+        """
+        Aligns reads as in align_lanes, returning the dicts of align if tx_params is NULL, or the results of analyze_read with tx_params otherwise
+        """
+        aln_infos = [None] * len(reads)
+        read_inds_by_length = {}
+        for read_ind, read in enumerate(reads):
+            read_inds_by_length.setdefault(len(read), []).append(read_ind)
+
+        for len_read, read_inds in read_inds_by_length.items():
+            if self.band_width > 0 or self.x_drop > 0 or len(read_inds) < num_lanes // 4 or len_read == 0 or \
+                    _uses_linear_memory(len_read, &self.ref1, &self.ref2, self.max_table_cells):
+                for read_ind in read_inds:
+                    if tx_params == NULL:
+                        aln_infos[read_ind] = self.align(reads[read_ind])
+                    else:
+                        aln_infos[read_ind] = self._analyze_read(reads[read_ind], tx_params)
+                continue
+            for block_start in range(0, len(read_inds), num_lanes):
+                block_read_inds = read_inds[block_start:block_start + num_lanes]
+                block_aln_infos = self._align_lane_block([reads[read_ind] for read_ind in block_read_inds], tx_params)
+                for read_ind, aln_info in zip(block_read_inds, block_aln_infos):
+                    aln_infos[read_ind] = aln_info
+        return aln_infos
+
+    cdef list _align_lane_block(self, list block_reads, const TxParams* tx_params):
+        """
+        Aligns up to num_lanes reads of the same length together (see _align_lanes)
+        """
+        cdef int num_reads = len(block_reads)
+        padded_reads = [read.encode() for read in block_reads]
+        padded_reads += [padded_reads[0]] * (num_lanes - num_reads)
+        cdef int len_read = len(padded_reads[0])
+        #bases of each read in each column are next to each other
+        cdef bytes read_bases_bytes = np.frombuffer(b''.join(padded_reads), dtype=np.uint8).reshape(num_lanes, len_read).T.tobytes()
+        cdef const unsigned char* read_bases = read_bases_bytes
+
+        cdef Py_ssize_t cols = len_read + 1
+        cdef Py_ssize_t rows1 = self.ref1.len + 1
+        cdef Py_ssize_t rows2 = self.ref2.len + 1
+        cdef int* score_cols = <int*> malloc(2 * (rows1 + rows2) * num_lanes * sizeof(int))
+        cdef int* colmaxes = <int*> malloc((4 * cols + 2) * num_lanes * sizeof(int))
+        cdef unsigned char* pointers = <unsigned char*> malloc((rows1 + rows2) * cols * lane_pointer_bytes)
+        if score_cols == NULL or colmaxes == NULL or pointers == NULL:
+            free(score_cols)
+            free(colmaxes)
+            free(pointers)
+            raise MemoryError()
+        cdef int* colmaxesInd1 = colmaxes + cols*num_lanes
+        cdef int* colmaxes2 = colmaxes + 2*cols*num_lanes
+        cdef int* colmaxesInd2 = colmaxes + 3*cols*num_lanes
+        cdef int* end_scores1 = colmaxes + 4*cols*num_lanes
+        cdef int* end_scores2 = end_scores1 + num_lanes
+        cdef unsigned char* pointer1 = pointers
+        cdef unsigned char* pointer2 = pointers + rows1*cols*lane_pointer_bytes
+        cdef TracebackResult result
+        cdef int lane, status
+        cdef bytes read_bytes
+        try:
+            with nogil:
+                if _fits_short_scores(len_read, &self.ref1, &self.ref2, &self.params):
+                    _fill_lane_tables(read_bases, len_read, &self.ref1, &self.ref2, &self.params, <short*> score_cols,
+                            pointer1, colmaxes, colmaxesInd1, end_scores1,
+                            pointer2, colmaxes2, colmaxesInd2, end_scores2)
+                else:
+                    _fill_lane_tables(read_bases, len_read, &self.ref1, &self.ref2, &self.params, score_cols,
+                            pointer1, colmaxes, colmaxesInd1, end_scores1,
+                            pointer2, colmaxes2, colmaxesInd2, end_scores2)
+            aln_infos = []
+            for lane in range(num_reads):
+                if max(end_scores1[lane], end_scores2[lane]) < self.aln_min_score:
+                    if tx_params == NULL:
+                        aln_infos.append(_get_below_min_score_dict(block_reads[lane]))
+                    else:
+                        aln_infos.append(self._analyze_traceback(block_reads[lane], below_min_score, &result, tx_params))
+                    continue
+                read_bytes = padded_reads[lane]
+                status = _traceback(<const unsigned char*> read_bytes, len_read, &self.ref1, &self.ref2,
+                        end_scores1[lane], pointer1, colmaxesInd1,
+                        end_scores2[lane], pointer2, colmaxesInd2, lane, num_lanes, &result)
+                if status != 0:
+                    raise MemoryError()
+                if tx_params != NULL:
+                    aln_infos.append(self._analyze_traceback(block_reads[lane], status, &result, tx_params))
+                    continue
+                try:
+                    aln_infos.append(_traceback_result_to_dict(&result))
+                finally:
+                    _free_traceback_result(&result)
+            return aln_infos
+        finally:
+            free(score_cols)
+            free(colmaxes)
+            free(pointers)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef _AlignedBatch _align_batch(self, reads, int num_threads):
+        """
+        Aligns a batch of reads without holding the GIL, distributing them over num_threads threads, each with its own workspace (see align_batch)
+        """
+        if num_threads <= 0:
+            num_threads = os.cpu_count() or 1
+
+        read_bytes = [read.encode() for read in reads]
+        cdef Py_ssize_t num_reads = len(read_bytes)
+        cdef _AlignedBatch batch = _AlignedBatch(num_reads)
+        if num_reads == 0:
+            return batch
+
+        cdef const unsigned char** read_ptrs = <const unsigned char**> malloc(num_reads * sizeof(unsigned char*))
+        cdef int* read_lens = <int*> malloc(num_reads * sizeof(int))
+        if read_ptrs == NULL or read_lens == NULL:
+            free(read_ptrs)
+            free(read_lens)
+            raise MemoryError()
+
+        cdef Py_ssize_t i
+        cdef bytes this_read
+        for i in range(num_reads):
+            this_read = read_bytes[i]
+            read_ptrs[i] = <const unsigned char*> this_read
+            read_lens[i] = len(this_read)
+
+        cdef Workspace* thread_ws = NULL
+        cdef int* statuses = batch.statuses
+        cdef TracebackResult* results = batch.results
+        with nogil, parallel(num_threads=num_threads):
+            thread_ws = <Workspace*> calloc(1, sizeof(Workspace))
+            for i in prange(num_reads, schedule='dynamic'):
+                if thread_ws != NULL:
+                    statuses[i] = _align_read(read_ptrs[i], read_lens[i], &self.ref1, &self.ref2, &self.params,
+                            self.band_width, self.max_table_cells, self.x_drop, self.aln_min_score, thread_ws, &results[i])
+            if thread_ws != NULL:
+                _workspace_free(thread_ws)
+                free(thread_ws)
+        free(read_ptrs)
+        free(read_lens)
+        batch.check_statuses()
+        return batch
+
+    def align_batch(self, reads, int num_threads=0):
+        """
+        Computes the optimal alignment of each read in a batch to the two references.
+        Alignments are computed without holding the GIL, and reads are distributed over num_threads threads, each with its own workspace.
+
+        params:
+            reads: list of reads to align to the two references
+            num_threads: number of threads to use (0 uses one thread per cpu)
+
+        returns:
+            list of dicts (one per read) with the same keys as nw_breakpoint
+        """
+        cdef _AlignedBatch batch = self._align_batch(reads, num_threads)
+        cdef Py_ssize_t i
+        aln_infos = []
+        for i in range(batch.num_reads):
+            if batch.statuses[i] == below_min_score:
+                aln_infos.append(_get_below_min_score_dict(reads[i]))
+            else:
+                aln_infos.append(_traceback_result_to_dict(&batch.results[i]))
+        return aln_infos
+
+    def align_batch_results(self, reads, int num_threads=0):
+        """
+        Computes the optimal alignment of each read in a batch to the two references, like align_batch, without converting them to dicts
+
+        params:
+            reads: list of reads to align to the two references
+            num_threads: number of threads to use (0 uses one thread per cpu)
+
+        returns:
+            list of AlignmentResults (one per read)
+        """
+        cdef _AlignedBatch batch = self._align_batch(reads, num_threads)
+        cdef Py_ssize_t i
+        return [_make_alignment_result(reads[i], batch.statuses[i], &batch.results[i], self.ref1_seq_bytes, self.ref2_seq_bytes) for i in range(batch.num_reads)]
+
+    def align_batch_array(self, reads, int num_threads=0, out=None):
+        """
+        Computes the optimal alignment of each read in a batch to the two references (see align_batch), and stores the score, breakpoints and path of each alignment in a structured array without making any Python objects per read
+        Breakpoints of alignments without breakpoints, and the scores and breakpoints of reads that are not aligned (status ALIGNMENT_STATUS_BELOW_MIN_SCORE) are MISSING_VALUE, and their path_start and path_end are 0
+
+        params:
+            reads: list of reads to align to the two references
+            num_threads: number of threads to use (0 uses one thread per cpu)
+            out: array of ALIGNMENT_RESULT_DTYPE with one row per read to fill (a new array is made if None)
+
+        returns:
+            array of ALIGNMENT_RESULT_DTYPE with one row per read
+        """
+        if out is None:
+            out = np.empty(len(reads), dtype=ALIGNMENT_RESULT_DTYPE)
+        elif out.dtype != ALIGNMENT_RESULT_DTYPE or out.shape != (len(reads),):
+            raise ValueError('out must be an array of ALIGNMENT_RESULT_DTYPE with one row per read')
+        cdef _AlignedBatch batch = self._align_batch(reads, num_threads)
+        cdef signed char[:] row_status = out['status']
+        cdef int[:] aln_score = out['aln_score']
+        cdef int[:] num_breakpoints = out['num_breakpoints']
+        cdef int[:] first_read = out['first_breakpoint_read']
+        cdef int[:] first_ref1 = out['first_breakpoint_ref1']
+        cdef int[:] first_ref2 = out['first_breakpoint_ref2']
+        cdef int[:] last_read = out['last_breakpoint_read']
+        cdef int[:] last_ref1 = out['last_breakpoint_ref1']
+        cdef int[:] last_ref2 = out['last_breakpoint_ref2']
+        cdef signed char[:] path_start = out['path_start']
+        cdef signed char[:] path_end = out['path_end']
+        cdef int first_breakpoints[3]
+        cdef int last_breakpoints[3]
+        cdef signed char path_ends[2]
+        cdef Py_ssize_t i
+        for i in range(batch.num_reads):
+            _fill_alignment_row(batch.statuses[i], &batch.results[i], &row_status[i], &aln_score[i], &num_breakpoints[i],
+                    first_breakpoints, last_breakpoints, path_ends)
+            first_read[i], first_ref1[i], first_ref2[i] = first_breakpoints[0], first_breakpoints[1], first_breakpoints[2]
+            last_read[i], last_ref1[i], last_ref2[i] = last_breakpoints[0], last_breakpoints[1], last_breakpoints[2]
+            path_start[i], path_end[i] = path_ends[0], path_ends[1]
+        return out
+
+
+cdef class ReferencePanel:
+    """
+    A panel of reference sequences (e.g. an on-target amplicon and its off-target amplicons) and alignment scores, prepared once for aligning many reads.
+    Each read is aligned to all of the references in one pass, with one score table per reference. A jump into a reference starts from the best cell (plus its jump incentive) of any other reference in the previous column, so aligning a read costs the same for each reference whatever the number of references, instead of aligning the read to every pair of references.
+    With two references, the alignment is the same as the alignment by ReferencePair (see nw_breakpoint_panel for the keys of the result).
+
+    params:
+        ref_seqs: list of sequences to align to
+        match_score: score for adding a match in alignment (positive)
+        mismatch_score: score for adding a mismatch in alignment
+        gap_score: score for adding a gap in alignment
+        perimeter_gap_extension_score: score for adding a gap in the first/last column/row, corresponding to gaps at the beginning or ends of sequences
+        jump_score: score for jumping between references
+        cut_pos_jump_incentive_score: score incentive for jumping at a predicted cut position
+        ref_cut_pos: list of the positions of the predicted cut sites in each reference (None for a reference without a predicted cut site), or None if no cut sites are given
+    """
+    cdef readonly tuple ref_seqs
+    cdef readonly int match_score
+    cdef readonly int mismatch_score
+    cdef readonly int gap_score
+    cdef readonly int perimeter_gap_extension_score
+    cdef readonly int jump_score
+    cdef readonly int cut_pos_jump_incentive_score
+    cdef readonly tuple ref_cut_pos
+
+    cdef list ref_seqs_bytes
+    cdef list jump_incentives_py
+    cdef list profiles_py
+    cdef list profile_codes_py
+    cdef object ref_rows_before_py
+    cdef ScoreParams params
+    cdef int num_refs
+    cdef int total_rows
+    cdef RefInfo* refs
+    cdef PanelWorkspace workspace
+
+    def __cinit__(self):
+        self.refs = NULL
+        self.workspace.capacity_cells = 0
+        self.workspace.capacity_cols = 0
+        self.workspace.capacity_rows = 0
+        self.workspace.score = NULL
+        self.workspace.pointer = NULL
+        self.workspace.pointer_col = NULL
+        self.workspace.colmaxes = NULL
+
+    def __init__(self,
+                    ref_seqs,
+                    int match_score=3,
+                    int mismatch_score=-1,
+                    int gap_score=-2,
+                    int perimeter_gap_extension_score=0,
+                    int jump_score=-12, # four matches
+                    int cut_pos_jump_incentive_score=1,
+                    ref_cut_pos=None):
+        cdef int ref_idx
+        cdef int[::1] jump_incentive
+        cdef int[:, ::1] profile
+        cdef unsigned char[::1] profile_code
+        if len(ref_seqs) == 0:
+            raise ValueError('At least one reference sequence is required')
+        if ref_cut_pos is None:
+            ref_cut_pos = [None] * len(ref_seqs)
+        if len(ref_cut_pos) != len(ref_seqs):
+            raise ValueError('ref_cut_pos must have one position for each reference sequence')
+        self.ref_seqs = tuple(ref_seqs)
+        self.match_score = match_score
+        self.mismatch_score = mismatch_score
+        self.gap_score = gap_score
+        self.perimeter_gap_extension_score = perimeter_gap_extension_score
+        self.jump_score = jump_score
+        self.cut_pos_jump_incentive_score = cut_pos_jump_incentive_score
+        self.ref_cut_pos = tuple(ref_cut_pos)
+
+        self.params.match_score = match_score
+        self.params.mismatch_score = mismatch_score
+        self.params.gap_score = gap_score
+        self.params.perimeter_gap_extension_score = perimeter_gap_extension_score
+        self.params.jump_score = jump_score
+
+        self.num_refs = len(self.ref_seqs)
+        self.refs = <RefInfo*> malloc(self.num_refs * sizeof(RefInfo))
+        if self.refs == NULL:
+            raise MemoryError()
+        self.ref_seqs_bytes = []
+        self.jump_incentives_py = []
+        self.profiles_py = []
+        self.profile_codes_py = []
+        self.ref_rows_before_py = np.zeros(self.num_refs, dtype=np.intc)
+        self.total_rows = 0
+        for ref_idx in range(self.num_refs):
+            ref_seq_bytes = self.ref_seqs[ref_idx].encode()
+            jump_incentive_py, prefer_cut_idx = _get_jump_incentive(len(ref_seq_bytes), self.ref_cut_pos[ref_idx], cut_pos_jump_incentive_score)
+            profile_py, profile_code_py = _get_match_profile(ref_seq_bytes, match_score, mismatch_score)
+            self.ref_seqs_bytes.append(ref_seq_bytes)
+            self.jump_incentives_py.append(jump_incentive_py)
+            self.profiles_py.append(profile_py)
+            self.profile_codes_py.append(profile_code_py)
+            jump_incentive = jump_incentive_py
+            profile = profile_py
+            profile_code = profile_code_py
+
+            self.refs[ref_idx].seq = <const unsigned char*> ref_seq_bytes
+            self.refs[ref_idx].len = len(ref_seq_bytes)
+            self.refs[ref_idx].jump_incentive = &jump_incentive[0]
+            self.refs[ref_idx].jump_incentive16 = NULL #panel tables always hold ints
+            self.refs[ref_idx].prefer_cut_idx = prefer_cut_idx
+            self.refs[ref_idx].cut_pos = -1 if self.ref_cut_pos[ref_idx] is None else self.ref_cut_pos[ref_idx]
+            self.refs[ref_idx].profile = &profile[0, 0]
+            self.refs[ref_idx].profile16 = NULL
+            self.refs[ref_idx].profile_code = &profile_code[0]
+            self.ref_rows_before_py[ref_idx] = self.total_rows
+            self.total_rows += len(ref_seq_bytes) + 1
+
+    def __dealloc__(self):
+        _panel_workspace_free(&self.workspace)
+        free(self.refs)
+
+    def __reduce__(self):
+        return (ReferencePanel, (self.ref_seqs, self.match_score, self.mismatch_score, self.gap_score,
+            self.perimeter_gap_extension_score, self.jump_score, self.cut_pos_jump_incentive_score, self.ref_cut_pos))
+
+    cpdef dict align(self, str read_seq_py):
+        """
+        Computes the optimal alignment of a read to the references in the panel (see nw_breakpoint_panel)
+
+        params:
+            read_seq: read to align to the references
+
+        returns:
+            dict with the same keys as nw_breakpoint_panel
+        """
+        cdef bytes read_seq_bytes = read_seq_py.encode()
+        cdef int len_read = len(read_seq_bytes)
+        cdef int[::1] ref_rows_before = self.ref_rows_before_py
+        cdef PanelTracebackResult result
+        if _panel_workspace_reserve(&self.workspace, len_read, self.num_refs, self.total_rows) != 0:
+            raise MemoryError()
+        _fill_panel_tables(<const unsigned char*> read_seq_bytes, len_read, self.refs, self.num_refs, &ref_rows_before[0], &self.params, &self.workspace)
+        if _traceback_panel(<const unsigned char*> read_seq_bytes, len_read, self.refs, self.num_refs, &ref_rows_before[0], &self.workspace, &result) != 0:
+            raise MemoryError()
+        try:
+            return _panel_traceback_result_to_dict(&result)
+        finally:
+            _free_panel_traceback_result(&result)
+
+
+def get_aln_segments(str read_aln_str, str ref1_aln_str, str ref2_aln_str,
+        breakpoints_read, breakpoints_ref1, breakpoints_ref2, read_path, str ref1_seq, str ref2_seq):
+    """
+    Encodes an alignment as the reference, start position and CIGAR string of each segment of its path, like AlignmentResult.segments
+    The alignment strings can be rebuilt from the segments, the read and the references (see ChromBridGE.decode_aln_segments)
+
+    params:
+        read_aln_str: Alignment of the read (including gaps)
+        ref1_aln_str: Alignment of the ref1 (including gaps or spaces if the sequence doesn't align)
+        ref2_aln_str: Alignment of the ref2 (including gaps or spaces if the sequence doesn't align)
+        breakpoints_read: positions of breakpoints in read discovered by alignment
+        breakpoints_ref1: positions of breakpoints in ref1 at which the optimal alignment switches references
+        breakpoints_ref2: positions of breakpoints in ref2 at which the optimal alignment switches references
+        read_path: index of ref that the read is aligned to, corresponding to the break points (empty if the read was not aligned)
+        ref1_seq: first reference sequence
+        ref2_seq: second reference sequence
+
+    returns:
+        list of tuples of (reference index (1 or 2), position in the reference at which the segment starts, CIGAR string of the segment), empty if the read was not aligned
+    """
+    if len(read_path) == 0:
+        return []
+    cdef bytes aln_bytes = (read_aln_str + ref1_aln_str + ref2_aln_str).encode()
+    cdef int aln_len = len(read_aln_str)
+    cdef int num_breakpoints = len(breakpoints_read)
+    if len(aln_bytes) != 3*aln_len:
+        raise ValueError('alignments must have the same length')
+    if len(breakpoints_ref1) != num_breakpoints or len(breakpoints_ref2) != num_breakpoints or len(read_path) != num_breakpoints + 1:
+        raise ValueError('read_path must have one more item than each list of breakpoints')
+    cdef bytes read_seq_bytes = read_aln_str.replace('-', '').encode()
+    cdef bytes ref1_seq_bytes = ref1_seq.encode()
+    cdef bytes ref2_seq_bytes = ref2_seq.encode()
+    cdef TracebackResult result
+    result.read_aln = aln_bytes
+    result.ref1_aln = result.read_aln + aln_len
+    result.ref2_aln = result.read_aln + 2*aln_len
+    result.aln_len = aln_len
+    result.num_breakpoints = num_breakpoints
+    result.breakpoints_read = <int*> malloc((4*num_breakpoints + 1) * sizeof(int))
+    cdef int* ops = <int*> malloc((aln_len + num_breakpoints + 1) * sizeof(int))
+    if result.breakpoints_read == NULL or ops == NULL:
+        free(result.breakpoints_read)
+        free(ops)
+        raise MemoryError()
+    result.breakpoints_ref1 = result.breakpoints_read + num_breakpoints
+    result.breakpoints_ref2 = result.breakpoints_read + 2*num_breakpoints
+    result.read_path = result.breakpoints_read + 3*num_breakpoints
+    cdef int i
+    cdef int num_ops
+    try:
+        for i in range(num_breakpoints):
+            result.breakpoints_read[i] = breakpoints_read[i]
+            result.breakpoints_ref1[i] = breakpoints_ref1[i]
+            result.breakpoints_ref2[i] = breakpoints_ref2[i]
+        for i in range(num_breakpoints + 1):
+            result.read_path[i] = read_path[i]
+        num_ops = _encode_operations(&result, <const unsigned char*> read_seq_bytes, len(read_seq_bytes),
+                <const unsigned char*> ref1_seq_bytes, len(ref1_seq_bytes), <const unsigned char*> ref2_seq_bytes, len(ref2_seq_bytes), ops)
+        if num_ops < 0:
+            raise ValueError('alignment does not match its breakpoints and references')
+        return _get_segments(&result, ops, num_ops)
+    finally:
+        free(result.breakpoints_read)
+        free(ops)
+
+
+def analyze_tx_alignment(str read_aln_str, str ref1_aln_str, str ref2_aln_str,
+        breakpoints_read, breakpoints_ref1, breakpoints_ref2,
+        read_path, ref1_cut_pos=None, ref2_cut_pos=None,
+        int min_num_bases_beyond_cut=4, int min_num_bases_before_cut=4,
+        int mismatch_tolerance=0, int gap_tolerance=0):
+    """
+    Refine the alignment and possible translocation sites of an alignment, like ChromBridGE_tx.analyze_tx_alignment (the reference implementation) but compiled
+    Use ReferencePair.analyze_read to align a read and refine its alignment without making the alignment strings
+
+    params:
+        read_aln_str: Alignment of the read (including gaps)
+        ref1_aln_str: Alignment of the ref1 (including gaps or spaces if the sequence doesn't align)
+        ref2_aln_str: Alignment of the ref2 (including gaps or spaces if the sequence doesn't align)
+        breakpoints_read: positions of breakpoints in read discovered by alignment
+        breakpoints_ref1: positions of breakpoints in ref1 at which the optimal alignment switches references
+        breakpoints_ref2: positions of breakpoints in ref2 at which the optimal alignment switches references
+        read_path: index of ref that the read is aligned to, corresponding to the break points (empty if the read was not aligned)
+        ref1_cut_pos: position in ref1 where the predicted cut site is (user input parameter)
+        ref2_cut_pos: position in ref2 where the predicted cut site is (user input parameter)
+        min_num_bases_beyond_cut: Min number of matching bases that must be seen beyond the cut site for a breakpoint to be reported beyond the cut site
+        min_num_bases_before_cut: Min number of matching bases that must be seen before the cut site - the position of this first match will be reported
+        mismatch_tolerance: int How many mismatches to tolerate beyond the cut
+        gap_tolerance: int How many gaps to tolerate beyond the cut
+
+    returns:
+        dict with the same keys as ChromBridGE_tx.analyze_tx_alignment
+    """
+    cdef bytes aln_bytes = (read_aln_str + ref1_aln_str + ref2_aln_str).encode()
+    cdef int aln_len = len(read_aln_str)
+    if len(aln_bytes) != 3*aln_len:
+        raise ValueError('alignments must have the same length')
+    cdef TxParams params
+    cdef TxAlignment aln
+    cdef TxSummary summary
+    _set_tx_params(&params, ref1_cut_pos, ref2_cut_pos, min_num_bases_beyond_cut, min_num_bases_before_cut, mismatch_tolerance, gap_tolerance)
+    aln.read_aln = aln_bytes
+    aln.ref1_aln = aln.read_aln + aln_len
+    aln.ref2_aln = aln.read_aln + 2*aln_len
+    aln.aln_len = aln_len
+    aln.path_len = len(read_path)
+    aln.path_start = read_path[0] if aln.path_len > 0 else 0
+    aln.path_end = read_path[-1] if aln.path_len > 0 else 0
+    if aln.path_start != aln.path_end:
+        aln.first_breakpoint_read, aln.first_breakpoint_ref1, aln.first_breakpoint_ref2 = breakpoints_read[0], breakpoints_ref1[0], breakpoints_ref2[0]
+        aln.last_breakpoint_read, aln.last_breakpoint_ref1, aln.last_breakpoint_ref2 = breakpoints_read[-1], breakpoints_ref1[-1], breakpoints_ref2[-1]
+    if _analyze_tx(&aln, &params, &summary) == -1:
+        raise IndexError('alignment index out of range')
+    return _tx_summary_to_dict(&aln, &summary, read_aln_str, ref1_cut_pos, ref2_cut_pos)
+
+
 cpdef nw_breakpoint(str read_seq_py,
                     str ref1_seq_py,
                     str ref2_seq_py,
@@ -55,373 +4322,150 @@ cpdef nw_breakpoint(str read_seq_py,
         aln_score: score of alignment
         read_path: index of ref that the read is aligned to, corresponding to the break points (there will be len(breakpoints)+1 items in read_path)
     """
+    ref_pair = ReferencePair(ref1_seq_py, ref2_seq_py,
+            match_score=match_score,
+            mismatch_score=mismatch_score,
+            gap_score=gap_score,
+            perimeter_gap_extension_score=perimeter_gap_extension_score,
+            jump_score=jump_score,
+            cut_pos_jump_incentive_score=cut_pos_jump_incentive_score,
+            ref1_cut_pos=ref1_cut_pos,
+            ref2_cut_pos=ref2_cut_pos)
+    return ref_pair.align(read_seq_py, debug=debug)
 
-    score_type = np.intc
-
-    cdef const unsigned char[:] read_seq = read_seq_py.encode()
-    cdef const unsigned char[:] ref1_seq = ref1_seq_py.encode()
-    cdef const unsigned char[:] ref2_seq = ref2_seq_py.encode()
-
-    cdef char pointer_match = 1
-    cdef char pointer_gap_read = 2 #move from left
-    cdef char pointer_gap_ref = 3 #move from up
-    cdef char pointer_jump = 4
-
-    #read is columns, refs are rows
-    cdef int len_read = len(read_seq)
-    cdef int len_ref1 = len(ref1_seq)
-    cdef int len_ref2 = len(ref2_seq)
-
-    cdef int prefer_cut_ref1_idx = len_ref1 #if above/lower than this idx prefer match/mismatch over jump. If below/greater than this idx prefer jump over match/mismatch
-    cdef int prefer_cut_ref2_idx = len_ref2
-
-    #set jump incentive arrays (where jumping is less penalized at cut sites)
-    cdef int[:] jump_incentive_ref1 = np.zeros(len_ref1 + 1, dtype=score_type)
-    if ref1_cut_pos is not None:
-        jump_incentive_ref1[ref1_cut_pos] = cut_pos_jump_incentive_score
-        prefer_cut_ref1_idx = ref1_cut_pos + 1
-    cdef int[:] jump_incentive_ref2 = np.zeros(len_ref2 + 1, dtype=score_type)
-    if ref2_cut_pos is not None:
-        jump_incentive_ref2[ref2_cut_pos] = cut_pos_jump_incentive_score
-        prefer_cut_ref2_idx = ref2_cut_pos + 1
-
-    # Optimal score at each possible pair of characters.
-    score1_py = np.zeros((len_ref1 + 1, len_read + 1), dtype=score_type)
-    score1_py[:,0] = np.linspace(0, len_ref1*perimeter_gap_extension_score, len_ref1 + 1)
-    score1_py[0,:] = np.linspace(0, len_read*perimeter_gap_extension_score, len_read + 1)
-
-    score2_py = np.zeros((len_ref2 + 1, len_read + 1), dtype=score_type)
-    score2_py[:,0] = np.linspace(0, len_ref2*perimeter_gap_extension_score, len_ref2 + 1)
-    score2_py[0,:] = np.linspace(0, len_read*perimeter_gap_extension_score, len_read + 1)
-
-    #this hack keeps references from sliding all the way to the end
-    score1_py[1,0] = gap_score
-    score1_py[0,1] = gap_score
-
-    score2_py[1,0] = gap_score
-    score2_py[0,1] = gap_score
 
-    # Pointers to trace through an optimal aligment.
-    pointer1_py = np.zeros((len_ref1 + 1, len_read + 1),dtype=np.byte)
-    pointer1_py[:,0] = pointer_gap_ref
-    pointer1_py[0,:] = pointer_gap_read
-
-    pointer2_py = np.zeros((len_ref2 + 1, len_read + 1),dtype=np.byte)
-    pointer2_py[:,0] = pointer_gap_ref
-    pointer2_py[0,:] = pointer_gap_read
+def nw_breakpoint_batch(reads,
+                    str ref1_seq_py,
+                    str ref2_seq_py,
+                    int match_score=3,
+                    int mismatch_score=-1,
+                    int gap_score=-2,
+                    int perimeter_gap_extension_score=0,
+                    int jump_score=-12, # four matches
+                    int cut_pos_jump_incentive_score=1,
+                    ref1_cut_pos=None,
+                    ref2_cut_pos=None,
+                    int num_threads=0):
+    """
+    Computes the optimal alignment of each read in a batch to two seqences (see nw_breakpoint).
+    Alignments are computed without holding the GIL, and reads are distributed over num_threads threads.
 
+    params:
+        reads: list of reads to align to the other two sequences
+        ref1_seq: first sequence to align to
+        ref2_seq: second sequence to align to
+        match_score: score for adding a match in alignment (positive)
+        mismatch_score: score for adding a mismatch in alignment
+        gap_score: score for adding a gap in alignment
+        perimeter_gap_extension_score: score for adding a gap in the first/last column/row, corresponding to gaps at the beginning or ends of sequences
+        jump_score: score for jumping between ref1 and ref2
+        cut_pos_jump_incentive_score: score incentive for jumping at a predicted cut position
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
+        num_threads: number of threads to use (0 uses one thread per cpu)
 
-    #keep track of where the maximum is for jumping
-    #colmaxesInd keep track of the index (row) which had the max value. It's an array because there could be multiple values
-    cdef int[:] colmaxes1 = np.copy(score1_py[0,:])
-    cdef int[:] colmaxesInd1 = np.zeros(len_read + 1,dtype=score_type)
-    cdef int[:] colmaxes2 = np.copy(score2_py[0,:])
-    cdef int[:] colmaxesInd2 = np.zeros(len_read + 1,dtype=score_type)
-
-    #crazy python bug caught here:
-    # incorrect:
-    # colmaxesInd2 = [[0]]*(len_read + 1)
-    # because this produces referencs to a single array...
-# >>> d = [5]*5
-# >>> d
-# [5, 5, 5, 5, 5]
-# >>> d[1] += 5
-# >>> d
-# [5, 10, 5, 5, 5]
-# >>> d = [[5]]*5
-# >>> d
-# [[5], [5], [5], [5], [5]]
-# >>> d[1][0] += 5
-# >>> d
-# [[10], [10], [10], [10], [10]]
-
-
-
-    cdef int idx_read, idx_ref1, idx_ref2
-    cdef int this_match_or_mismatch_score, this_match_score, this_gap_up_score, this_gap_left_score, this_read_gap_score, this_ref_gap_score, this_jump_score, tmax, tmax_plus_jump
-    cdef int[:,:] score1 = score1_py #cython memory view
-    cdef int[:,:] score2 = score2_py
-    cdef char[:,:] pointer1 =  pointer1_py
-    cdef char[:,:] pointer2 =  pointer2_py
+    returns:
+        list of dicts (one per read) with the same keys as nw_breakpoint
+    """
+    ref_pair = ReferencePair(ref1_seq_py, ref2_seq_py,
+            match_score=match_score,
+            mismatch_score=mismatch_score,
+            gap_score=gap_score,
+            perimeter_gap_extension_score=perimeter_gap_extension_score,
+            jump_score=jump_score,
+            cut_pos_jump_incentive_score=cut_pos_jump_incentive_score,
+            ref1_cut_pos=ref1_cut_pos,
+            ref2_cut_pos=ref2_cut_pos)
+    return ref_pair.align_batch(reads, num_threads=num_threads)
 
-    for idx_read in range(1,len_read+1):
 
+def nw_breakpoint_score(str read_seq_py,
+                    str ref1_seq_py,
+                    str ref2_seq_py,
+                    int match_score=3,
+                    int mismatch_score=-1,
+                    int gap_score=-2,
+                    int perimeter_gap_extension_score=0,
+                    int jump_score=-12, # four matches
+                    int cut_pos_jump_incentive_score=1,
+                    ref1_cut_pos=None,
+                    ref2_cut_pos=None):
+    """
+    Computes the score of the optimal alignment of a read to two seqences (as in nw_breakpoint) and whether it jumps between them, without computing the alignment itself.
+    Only two columns are kept for each reference, so this is a cheap screen for reads that need a full alignment.
 
-        #do table 1 for this column
-        for idx_ref1 in range(1,len_ref1+1):
-            this_match_or_mismatch_score = mismatch_score #keep this separate for the jump score below
-            if read_seq[idx_read-1] == ref1_seq[idx_ref1-1]:
-                this_match_or_mismatch_score = match_score
-            this_match_score = score1[idx_ref1-1,idx_read-1] + this_match_or_mismatch_score
-
-            this_gap_up_score = gap_score
-            if idx_read == len_read: #if the last column, no gap penalty
-                this_gap_up_score = perimeter_gap_extension_score
-                if idx_ref1 ==len_ref1:#except for the bottom right cell with full penalty to shift alignments to the middle
-                    this_gap_up_score = gap_score
-
-            this_gap_left_score = gap_score
-            if idx_ref1 == len_ref1: #if the last row, no gap penalty
-                this_gap_left_score = perimeter_gap_extension_score
-                if idx_read == len_read:
-                    this_gap_left_score = gap_score
-
-            this_read_gap_score = score1[idx_ref1,idx_read-1] + this_gap_left_score
-            this_ref_gap_score = score1[idx_ref1-1,idx_read] + this_gap_up_score
-            #technically, a 'jump' is a 'jump and consume' so it's two steps, but because you would never have two jumps in a row, we can consume a base from the read sequence and do two steps (jump and consume) in one step based on the max values from the last column
-            this_jump_score = colmaxes2[idx_read-1] + jump_score + jump_incentive_ref1[idx_ref1 -1] + this_match_or_mismatch_score
-
-            tmax = mymax4(this_match_score,this_ref_gap_score,this_read_gap_score,this_jump_score)
-#            print('SCORE1')
-#            print('idx_read: ' + str(idx_read))
-#            print('idx_ref1: ' + str(idx_ref1))
-#            print('testing ' + read_seq[idx_read-1]+ ' and ' + ref1_seq[idx_ref1-1])
-#            print('this_match_score (diagonal): ' + str(this_match_score))
-#            print('this_ref_gap_score (left): ' + str(this_ref_gap_score))
-#            print('this_read_gap_score (up): ' + str(this_read_gap_score))
-#            print('this_jump_score: ' + str(this_jump_score))
-#            print('this_jump_score is colmax=' + str(colmaxes2[idx_read-1]) + ' + jumpscore='+ str(jump_score) + ' + incentive=' + str(jump_incentive_ref1[idx_ref1-1]) + ' + match_or_mismatch=' + str(this_match_or_mismatch_score))
-#            print('tmax: ' + str(tmax))
-#            print('score1:')
-#            score1[idx_ref1,idx_read] = '-100'
-#            print(score1)
-#            print('pointer1:')
-#            print(pointer1)
-
-
-            score1[idx_ref1,idx_read] = tmax
-            if idx_ref1 < prefer_cut_ref1_idx:
-                # prefer jump over match/mismatch if above
-                if this_jump_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_jump
-                elif this_match_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_match
-                elif this_ref_gap_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_gap_ref
-                elif this_read_gap_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_gap_read
-            else:
-                # prefer match/mismatch/gap if below
-                if this_match_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_match
-                elif this_ref_gap_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_gap_ref
-                elif this_read_gap_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_gap_read
-                elif this_jump_score == tmax:
-                    pointer1[idx_ref1,idx_read] = pointer_jump
-
-#            print('comparing tmax ' + str(tmax) + ' to val: ' + str(colmaxes1[idx_read]))
-            tmax_plus_jump = tmax + jump_incentive_ref1[idx_ref1]
-            if tmax_plus_jump > colmaxes1[idx_read]:
-                colmaxes1[idx_read] = tmax_plus_jump
-                colmaxesInd1[idx_read] = idx_ref1
-
-
-        for idx_ref2 in range(1,len_ref2+1):
-            this_match_or_mismatch_score = mismatch_score
-            if read_seq[idx_read-1] == ref2_seq[idx_ref2-1]:
-                this_match_or_mismatch_score = match_score
-            this_match_score = score2[idx_ref2-1,idx_read-1] + this_match_or_mismatch_score
-
-            this_gap_up_score = gap_score
-            if idx_read == len_read: #if the last column, no gap penalty
-                this_gap_up_score = perimeter_gap_extension_score
-                if idx_ref2 ==len_ref2:#except for the bottom right cell with full penalty to shift alignments to the middle
-                    this_gap_up_score = gap_score
-
-            this_gap_left_score = gap_score
-            if idx_ref2 == len_ref2: #if the last row, no gap penalty
-                this_gap_left_score = perimeter_gap_extension_score
-                if idx_read == len_read:
-                    this_gap_left_score = gap_score
-
-            this_read_gap_score = score2[idx_ref2,idx_read-1] + this_gap_left_score
-            this_ref_gap_score = score2[idx_ref2-1,idx_read] + this_gap_up_score
-            this_jump_score = colmaxes1[idx_read-1] + jump_score + jump_incentive_ref2[idx_ref2 - 1] + this_match_or_mismatch_score
-
-
-            tmax = mymax4(this_match_score,this_ref_gap_score,this_read_gap_score,this_jump_score)
-#            print('SCORE2')
-#            print('idx_read: ' + str(idx_read))
-#            print('idx_ref2: ' + str(idx_ref2))
-#            print('testing ' + read_seq[idx_read-1]+ ' and ' + ref2_seq[idx_ref2-1])
-#            print('this_match_score: ' + str(this_match_score))
-#            print('this_ref_gap_score (left): ' + str(this_ref_gap_score))
-#            print('this_read_gap_score (up): ' + str(this_read_gap_score))
-#            print('this_jump_score: ' + str(this_jump_score))
-#            print('this_jump_score is colmax=' + str(colmaxes1[idx_read-1]) + ' + jumpscore='+ str(jump_score) + ' + incentive=' + str(jump_incentive_ref2[idx_ref2 - 1]) + ' + match_or_mismatch=' + str(this_match_or_mismatch_score))
-#            print('tmax: ' + str(tmax))
-#            print('score2:')
-#            score2[idx_ref2,idx_read] = '-100'
-#            print(score2)
-#            print('pointer2:')
-#            print(pointer2)
-
-            score2[idx_ref2,idx_read] = tmax
-            if idx_ref2 < prefer_cut_ref2_idx:
-                if this_jump_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_jump
-                elif this_match_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_match
-                elif this_ref_gap_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_gap_ref
-                elif this_read_gap_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_gap_read
-            else:
-                if this_match_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_match
-                elif this_ref_gap_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_gap_ref
-                elif this_read_gap_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_gap_read
-                elif this_jump_score == tmax:
-                    pointer2[idx_ref2,idx_read] = pointer_jump
-
-#            print('comparing tmax ' + str(tmax) + ' to val: ' + str(colmaxes2[idx_read]))
-            tmax_plus_jump = tmax + jump_incentive_ref2[idx_ref2]
-            if tmax_plus_jump > colmaxes2[idx_read]:
-                colmaxes2[idx_read] = tmax_plus_jump
-                colmaxesInd2[idx_read] = idx_ref2
-
-
-    if debug:
-        np.set_printoptions(threshold=np.inf)
-        print('jump_incentive_ref1')
-        print(np.array(jump_incentive_ref1))
-        print('score1:')
-        print(np.array(score1))
-        print('pointer1:')
-        print(np.array(pointer1))
-        print('colmaxes1:')
-        print(np.array(colmaxes1))
-        print('colmaxesInd1:')
-        print(np.array(colmaxesInd1))
+    params:
+        read_seq: read to align to the other two sequences
+        ref1_seq: first sequence to align to
+        ref2_seq: second sequence to align to
+        match_score: score for adding a match in alignment (positive)
+        mismatch_score: score for adding a mismatch in alignment
+        gap_score: score for adding a gap in alignment
+        perimeter_gap_extension_score: score for adding a gap in the first/last column/row, corresponding to gaps at the beginning or ends of sequences
+        jump_score: score for jumping between ref1 and ref2
+        cut_pos_jump_incentive_score: score incentive for jumping at a predicted cut position
+        ref1_cut_pos: position of predicted cut site in ref1
+        ref2_cut_pos: position of predicted cut site in ref2
 
-        print('jump_incentive_ref2')
-        print(np.array(jump_incentive_ref2))
-        print('score2:')
-        print(np.array(score2))
-        print('pointer2:')
-        print(np.array(pointer2))
-        print('colmaxes2:')
-        print(np.array(colmaxes2))
-        print('colmaxesInd2:')
-        print(np.array(colmaxesInd2))
+    returns:
+        dict containing:
+        aln_score: score of alignment (same as nw_breakpoint)
+        aln_ref: index of the ref that the alignment ends in (the last item of read_path from nw_breakpoint)
+        has_jump: whether the optimal alignment jumps between references (whether nw_breakpoint would report breakpoints)
+        single_ref_score: score of the best alignment to either ref1 or ref2 alone, without jumps
+    """
+    ref_pair = ReferencePair(ref1_seq_py, ref2_seq_py,
+            match_score=match_score,
+            mismatch_score=mismatch_score,
+            gap_score=gap_score,
+            perimeter_gap_extension_score=perimeter_gap_extension_score,
+            jump_score=jump_score,
+            cut_pos_jump_incentive_score=cut_pos_jump_incentive_score,
+            ref1_cut_pos=ref1_cut_pos,
+            ref2_cut_pos=ref2_cut_pos)
+    return ref_pair.align_score(read_seq_py)
 
-    # Trace through an optimal alignment.
-    idx_read = len_read
-    idx_ref = len_ref1
-    curr_matrix = 1
-    max_score = score1[len_ref1,len_read]
-    if score1[len_ref1,len_read] < score2[len_ref2,len_read]:
-        idx_ref = len_ref2
-        curr_matrix = 2
-        max_score = score2[len_ref2,len_read]
-
-    final_read_aln = []
-    final_ref1_aln = []
-    final_ref2_aln = []
-    breakpoints_read = []
-    breakpoints_ref1 = []
-    breakpoints_ref2 = []
-    read_path = [curr_matrix]
 
-    while idx_read > 0 or idx_ref > 0:
-#        print('curr matrix: ' + str(curr_matrix))
-#        print('idx_read: ' + str(idx_read))
-#        print('idx_ref: ' + str(idx_ref))
-#        print('     breakpoints_read: ' + str(breakpoints_read))
-#        print('     final_read_aln: ' + ''.join(final_read_aln[::-1]))
-#        print('     final_ref1_aln: ' + ''.join(final_ref1_aln[::-1]))
-#        print('     final_ref2_aln: ' + ''.join(final_ref2_aln[::-1]))
-        if curr_matrix == 1:
-#            print('     pointer1: ' + str(pointer1[idx_ref,idx_read]))
-            if pointer1[idx_ref,idx_read] == pointer_match:
-                final_read_aln.append(chr(read_seq[idx_read-1]))
-                final_ref1_aln.append(chr(ref1_seq[idx_ref-1]))
-                final_ref2_aln.append(" ")
-                idx_read -= 1
-                idx_ref -= 1
-            elif pointer1[idx_ref,idx_read] == pointer_gap_read:
-                final_read_aln.append(chr(read_seq[idx_read-1]))
-                final_ref1_aln.append("-")
-                final_ref2_aln.append(" ")
-                idx_read -= 1
-            elif pointer1[idx_ref,idx_read] == pointer_gap_ref:
-                final_read_aln.append("-")
-                final_ref1_aln.append(chr(ref1_seq[idx_ref-1]))
-                final_ref2_aln.append(" ")
-                idx_ref -= 1
-            elif pointer1[idx_ref,idx_read] == pointer_jump:
-                final_read_aln.append(chr(read_seq[idx_read-1]))
-                final_ref1_aln.append(chr(ref1_seq[idx_ref-1]))
-                final_ref2_aln.append(" ")
-                idx_read -= 1
-                curr_matrix = 2
-                breakpoints_ref1.append(idx_ref-1)
-                idx_ref = colmaxesInd2[idx_read]
-                breakpoints_read.append(idx_read)
-                breakpoints_ref2.append(idx_ref)
-                read_path.append(curr_matrix)
-
-        elif curr_matrix == 2:
-#            print('     pointer2: ' + str(pointer2[idx_ref,idx_read]))
-            if pointer2[idx_ref,idx_read] == pointer_match:
-                final_read_aln.append(chr(read_seq[idx_read-1]))
-                final_ref1_aln.append(" ")
-                final_ref2_aln.append(chr(ref2_seq[idx_ref-1]))
-                idx_read -= 1
-                idx_ref -= 1
-            elif pointer2[idx_ref,idx_read] == pointer_gap_read:
-                final_read_aln.append(chr(read_seq[idx_read-1]))
-                final_ref1_aln.append(" ")
-                final_ref2_aln.append("-")
-                idx_read -= 1
-            elif pointer2[idx_ref,idx_read] == pointer_gap_ref:
-                final_read_aln.append("-")
-                final_ref1_aln.append(" ")
-                final_ref2_aln.append(chr(ref2_seq[idx_ref-1]))
-                idx_ref -= 1
-            elif pointer2[idx_ref,idx_read] == pointer_jump:
-                final_read_aln.append(chr(read_seq[idx_read-1]))
-                final_ref2_aln.append(chr(ref2_seq[idx_ref-1]))
-                final_ref1_aln.append(" ")
-                idx_read -= 1
-                curr_matrix = 1
-                breakpoints_ref2.append(idx_ref-1)
-                idx_ref = colmaxesInd1[idx_read]
-                breakpoints_read.append(idx_read)
-                breakpoints_ref1.append(idx_ref)
-                read_path.append(curr_matrix)
-
-#                final_read_aln.append(read_seq[idx_read-1])
-#                final_ref1_aln.append(" ")
-#                final_ref2_aln.append(ref2_seq[idx_ref-1])
-#                idx_read -= 1
-#                curr_matrix = 1
-#                idx_ref = colmaxesInd1[idx_read]
-#                breakpoints_ref2.append(idx_ref-1)
-#                breakpoints_read.append(idx_read)
-#                breakpoints_ref2.append(idx_ref)
-
-    # Reverse the strings.
-    final_read_aln_str = ''.join(final_read_aln)[::-1]
-    final_ref1_aln_str = ''.join(final_ref1_aln)[::-1]
-    final_ref2_aln_str = ''.join(final_ref2_aln)[::-1]
-    final_read_path = read_path[::-1]
-    final_breakpoints_read = breakpoints_read[::-1]
-    final_breakpoints_ref1 = breakpoints_ref1[::-1]
-    final_breakpoints_ref2 = breakpoints_ref2[::-1]
+def nw_breakpoint_panel(str read_seq_py,
+                    ref_seqs,
+                    int match_score=3,
+                    int mismatch_score=-1,
+                    int gap_score=-2,
+                    int perimeter_gap_extension_score=0,
+                    int jump_score=-12, # four matches
+                    int cut_pos_jump_incentive_score=1,
+                    ref_cut_pos=None):
+    """
+    Computes the optimal alignment of a read to a panel of sequences in one pass, locating the optimal breaks between them (see ReferencePanel).
+    The alignment score will be the sum of the match, mismatch, gap, and jump scores, as in nw_breakpoint.
 
-    return({
-        "read_aln":final_read_aln_str,
-        "ref1_aln":final_ref1_aln_str,
-        "ref2_aln":final_ref2_aln_str,
-        "breakpoints_read":final_breakpoints_read,
-        "breakpoints_ref1":final_breakpoints_ref1,
-        "breakpoints_ref2":final_breakpoints_ref2,
-        "aln_score":max_score, 
-        "read_path":final_read_path
-        })
+    params:
+        read_seq: read to align to the sequences
+        ref_seqs: list of sequences to align to
+        match_score: score for adding a match in alignment (positive)
+        mismatch_score: score for adding a mismatch in alignment
+        gap_score: score for adding a gap in alignment
+        perimeter_gap_extension_score: score for adding a gap in the first/last column/row, corresponding to gaps at the beginning or ends of sequences
+        jump_score: score for jumping between sequences
+        cut_pos_jump_incentive_score: score incentive for jumping at a predicted cut position
+        ref_cut_pos: list of the positions of the predicted cut sites in each sequence (None for a sequence without a predicted cut site), or None if no cut sites are given
 
+    returns:
+        dict containing:
+        read_aln: aligned sequence of read
+        ref_alns: list with the sequence of each ref aligned to read (spaces where the read is aligned to another ref)
+        breakpoints_read: indices in read of the breakpoints discovered
+        breakpoints_ref_from: indices of the breakpoints in the ref that the read jumps from (read_path[i] for breakpoint i)
+        breakpoints_ref_to: indices of the breakpoints in the ref that the read jumps to (read_path[i+1] for breakpoint i)
+        aln_score: score of alignment
+        read_path: index (starting at 1) of ref that the read is aligned to, corresponding to the break points (there will be len(breakpoints)+1 items in read_path)
+    """
+    ref_panel = ReferencePanel(ref_seqs,
+            match_score=match_score,
+            mismatch_score=mismatch_score,
+            gap_score=gap_score,
+            perimeter_gap_extension_score=perimeter_gap_extension_score,
+            jump_score=jump_score,
+            cut_pos_jump_incentive_score=cut_pos_jump_incentive_score,
+            ref_cut_pos=ref_cut_pos)
+    return ref_panel.align(read_seq_py)
@@ -0,0 +1,93 @@
+import numpy as np
+
+# 2-bit code of each base in k-mers (other bytes are 255, and k-mers containing them are skipped)
+BASE_CODES = np.full(256, 255, dtype=np.uint8)
+for base_code, base in enumerate(b'ACGT'):
+    BASE_CODES[base] = base_code
+    BASE_CODES[ord(chr(base).lower())] = base_code
+
+# k-mers are packed into 64-bit integers
+MAX_KMER_SIZE = 31
+
+
+def get_kmer_codes(seq, kmer_size):
+    """
+    Returns the distinct k-mers of a sequence packed into integers (2 bits per base)
+    K-mers containing bases other than A, C, G or T are skipped
+
+    params:
+        seq: sequence
+        kmer_size: number of bases in each k-mer (at most MAX_KMER_SIZE)
+
+    returns:
+        sorted numpy array of the distinct packed k-mers (np.uint64)
+    """
+    if len(seq) < kmer_size:
+        return np.zeros(0, dtype=np.uint64)
+    codes = BASE_CODES[np.frombuffer(seq.encode(), dtype=np.uint8)]
+    windows = np.lib.stride_tricks.sliding_window_view(codes, kmer_size)
+    is_valid = np.all(windows != 255, axis=1)
+    shifts = np.arange(2*(kmer_size-1), -1, -2, dtype=np.uint64)
+    kmer_codes = np.bitwise_or.reduce(windows[is_valid].astype(np.uint64) << shifts, axis=1)
+    return np.unique(kmer_codes)
+
+
+class KmerIndex:
+    """
+    Index of the k-mers of a panel of reference sequences, used to pick the pairs of references that a read is most likely to come from without aligning it to every pair.
+    The index is stored in two arrays (the sorted distinct k-mers of each reference and the reference of each k-mer), so it takes 12 bytes per k-mer and reference and is cheap to send to (or share with) worker processes.
+
+    params:
+        ref_seqs: list of reference sequences
+        kmer_size: number of bases in each k-mer (at most MAX_KMER_SIZE)
+    """
+    def __init__(self, ref_seqs, kmer_size=15):
+        if kmer_size < 1 or kmer_size > MAX_KMER_SIZE:
+            raise ValueError('kmer_size must be between 1 and ' + str(MAX_KMER_SIZE))
+        self.kmer_size = kmer_size
+        self.num_refs = len(ref_seqs)
+        ref_kmers = [get_kmer_codes(ref_seq, kmer_size) for ref_seq in ref_seqs]
+        kmers = np.concatenate([np.zeros(0, dtype=np.uint64)] + ref_kmers)
+        ref_ids = np.repeat(np.arange(self.num_refs, dtype=np.int32), [len(kmer_codes) for kmer_codes in ref_kmers])
+        order = np.argsort(kmers, kind='stable')
+        self.kmers = kmers[order]
+        self.ref_ids = ref_ids[order]
+
+    def count_shared_kmers(self, seq):
+        """
+        Counts the distinct k-mers of a sequence that are found in each reference
+
+        params:
+            seq: sequence to look up
+
+        returns:
+            numpy array with the number of shared k-mers for each reference
+        """
+        kmer_codes = get_kmer_codes(seq, self.kmer_size)
+        starts = np.searchsorted(self.kmers, kmer_codes, side='left')
+        ends = np.searchsorted(self.kmers, kmer_codes, side='right')
+        lengths = ends - starts
+        # indices of every entry in the index matching one of the k-mers
+        entry_inds = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.ref_ids[entry_inds], minlength=self.num_refs)
+
+    def get_candidate_pairs(self, read_seq, num_pairs=1):
+        """
+        Returns the pairs of references that a read most likely comes from
+        Each pair of different references is scored by the k-mers shared by the left half of the read with one reference and by the right half of the read with the other (in either order), so reads from a single reference pick that reference and the reference sharing the most k-mers with the rest of the read. Ties go to the references listed first
+
+        params:
+            read_seq: read sequence
+            num_pairs: number of pairs to return
+
+        returns:
+            list of up to num_pairs tuples of (ref index, ref index) with the lower index first, best pair first
+        """
+        half_len = len(read_seq) // 2
+        left_counts = self.count_shared_kmers(read_seq[:half_len])
+        right_counts = self.count_shared_kmers(read_seq[half_len:])
+        pair_scores = left_counts[:, None] + right_counts[None, :]
+        pair_scores = np.maximum(pair_scores, pair_scores.T)
+        ref_inds1, ref_inds2 = np.triu_indices(self.num_refs, k=1)
+        order = np.argsort(-pair_scores[ref_inds1, ref_inds2], kind='stable')[:num_pairs]
+        return [(int(ref_inds1[i]), int(ref_inds2[i])) for i in order]
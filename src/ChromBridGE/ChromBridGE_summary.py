@@ -0,0 +1,126 @@
+import numpy as np
+
+from ChromBridGE.ChromBridGE_tx import TxStatus, get_tx_status_str
+
+# tx statuses counted in a summary: those of the translocation analysis, then those of reads that are not aligned because of their primers
+# the status of reads without cut positions includes the cut positions, so it is counted by its prefix
+UNKNOWN_TX_STATUS = 'Unknown/breakpoints not given'
+SUMMARY_TX_STATUSES = [get_tx_status_str(status) for status in TxStatus if status != TxStatus.UNKNOWN] + \
+        [UNKNOWN_TX_STATUS, 'Not aligned (primers AA)', 'Not aligned (primers BB)']
+_SUMMARY_TX_STATUS_INDS = {tx_status: status_ind for status_ind, tx_status in enumerate(SUMMARY_TX_STATUSES)}
+# statuses of reads whose breakpoints are likely translocations (the rest of the reads with breakpoints are unlikely translocations)
+LIKELY_TX_STATUSES = [get_tx_status_str(TxStatus.TX_A_B), get_tx_status_str(TxStatus.TX_B_A)]
+
+
+def get_summary_tx_status_ind(tx_status):
+    """
+    Returns the index in SUMMARY_TX_STATUSES of the tx status of a read
+
+    params:
+        tx_status: tx status string written for the read
+
+    returns:
+        index of the status in SUMMARY_TX_STATUSES
+    """
+    if tx_status.startswith(UNKNOWN_TX_STATUS):
+        return _SUMMARY_TX_STATUS_INDS[UNKNOWN_TX_STATUS]
+    return _SUMMARY_TX_STATUS_INDS[tx_status]
+
+
+class BreakpointSummary:
+    """
+    Counts of the reads of a run by tx status, and of the breakpoints of the reads by reference, position in the reference and tx status of the read, weighted by the number of reads with each sequence.
+    The counts are kept in numpy arrays, so summaries of the chunks of a run (e.g. from worker processes) can be merged cheaply, and only the non-zero counts are pickled.
+
+    params:
+        ref_names: names of the references (A and B, or the names of the sites of a panel)
+        ref_lens: length of each reference (breakpoints are between 0 and the length of their reference)
+        site_fields: whether the result fields added to the summary start with the names of their two sites (with --config)
+    """
+    def __init__(self, ref_names, ref_lens, site_fields=False):
+        self.ref_names = list(ref_names)
+        self.ref_lens = list(ref_lens)
+        self.site_fields = site_fields
+        self._ref_inds = {ref_name: ref_ind for ref_ind, ref_name in enumerate(self.ref_names)}
+        # reads of each status, and reads of each status with at least one breakpoint
+        self.read_counts = np.zeros(len(SUMMARY_TX_STATUSES), dtype=np.int64)
+        self.breakpoint_read_counts = np.zeros(len(SUMMARY_TX_STATUSES), dtype=np.int64)
+        # breakpoints of each reference at each position, by status of the read
+        self.breakpoint_counts = np.zeros((len(self.ref_names), max(self.ref_lens, default=0) + 1, len(SUMMARY_TX_STATUSES)), dtype=np.int64)
+
+    def add_result_fields(self, result_fields, read_count=1):
+        """
+        Adds a read to the summary from the summary fields of its result
+
+        params:
+            result_fields: tuple of the tx status of the read and its list of (read, ref1, ref2) breakpoints, preceded by the names of its two sites if site_fields (see ChromBridGE.get_summary_fields)
+            read_count: number of reads with these results
+        """
+        ref_ind1, ref_ind2 = 0, 1
+        if self.site_fields:
+            site_name1, site_name2, tx_status, breakpoints = result_fields
+            ref_ind1, ref_ind2 = self._ref_inds[site_name1], self._ref_inds[site_name2]
+        else:
+            tx_status, breakpoints = result_fields
+        status_ind = get_summary_tx_status_ind(tx_status)
+        self.read_counts[status_ind] += read_count
+        if len(breakpoints) == 0:
+            return
+        self.breakpoint_read_counts[status_ind] += read_count
+        for bp_read, bp_ref1, bp_ref2 in breakpoints:
+            self.breakpoint_counts[ref_ind1, bp_ref1, status_ind] += read_count
+            self.breakpoint_counts[ref_ind2, bp_ref2, status_ind] += read_count
+
+    def merge(self, other):
+        """
+        Adds the counts of another summary of the same references to this summary
+
+        params:
+            other: BreakpointSummary to add
+        """
+        self.read_counts += other.read_counts
+        self.breakpoint_read_counts += other.breakpoint_read_counts
+        self.breakpoint_counts += other.breakpoint_counts
+
+    def get_total_counts(self):
+        """
+        Returns the total number of reads, and the numbers of likely A>B and B>A translocations and of unlikely translocations (reads with breakpoints that are not likely translocations)
+
+        returns:
+            dict of category -> read count
+        """
+        likely_tx_inds = [_SUMMARY_TX_STATUS_INDS[tx_status] for tx_status in LIKELY_TX_STATUSES]
+        return {
+                'Total reads': int(self.read_counts.sum()),
+                'Likely tx A>B': int(self.read_counts[likely_tx_inds[0]]),
+                'Likely tx B>A': int(self.read_counts[likely_tx_inds[1]]),
+                'Unlikely tx': int(self.breakpoint_read_counts.sum() - self.breakpoint_read_counts[likely_tx_inds].sum()),
+                }
+
+    def write(self, f_out):
+        """
+        Writes the summary as two tab-separated tables separated by an empty line: the read counts of each tx status and of each total (see get_total_counts), and the non-zero breakpoint counts of each reference, position and tx status
+
+        params:
+            f_out: file to write to
+        """
+        f_out.write("tx_status\tread_count\n")
+        for status_ind, tx_status in enumerate(SUMMARY_TX_STATUSES):
+            if self.read_counts[status_ind] > 0:
+                f_out.write(tx_status + "\t" + str(self.read_counts[status_ind]) + "\n")
+        for category, read_count in self.get_total_counts().items():
+            f_out.write(category + "\t" + str(read_count) + "\n")
+        f_out.write("\nref\tbreakpoint_pos\ttx_status\tread_count\n")
+        for ref_ind, pos, status_ind in zip(*np.nonzero(self.breakpoint_counts)):
+            f_out.write("\t".join([self.ref_names[ref_ind], str(pos), SUMMARY_TX_STATUSES[status_ind], str(self.breakpoint_counts[ref_ind, pos, status_ind])]) + "\n")
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['breakpoint_counts'] = (np.flatnonzero(self.breakpoint_counts), self.breakpoint_counts[np.nonzero(self.breakpoint_counts)], self.breakpoint_counts.shape)
+        return state
+
+    def __setstate__(self, state):
+        flat_inds, counts, shape = state['breakpoint_counts']
+        state['breakpoint_counts'] = np.zeros(shape, dtype=np.int64)
+        state['breakpoint_counts'].flat[flat_inds] = counts
+        self.__dict__.update(state)
@@ -1,12 +1,269 @@
+import bisect
+import enum
 import numpy as np
+
+
+class TxStatus(enum.IntEnum):
+    """
+    Codes of the tx status of a read (see get_tx_status_str for the status reported for each code)
+    """
+    UNKNOWN = 0
+    NOT_ALIGNED = 1
+    NO_BREAKPOINTS = 2
+    MULTIPLE_BREAKPOINTS = 3
+    INVALID_BREAKPOINTS = 4
+    TX_A_B = 5
+    TX_B_A = 6
+    INCOMPATIBLE_BREAKPOINTS = 7
+
+TX_STATUS_STRS = {
+    TxStatus.NOT_ALIGNED: 'Not aligned (score below min_score)',
+    TxStatus.NO_BREAKPOINTS: 'No breakpoints detected',
+    TxStatus.MULTIPLE_BREAKPOINTS: 'Multiple breakpoints detected',
+    TxStatus.INVALID_BREAKPOINTS: 'Valid breakpoints could not be identified',
+    TxStatus.TX_A_B: 'Tx A>B',
+    TxStatus.TX_B_A: 'Tx B>A',
+    TxStatus.INCOMPATIBLE_BREAKPOINTS: 'Breakpoints incompatible with given cuts',
+}
+
+def get_tx_status_str(status, ref1_cut_pos=None, ref2_cut_pos=None):
+    """
+    Returns the tx status string reported for a status code
+
+    params:
+        status: TxStatus code
+        ref1_cut_pos: position of predicted cut site in ref1 (reported for TxStatus.UNKNOWN)
+        ref2_cut_pos: position of predicted cut site in ref2 (reported for TxStatus.UNKNOWN)
+
+    returns:
+        tx status string
+    """
+    if status == TxStatus.UNKNOWN:
+        return 'Unknown/breakpoints not given (' + str(ref1_cut_pos) + ' and ' + str(ref2_cut_pos) + ')'
+    return TX_STATUS_STRS[status]
+
+#value of integer fields of result arrays that are not set (same as ChromBridGE_aln.MISSING_VALUE)
+MISSING_VALUE = np.iinfo(np.int32).min
+
+#one row of the array filled by analyze_tx_batch
+TX_RESULT_DTYPE = np.dtype([
+    ('status', np.int8),
+    ('is_tx', np.bool_),
+    ('final_breakpoint_ref1', np.int32),
+    ('final_breakpoint_ref2', np.int32),
+    ('bp_match_ref1', np.int32),
+    ('bp_match_ref2', np.int32),
+    ('left_dist', np.int32),
+    ('right_dist', np.int32),
+    ('tx_lucky_insertions', np.int32),
+    ])
+
+TX_RESULT_KEYS = ("final_read_str", "final_ref1_str", "final_ref2_str", "final_path",
+        "final_breakpoint_ref1", "final_breakpoint_ref2", "bp_match_ref1", "bp_match_ref2", "bp_insertion",
+        "is_tx", "tx_status", "left_dist", "right_dist", "tx_lucky_insertions")
+
+
+class TxResult:
+    """
+    Result of the translocation analysis of an alignment (see get_tx_result)
+    The status is stored as a TxStatus code, and tx_status is only formatted when it is read. Fields can be read as attributes, or by key like the dict returned by analyze_tx_alignment (see to_dict)
+    """
+    __slots__ = ("final_read_str", "final_ref1_str", "final_ref2_str", "final_path",
+            "final_breakpoint_ref1", "final_breakpoint_ref2", "bp_match_ref1", "bp_match_ref2", "bp_insertion",
+            "is_tx", "status", "left_dist", "right_dist", "tx_lucky_insertions", "ref1_cut_pos", "ref2_cut_pos")
+
+    def __init__(self, final_read_str, final_ref1_str, final_ref2_str, final_path,
+            final_breakpoint_ref1, final_breakpoint_ref2, bp_match_ref1, bp_match_ref2, bp_insertion,
+            is_tx, status, left_dist, right_dist, tx_lucky_insertions, ref1_cut_pos=None, ref2_cut_pos=None):
+        self.final_read_str = final_read_str
+        self.final_ref1_str = final_ref1_str
+        self.final_ref2_str = final_ref2_str
+        self.final_path = final_path
+        self.final_breakpoint_ref1 = final_breakpoint_ref1
+        self.final_breakpoint_ref2 = final_breakpoint_ref2
+        self.bp_match_ref1 = bp_match_ref1
+        self.bp_match_ref2 = bp_match_ref2
+        self.bp_insertion = bp_insertion
+        self.is_tx = is_tx
+        self.status = status
+        self.left_dist = left_dist
+        self.right_dist = right_dist
+        self.tx_lucky_insertions = tx_lucky_insertions
+        self.ref1_cut_pos = ref1_cut_pos
+        self.ref2_cut_pos = ref2_cut_pos
+
+    @property
+    def tx_status(self):
+        return get_tx_status_str(self.status, self.ref1_cut_pos, self.ref2_cut_pos)
+
+    def __getitem__(self, key):
+        if key not in TX_RESULT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self):
+        return TX_RESULT_KEYS
+
+    def to_dict(self):
+        """
+        Returns the dict returned by analyze_tx_alignment for this result
+        """
+        return {key: getattr(self, key) for key in TX_RESULT_KEYS}
+
+    def to_row(self):
+        """
+        Returns the numeric fields of this result as a tuple in the order of TX_RESULT_DTYPE
+        """
+        return (self.status, self.is_tx,
+                MISSING_VALUE if self.final_breakpoint_ref1 is None else self.final_breakpoint_ref1,
+                MISSING_VALUE if self.final_breakpoint_ref2 is None else self.final_breakpoint_ref2,
+                self.bp_match_ref1, self.bp_match_ref2,
+                MISSING_VALUE if self.left_dist is None else self.left_dist,
+                MISSING_VALUE if self.right_dist is None else self.right_dist,
+                self.tx_lucky_insertions)
+
+    def __repr__(self):
+        return 'TxResult(' + repr(self.to_dict()) + ')'
+
+def _find_all(seq, char):
+    """
+    Returns the sorted positions of char in seq (searched with str.find, which is fast for characters that are rare, like gaps)
+    """
+    positions = []
+    pos = seq.find(char)
+    while pos >= 0:
+        positions.append(pos)
+        pos = seq.find(char, pos + 1)
+    return positions
+
+class AlignmentMaps:
+    """
+    Coordinate maps of the alignment of a read to one or more references, built in one vectorized pass over the alignment bytes and shared by the tx refinement helpers (see AlignmentIndex)
+
+    params:
+        read_aln_str: Alignment of the read (including gaps)
+        ref_aln_strs: Alignments of the refs (including gaps or spaces if the sequence doesn't align)
+
+    attributes:
+        aln_bytes: array of the alignment bytes, with one row for the read followed by one row for each ref
+        bases_before: array with the same rows, where bases_before[row, i] is the number of bases (not gaps) of that row before alignment position i (the map from alignment to read or ref coordinates)
+        read_ind_in_aln: index in the alignment of each base of the read (the map from read to alignment coordinates), padded with zeros to the alignment length
+    """
+    __slots__ = ("aln_len", "aln_bytes", "bases_before", "read_ind_in_aln")
+
+    def __init__(self, read_aln_str, ref_aln_strs):
+        self.aln_len = len(read_aln_str)
+        self.aln_bytes = np.frombuffer(''.join([read_aln_str] + list(ref_aln_strs)).encode(), dtype=np.uint8).reshape(1 + len(ref_aln_strs), -1)
+        is_base = self.aln_bytes != ord('-')
+        self.bases_before = np.zeros((len(is_base), self.aln_len + 1), dtype=np.intp)
+        np.cumsum(is_base, axis=1, out=self.bases_before[:, 1:])
+        read_ind_in_aln = is_base[0].nonzero()[0]
+        self.read_ind_in_aln = np.zeros(self.aln_len, dtype=np.intc)
+        self.read_ind_in_aln[:len(read_ind_in_aln)] = read_ind_in_aln
+
+    def get_aln_pos(self, row, num_bases):
+        """
+        Returns the index in the alignment of base num_bases (0-based) of a row (the map from read or ref to alignment coordinates), or aln_len if the row has no such base
+        """
+        return int(np.searchsorted(self.bases_before[row], num_bases + 1, side='left')) - 1
+
+class AlignmentIndex:
+    """
+    Index of the alignment of a read to one reference, built once per alignment so that get_ref_cut_pos_in_aln, get_first_matching_pos and get_last_matching_pos answer each query with a few lookups and binary searches instead of walking (and re-checking) the alignment base by base
+    Stores the coordinate maps of the alignment (see AlignmentMaps) and the sorted positions of mismatches (including gaps) and gaps. Spaces come in blocks where the read is aligned to the other reference, so they are found with str.find rather than listed with the mismatches
+
+    params:
+        read_aln_str: Alignment of the read (including gaps)
+        ref_aln_str: Alignment of the ref (including gaps or spaces if the sequence doesn't align)
+        aln_maps: AlignmentMaps of the read and ref alignments (possibly with other refs) to share with other indexes (built here if None)
+        ref_row: row of the ref in aln_maps
+    """
+    __slots__ = ("aln_len", "ref_aln_str", "aln_maps", "ref_row", "mismatch_pos", "read_gap_pos", "gap_pos", "_long_runs")
+
+    def __init__(self, read_aln_str, ref_aln_str, aln_maps=None, ref_row=1):
+        if aln_maps is None:
+            aln_maps = AlignmentMaps(read_aln_str, [ref_aln_str])
+            ref_row = 1
+        self.aln_len = aln_maps.aln_len
+        self.ref_aln_str = ref_aln_str
+        self.aln_maps = aln_maps
+        self.ref_row = ref_row
+        # positions are kept in lists, which are faster than numpy arrays to search one position at a time
+        read_aln = aln_maps.aln_bytes[0]
+        ref_aln = aln_maps.aln_bytes[ref_row]
+        self.mismatch_pos = ((read_aln != ref_aln) & (ref_aln != ord(' '))).nonzero()[0].tolist()
+        self.read_gap_pos = _find_all(read_aln_str, '-')
+        self.gap_pos = sorted(self.read_gap_pos + _find_all(ref_aln_str, '-'))
+        self._long_runs = {}
+
+    def get_next_space(self, idx):
+        """
+        Returns the first position of a space in the ref alignment at or after idx, or None if there is none
+        """
+        pos = self.ref_aln_str.find(' ', idx)
+        return pos if pos >= 0 else None
+
+    def get_prev_space(self, idx):
+        """
+        Returns the last position of a space in the ref alignment at or before idx, or None if there is none
+        """
+        pos = self.ref_aln_str.rfind(' ', 0, idx + 1)
+        return pos if pos >= 0 else None
+
+    def count_read_bases(self, start, end):
+        """
+        Returns the number of read bases (not gaps) in read_aln_str[start:end]
+        """
+        return int(self.aln_maps.bases_before[0, end] - self.aln_maps.bases_before[0, start])
+
+    def count_ref_bases(self, start, end):
+        """
+        Returns the number of ref bases (not gaps, spaces included) in ref_aln_str[start:end]
+        """
+        return int(self.aln_maps.bases_before[self.ref_row, end] - self.aln_maps.bases_before[self.ref_row, start])
+
+    def get_long_runs(self, run_len):
+        """
+        Returns the starts and ends (exclusive) of the runs of at least run_len bases between mismatches, in alignment order (runs can contain spaces)
+        """
+        if run_len not in self._long_runs:
+            run_starts = [0] + [pos + 1 for pos in self.mismatch_pos]
+            run_ends = self.mismatch_pos + [self.aln_len]
+            long_runs = [(run_start, run_end) for run_start, run_end in zip(run_starts, run_ends) if run_end - run_start >= run_len]
+            self._long_runs[run_len] = ([run_start for run_start, run_end in long_runs], [run_end for run_start, run_end in long_runs])
+        return self._long_runs[run_len]
+
+def _get_next_pos(positions, idx, skip=0):
+    """
+    Returns the (skip+1)th of the sorted positions that is at least idx, or None if there are not enough
+    """
+    pos_idx = bisect.bisect_left(positions, idx) + skip
+    return positions[pos_idx] if pos_idx < len(positions) else None
+
+def _get_prev_pos(positions, idx, skip=0):
+    """
+    Returns the (skip+1)th of the sorted positions (counting down) that is at most idx, or None if there are not enough
+    """
+    pos_idx = bisect.bisect_right(positions, idx) - 1 - skip
+    return positions[pos_idx] if pos_idx >= 0 else None
+
+def _get_wrapped_index(read_aln_str, ref_aln_str, aln_idx_break):
+    """
+    Returns the alignment from a break before its start (a negative index, as from a cut position that wraps around in get_ref_cut_pos_in_aln) to its end, where the bases up to the start wrap around from the end of the alignment, and the AlignmentIndex of that wrapped alignment
+    """
+    wrapped_read_aln_str = read_aln_str[aln_idx_break:] + read_aln_str
+    wrapped_ref_aln_str = ref_aln_str[aln_idx_break:] + ref_aln_str
+    return wrapped_read_aln_str, wrapped_ref_aln_str, AlignmentIndex(wrapped_read_aln_str, wrapped_ref_aln_str)
+
 def get_first_matching_pos(read_aln_str, ref_aln_str,
         aln_idx_break, read_idx_break, ref_idx_break,
-        num_bases_to_check, increment):
+        num_bases_to_check, increment, aln_index=None):
     """
     Identify bases that align exactly and return the coordinate where {num_bases_to_check} bases align exactly
 
     More precisely, given an alignment between a read and ref sequence (read_aln_str, ref_aln_str) start at the alignment position corresponding to the break/jump point in the read (aln_idx_break) and make sure that the last (num_bases_to_check) bases match. If they do: return True, if they don't: increment the index, and try again.
     If at any point a space is encountered (meaning that the alignment has jumped to the other reference, return False
+    The first run of matches is looked up in the runs of exact matches of aln_index rather than by checking each position (breaks before the start of the alignment wrap around like negative indices, see _get_wrapped_index, and breaks beyond either end raise an IndexError as in get_ref_cut_pos_in_aln)
 
     params:
         read_aln_str: Alignment of the read (including gaps)
@@ -17,6 +274,7 @@ def get_first_matching_pos(read_aln_str, ref_aln_str,
         ref_idx_break: location of break in the ref sequence, 1-based (0 means the break happens before the first base, 1 means it happens after the first base, etc)
         num_bases_to_check: how many bases in a row must match exactly
         increment: which direction to move from the break
+        aln_index: AlignmentIndex of read_aln_str and ref_aln_str (built here if None)
 
     returns:
         dict of (success, final_aln_ind, final_read_ind, final_ref_ind)
@@ -25,49 +283,82 @@ def get_first_matching_pos(read_aln_str, ref_aln_str,
             read_ind: the location of that match in the read (or -1 if success is False)
             ref_ind: the location of that match in the ref (or -1 if success is False)
     """
-
-    stop_idx = 0 + num_bases_to_check - 2
-    left_right_adjustment = -1 # if I start at the right and move left, the base I'm looking at will be one base to the left of the cut
-    if increment > 0:
-        stop_idx = len(read_aln_str) - num_bases_to_check + 1
-        left_right_adjustment = 0 #if I start at the left and move right, the base I'm looking at will be one base to the right of the cut
-
-    curr_aln_idx = aln_idx_break + left_right_adjustment
-    curr_read_idx = read_idx_break
-    curr_ref_idx = ref_idx_break
-    while curr_aln_idx != stop_idx:
-        has_spaces = False
-        bases_match = True
-        for offset in range(num_bases_to_check):
-            aln_idx_to_check = int(curr_aln_idx + (offset * increment))
-            if ref_aln_str[aln_idx_to_check] == ' ':
-                has_spaces = True
-                break
-            if ref_aln_str[aln_idx_to_check] != read_aln_str[aln_idx_to_check]:
-                bases_match = False
-                break
-
-        if has_spaces:
+    if aln_idx_break < -len(read_aln_str) or aln_idx_break > len(read_aln_str):
+        raise IndexError('aln_idx_break is outside the alignment')
+    if aln_idx_break < 0:
+        # a break before the start of the alignment has no windows to its left, and the windows to its right wrap around from the end of the alignment
+        if increment < 0:
             return({
                 "success":False,
                 "aln_ind":-1, 
                 "read_ind":-1,
                 "ref_ind":-1
                 })
-
-        if not has_spaces and bases_match:
+        wrapped_read_aln_str, wrapped_ref_aln_str, wrapped_index = _get_wrapped_index(read_aln_str, ref_aln_str, aln_idx_break)
+        match_info = get_first_matching_pos(wrapped_read_aln_str, wrapped_ref_aln_str, 0, read_idx_break, ref_idx_break, num_bases_to_check, increment, aln_index=wrapped_index)
+        if match_info['success']:
+            match_info['aln_ind'] += aln_idx_break
+        return match_info
+    if aln_index is None:
+        aln_index = AlignmentIndex(read_aln_str, ref_aln_str)
+    aln_len = aln_index.aln_len
+    match_pos = None
+    if increment > 0:
+        # the window of num_bases_to_check bases starting at each position is checked, from the break to the right, until a window has no mismatches or reaches a space
+        start_idx = int(aln_idx_break)
+        if start_idx < aln_len - num_bases_to_check + 1:
+            space_pos = aln_index.get_next_space(start_idx)
+            end_idx = aln_len if space_pos is None else space_pos
+            next_mismatch = _get_next_pos(aln_index.mismatch_pos, start_idx)
+            if next_mismatch is not None:
+                end_idx = min(end_idx, next_mismatch)
+            if num_bases_to_check <= 0 or end_idx - start_idx >= num_bases_to_check:
+                match_pos = start_idx
+            elif space_pos is None or end_idx < space_pos:
+                run_starts, run_ends = aln_index.get_long_runs(num_bases_to_check)
+                match_pos = _get_next_pos(run_starts, start_idx + 1)
+                if match_pos is not None and space_pos is not None and match_pos + num_bases_to_check > space_pos:
+                    match_pos = None
+        if match_pos is not None:
+            # the read and ref indices move with the bases after the break up to the match
+            read_ind, ref_ind = read_idx_break, ref_idx_break
+            if match_pos > start_idx:
+                read_ind += aln_index.count_read_bases(start_idx+1, match_pos+1)
+                ref_ind += aln_index.count_ref_bases(start_idx+1, match_pos+1)
             return({
                 "success":True,
-                "aln_ind":curr_aln_idx - left_right_adjustment,
-                "read_ind":curr_read_idx,
-                "ref_ind":curr_ref_idx,
+                "aln_ind":aln_idx_break + (match_pos - start_idx),
+                "read_ind":read_ind,
+                "ref_ind":ref_ind,
+                })
+    else:
+        # the window of num_bases_to_check bases ending at each position is checked, from the base left of the break to the left, until a window has no mismatches or reaches a space
+        start_idx = int(aln_idx_break) - 1
+        if start_idx > num_bases_to_check - 2:
+            space_pos = aln_index.get_prev_space(start_idx)
+            begin_idx = -1 if space_pos is None else space_pos
+            prev_mismatch = _get_prev_pos(aln_index.mismatch_pos, start_idx)
+            if prev_mismatch is not None:
+                begin_idx = max(begin_idx, prev_mismatch)
+            if num_bases_to_check <= 0 or start_idx - begin_idx >= num_bases_to_check:
+                match_pos = start_idx
+            elif space_pos is None or begin_idx > space_pos:
+                run_starts, run_ends = aln_index.get_long_runs(num_bases_to_check)
+                run_end = _get_prev_pos(run_ends, start_idx)
+                if run_end is not None and (space_pos is None or run_end - 1 - num_bases_to_check >= space_pos):
+                    match_pos = run_end - 1
+        if match_pos is not None:
+            # the read and ref indices move with the bases before the break down to the match
+            read_ind, ref_ind = read_idx_break, ref_idx_break
+            if match_pos < start_idx:
+                read_ind -= aln_index.count_read_bases(match_pos, start_idx)
+                ref_ind -= aln_index.count_ref_bases(match_pos, start_idx)
+            return({
+                "success":True,
+                "aln_ind":aln_idx_break - (start_idx - match_pos),
+                "read_ind":read_ind,
+                "ref_ind":ref_ind,
                 })
-
-        curr_aln_idx += increment
-        if ref_aln_str[curr_aln_idx] != '-':
-            curr_ref_idx += increment
-        if read_aln_str[curr_aln_idx] != '-':
-            curr_read_idx += increment
 
     return({
         "success":False,
@@ -77,12 +368,13 @@ def get_first_matching_pos(read_aln_str, ref_aln_str,
         })
 
 def get_last_matching_pos(read_aln_str, ref_aln_str,
-        aln_idx_break, increment, mismatch_tolerance=0, gap_tolerance=0):
+        aln_idx_break, increment, mismatch_tolerance=0, gap_tolerance=0, aln_index=None):
     """
     Identify bases that align exactly and return the last coordinate where bases align exactly from the break up to this point
 
     More precisely, given an alignment between a read and ref sequence (read_aln_str, ref_aln_str) start at the alignment position corresponding to the break/jump point in the read (aln_idx_break) and count the number of bases that match within the mismatch_tolerance and gap_tolerance. Return the index of the last match.
     If at any point a space is encountered (meaning that the alignment has jumped to the other reference), return the last position
+    The position where counting stops is looked up in the mismatches, gaps and spaces of aln_index rather than by checking each position (breaks before the start of the alignment wrap around like negative indices, see _get_wrapped_index, and breaks beyond either end raise an IndexError as in get_ref_cut_pos_in_aln)
 
     params:
         read_aln_str: Alignment of the read (including gaps)
@@ -92,65 +384,55 @@ def get_last_matching_pos(read_aln_str, ref_aln_str,
         increment: which direction to move from the break
         mismatch_tolerance: int How many mismatches to tolerate before returning false
         gap_tolerance: int How many gaps to tolerate before returning false
+        aln_index: AlignmentIndex of read_aln_str and ref_aln_str (built here if None)
 
     returns: tuple of (match_bases_count, match_read_bases_count, match_ref_bases_count)
         match_bases_count: number of bases that matched
         match_read_bases_count: number of bases that matched in read
         match_ref_bases_count: number of bases that matched in ref
     """
-
-
-    stop_idx = -1 # continue until 0
-    left_right_adjustment = -1 # if I start at the right and move left, the base I'm looking at will be one base to the left of the cut
+    if aln_idx_break < -len(read_aln_str) or aln_idx_break > len(read_aln_str):
+        raise IndexError('aln_idx_break is outside the alignment')
+    if aln_idx_break < 0:
+        # the bases to the right of a break before the start of the alignment wrap around from the end of the alignment, and those to its left are the ones left of the same position counted from the end (as with negative indices)
+        if increment > 0:
+            wrapped_read_aln_str, wrapped_ref_aln_str, wrapped_index = _get_wrapped_index(read_aln_str, ref_aln_str, aln_idx_break)
+            return get_last_matching_pos(wrapped_read_aln_str, wrapped_ref_aln_str, 0, increment, mismatch_tolerance, gap_tolerance, aln_index=wrapped_index)
+        aln_idx_break += len(read_aln_str)
+    if aln_index is None:
+        aln_index = AlignmentIndex(read_aln_str, ref_aln_str)
+    # gaps are also mismatches, so counting stops at the first space, the first gap beyond gap_tolerance or the first mismatch beyond mismatch_tolerance
     if increment > 0:
-        stop_idx = len(read_aln_str)
-        left_right_adjustment = 0 #if I start at the left and move right, the base I'm looking at will be one base to the right of the cut
-
-    curr_aln_idx = aln_idx_break + left_right_adjustment
-    gap_count = 0
-    mismatch_count = 0
-    match_bases_count = 0
-    match_read_bases_count = 0
-    match_ref_bases_count = 0
-    while curr_aln_idx != stop_idx:
-        if ref_aln_str[curr_aln_idx] == ' ':
-            return (match_bases_count, match_read_bases_count, match_ref_bases_count)
-       
-        if ref_aln_str[curr_aln_idx] == '-' or read_aln_str[curr_aln_idx] == '-':
-            gap_count += 1
-            if gap_count > gap_tolerance:
-                return (match_bases_count, match_read_bases_count, match_ref_bases_count)
-           
-        if ref_aln_str[curr_aln_idx] != read_aln_str[curr_aln_idx]:
-            mismatch_count += 1
-            if mismatch_count > mismatch_tolerance:
-                return (match_bases_count, match_read_bases_count, match_ref_bases_count)
-        if ref_aln_str[curr_aln_idx] != '-':
-
-            match_ref_bases_count += 1
-        if read_aln_str[curr_aln_idx] != '-':
-            match_read_bases_count += 1
-
-        match_bases_count += 1
-        curr_aln_idx += increment
-
-    return (match_bases_count, match_read_bases_count, match_ref_bases_count)
-
-def get_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos):
+        start_idx = int(aln_idx_break)
+        stop_idx = aln_index.aln_len
+        for stop_pos in [aln_index.get_next_space(start_idx),
+                _get_next_pos(aln_index.gap_pos, start_idx, max(gap_tolerance, 0)),
+                _get_next_pos(aln_index.mismatch_pos, start_idx, max(mismatch_tolerance, 0))]:
+            if stop_pos is not None and stop_pos < stop_idx:
+                stop_idx = stop_pos
+        if stop_idx <= start_idx:
+            return (0, 0, 0)
+        return (stop_idx - start_idx,
+                aln_index.count_read_bases(start_idx, stop_idx),
+                aln_index.count_ref_bases(start_idx, stop_idx))
+
+    start_idx = int(aln_idx_break) - 1
+    stop_idx = -1
+    for stop_pos in [aln_index.get_prev_space(start_idx),
+            _get_prev_pos(aln_index.gap_pos, start_idx, max(gap_tolerance, 0)),
+            _get_prev_pos(aln_index.mismatch_pos, start_idx, max(mismatch_tolerance, 0))]:
+        if stop_pos is not None and stop_pos > stop_idx:
+            stop_idx = stop_pos
+    if stop_idx >= start_idx:
+        return (0, 0, 0)
+    return (start_idx - stop_idx,
+            aln_index.count_read_bases(stop_idx+1, start_idx+1),
+            aln_index.count_ref_bases(stop_idx+1, start_idx+1))
+
+def _walk_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos):
     """
-    Given two alignments, get the index within that alignment and the read of the reference cut position
-
-    params:
-        read_aln_str: Alignment of the read (including gaps)
-        ref_aln_str: Alignment of the ref (including gaps)
-        aln_idx_break: Index in the alignment at which the break occurs
-        read_idx_break: location of break in the read, 1-based (0 means the break happens before the first base, 1 means it happens after the first base, etc)
-        ref_idx_break: location of break in the ref sequence, 1-based (0 means the break happens before the first base, 1 means it happens after the first base, etc)
-        ref_cut_pos: position in ref where the predicted cut site is (user input parameter)
-
-    returns:
-        ref_cut_pos_in_aln: index of cut position in the alignment
-        ref_cut_pos_in_read: index of cut position in the read
+    get_ref_cut_pos_in_aln by walking the alignment base by base from the break
+    Used for cut positions before the bases of the ref in the alignment, where the walk wraps around like negative indices
     """
     if ref_cut_pos < ref_idx_break: #breakpoint to right of cut position
         curr_pos_in_ref = ref_idx_break
@@ -182,8 +464,68 @@ def get_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_br
     else:
         return (aln_idx_break, read_idx_break)
 
+def get_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos, aln_index=None):
+    """
+    Given two alignments, get the index within that alignment and the read of the reference cut position
+    The cut position is found in the map from ref to alignment coordinates of aln_index rather than by walking from the break
+
+    params:
+        read_aln_str: Alignment of the read (including gaps)
+        ref_aln_str: Alignment of the ref (including gaps)
+        aln_idx_break: Index in the alignment at which the break occurs
+        read_idx_break: location of break in the read, 1-based (0 means the break happens before the first base, 1 means it happens after the first base, etc)
+        ref_idx_break: location of break in the ref sequence, 1-based (0 means the break happens before the first base, 1 means it happens after the first base, etc)
+        ref_cut_pos: position in ref where the predicted cut site is (user input parameter)
+        aln_index: AlignmentIndex of read_aln_str and ref_aln_str (built here if None)
 
-def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos, direction, min_num_bases_beyond_cut=4, min_num_bases_before_cut=4, mismatch_tolerance=0, gap_tolerance=0):
+    returns:
+        ref_cut_pos_in_aln: index of cut position in the alignment
+        ref_cut_pos_in_read: index of cut position in the read
+    """
+    if ref_cut_pos == ref_idx_break:
+        return (aln_idx_break, read_idx_break)
+    if aln_index is None:
+        aln_index = AlignmentIndex(read_aln_str, ref_aln_str)
+    aln_maps = aln_index.aln_maps
+    ref_bases_before_break = int(aln_maps.bases_before[aln_index.ref_row, aln_idx_break])
+    if ref_cut_pos < ref_idx_break: #breakpoint to right of cut position
+        # the alignment position of the (ref_idx_break - ref_cut_pos)th ref base (or space) before the break
+        num_bases = ref_bases_before_break - (ref_idx_break - ref_cut_pos)
+        if num_bases >= 0:
+            cut_pos_in_aln = aln_maps.get_aln_pos(aln_index.ref_row, num_bases)
+            if ref_aln_str.find(' ', cut_pos_in_aln, aln_idx_break) >= 0:
+                return None,None
+        else:
+            # a cut position before the start of the ref wraps around to the end of the alignment (as negative indices do)
+            return _walk_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos)
+        num_steps = int(aln_idx_break) - cut_pos_in_aln
+        # the read position steps back with the alignment position, but stops at a gap in read_aln_str at that position
+        read_steps = num_steps
+        read_gap = _get_prev_pos(aln_index.read_gap_pos, read_idx_break)
+        if read_gap is None and len(aln_index.read_gap_pos) > 0:
+            read_gap = aln_index.read_gap_pos[-1] - len(read_aln_str)
+        if read_gap is not None and read_gap > read_idx_break - num_steps:
+            read_steps = int(read_idx_break) - read_gap
+        return (aln_idx_break - num_steps, read_idx_break - read_steps)
+
+    #breakpoint to left of cut position
+    # the alignment position of the (ref_cut_pos - ref_idx_break)th ref base (or space) after the break
+    ref_bases_to_break = ref_bases_before_break + (ref_aln_str[aln_idx_break] != '-')
+    cut_pos_in_aln = aln_maps.get_aln_pos(aln_index.ref_row, ref_bases_to_break + (ref_cut_pos - ref_idx_break) - 1)
+    if ref_aln_str.find(' ', aln_idx_break + 1, cut_pos_in_aln + 1) >= 0:
+        return None,None
+    if cut_pos_in_aln >= aln_maps.aln_len:
+        raise IndexError('ref_cut_pos is beyond the end of the alignment')
+    num_steps = cut_pos_in_aln - int(aln_idx_break)
+    # the read position steps forward with the alignment position, but stops at a gap in read_aln_str at that position
+    read_steps = num_steps
+    read_gap = _get_next_pos(aln_index.read_gap_pos, read_idx_break)
+    if read_gap is not None and read_gap < read_idx_break + num_steps:
+        read_steps = read_gap - int(read_idx_break)
+    return (aln_idx_break + num_steps, read_idx_break + read_steps)
+
+
+def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos, direction, min_num_bases_beyond_cut=4, min_num_bases_before_cut=4, mismatch_tolerance=0, gap_tolerance=0, aln_index=None):
     """
     Get possible offset for translocation (before or after given cut)
     If direction is negative, meaning that the alignment to ref happens before the breakpoint to the left:
@@ -210,6 +552,7 @@ def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_
         min_num_bases_before_cut: Min number of matching bases that must be seen before the cut site - the position of this first match will be reported
         mismatch_tolerance: int How many mismatches to tolerate beyond the cut
         gap_tolerance: int How many gaps to tolerate beyond the cut
+        aln_index: AlignmentIndex of read_aln_str and ref_aln_str (built here if None)
 
     returns:
         dict of:
@@ -220,6 +563,8 @@ def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_
             breakpoint_aln: location of breakpoint in alignment
             breakpoint_ref: location of breakpoint in reference sequence
     """
+    if aln_index is None:
+        aln_index = AlignmentIndex(read_aln_str, ref_aln_str)
     found_break = False
     breakpoint_in_aln = 0
     breakpoint_in_ref = 0
@@ -234,12 +579,13 @@ def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_
                 read_idx_break = read_idx_break,
                 ref_idx_break = ref_idx_break,
                 ref_cut_pos = ref_cut_pos,
+                aln_index = aln_index,
                 )
         if ref_cut_pos_in_aln is not None: #is none if breakpoint before ref cut pos
             beyond_match_info = get_last_matching_pos(read_aln_str, ref_aln_str,
                 ref_cut_pos_in_aln,-1*direction,
-                mismatch_tolerance=mismatch_tolerance, gap_tolerance=gap_tolerance)
-            before_match_info = get_first_matching_pos(read_aln_str, ref_aln_str, ref_cut_pos_in_aln, ref_cut_pos_in_read, ref_cut_pos, min_num_bases_before_cut, direction)
+                mismatch_tolerance=mismatch_tolerance, gap_tolerance=gap_tolerance, aln_index=aln_index)
+            before_match_info = get_first_matching_pos(read_aln_str, ref_aln_str, ref_cut_pos_in_aln, ref_cut_pos_in_read, ref_cut_pos, min_num_bases_before_cut, direction, aln_index=aln_index)
 
             num_bases_beyond_cut = beyond_match_info[2]
             if before_match_info['success']:
@@ -262,7 +608,7 @@ def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_
                 breakpoint_in_aln = aln_idx_break
                 breakpoint_in_ref = ref_idx_break
         else: #breakpoint was before cut
-            before_match_info = get_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, min_num_bases_before_cut, direction)
+            before_match_info = get_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, min_num_bases_before_cut, direction, aln_index=aln_index)
             if before_match_info['success']:
                 found_break = True
                 num_bases_beyond_cut = 0
@@ -275,7 +621,7 @@ def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_
                 breakpoint_in_ref = ref_idx_break
             
     else: #does not have given cut_points
-        before_match_info = get_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, min_num_bases_before_cut, direction)
+        before_match_info = get_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, min_num_bases_before_cut, direction, aln_index=aln_index)
         if before_match_info['success']:
             breakpoint_in_aln = before_match_info['aln_ind']
             num_bases_before_cut = direction*(breakpoint_in_aln - aln_idx_break)
@@ -295,7 +641,7 @@ def get_tx_offset(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_
         "breakpoint_in_ref":breakpoint_in_ref,
         })
 
-def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
+def get_tx_result(read_aln_str, ref1_aln_str, ref2_aln_str,
         breakpoints_read,breakpoints_ref1,breakpoints_ref2,
         read_path, ref1_cut_pos=None, ref2_cut_pos=None,
         min_num_bases_beyond_cut=4, min_num_bases_before_cut=4,
@@ -310,7 +656,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
         breakpoints_read: positions of breakpoints in read discovered by alignment
         breakpoints_ref1: positions of breakpoints in ref1 at which the optimal alignment switches references
         breakpoints_ref2: positions of breakpoints in ref2 at which the optimal alignment switches references
-        read_path: index of ref that the read is aligned to, corresponding to the break points (there will be len(breakpoints)+1 items in read_path)
+        read_path: index of ref that the read is aligned to, corresponding to the break points (there will be len(breakpoints)+1 items in read_path, or none if the read was not aligned because its score is below the minimum score)
             e.g. if the read path is [1,2]
             len(breakpoints) is 1, and shows the location at which the alignment switches from ref1 to ref2
         ref1_cut_pos: position in ref1 where the predicted cut site is (user input parameter)
@@ -321,7 +667,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
         gap_tolerance: int How many gaps to tolerate before returning false
 
     returns:
-        dict containing keys:
+        TxResult with fields (that can also be read by key, see TxResult):
         final_read_str: string of read alignment
         final_ref1_str: string of bases for which read aligns to ref1 - including '~' for trimmed insertions at translocation sites 
         final_ref2_str: string of bases for which read aligns to ref2 - including '~' for trimmed insertions at translocation sites
@@ -333,6 +679,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
         bp_insertion: number of bp that are inserted (match neither reference)
 
         is_tx: boolean for whether the read looks like a translocation
+        status: TxStatus code of the tx result
         tx_status: string with details for tx result
         left_distance: int, number of bp the read extends beyond the cut to the right (from the left-identified reference)
         right_distance: int, number of bp the read extends beyond the cut to the left (from the right-identified reference)
@@ -349,12 +696,9 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
     #             aln ATT-CG
     # read_ind_in_aln 01245
 
-    read_ind_in_aln = np.zeros(len(read_aln_str),dtype=np.intc)
-    aln_idx = 0
-    for idx in range(len(read_aln_str)):
-        if read_aln_str[idx] != '-':
-            read_ind_in_aln[aln_idx] = idx
-            aln_idx += 1
+    #the maps are built in one pass over the alignment and shared by the helpers that refine each breakpoint (see AlignmentMaps)
+    aln_maps = AlignmentMaps(read_aln_str, [ref1_aln_str, ref2_aln_str])
+    read_ind_in_aln = aln_maps.read_ind_in_aln
 
     final_path = []
     final_breakpoint_ref1 = None
@@ -370,6 +714,8 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
     if len(read_path) > 0:
         if read_path[0] == 1 and read_path[-1] == 2: # transition ref1 to ref2
             final_path = [1,2]
+            aln_index1 = AlignmentIndex(read_aln_str, ref1_aln_str, aln_maps, 1)
+            aln_index2 = AlignmentIndex(read_aln_str, ref2_aln_str, aln_maps, 2)
             left_tx_info = get_tx_offset(
                 read_aln_str = read_aln_str,
                 ref_aln_str =  ref1_aln_str,
@@ -382,6 +728,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
                 min_num_bases_before_cut=min_num_bases_before_cut,
                 mismatch_tolerance=mismatch_tolerance,
                 gap_tolerance=gap_tolerance,
+                aln_index=aln_index1,
                 )
             left_dist = left_tx_info['num_bases_offset']
             if ref1_cut_pos is not None:
@@ -399,6 +746,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
                 min_num_bases_before_cut=min_num_bases_before_cut,
                 mismatch_tolerance=mismatch_tolerance,
                 gap_tolerance=gap_tolerance,
+                aln_index=aln_index2,
                 )
             right_dist = right_tx_info['num_bases_offset']
             if ref2_cut_pos is not None:
@@ -407,6 +755,8 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
 
         elif read_path[0] == 2 and read_path[-1] == 1: #transition from ref2 to ref1
             final_path = [2,1]
+            aln_index1 = AlignmentIndex(read_aln_str, ref1_aln_str, aln_maps, 1)
+            aln_index2 = AlignmentIndex(read_aln_str, ref2_aln_str, aln_maps, 2)
             left_tx_info = get_tx_offset(
                 read_aln_str = read_aln_str,
                 ref_aln_str =  ref2_aln_str,
@@ -419,6 +769,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
                 min_num_bases_before_cut=min_num_bases_before_cut,
                 mismatch_tolerance=mismatch_tolerance,
                 gap_tolerance=gap_tolerance,
+                aln_index=aln_index2,
                 )
             left_dist = left_tx_info['num_bases_offset']
             if ref2_cut_pos is not None:
@@ -437,6 +788,7 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
                 min_num_bases_before_cut=min_num_bases_before_cut,
                 mismatch_tolerance=mismatch_tolerance,
                 gap_tolerance=gap_tolerance,
+                aln_index=aln_index1,
                 )
             right_dist = right_tx_info['num_bases_offset']
             if ref1_cut_pos is not None:
@@ -444,94 +796,112 @@ def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
                 final_breakpoint_ref1 = right_tx_info['breakpoint_in_ref']
 
     #add ~ for insertions at translocated regions
-    read_aln_arr = list(read_aln_str)
-    ref1_aln_arr = list(ref1_aln_str)
-    ref2_aln_arr = list(ref2_aln_str)
-
+    final_read_str = read_aln_str
+    final_ref1_str = ref1_aln_str
+    final_ref2_str = ref2_aln_str
+    ref_aln_bytes = aln_maps.aln_bytes[1:]
     if left_tx_info is not None and right_tx_info is not None and \
-            left_tx_info['found_break'] and right_tx_info['found_break']:
-        for idx in range(left_tx_info['breakpoint_in_aln'], right_tx_info['breakpoint_in_aln']):
-            ref1_aln_arr[idx] = '~'
-            ref2_aln_arr[idx] = '~'
-
-    #now get rid of positions where there is a gap but the alignment is removed
-    final_read_aln_arr = []
-    final_ref1_aln_arr = []
-    final_ref2_aln_arr = []
-    bp_match_ref1 = 0
-    bp_match_ref2 = 0
+            left_tx_info['found_break'] and right_tx_info['found_break'] and \
+            left_tx_info['breakpoint_in_aln'] < right_tx_info['breakpoint_in_aln']:
+        ref_aln_bytes = ref_aln_bytes.copy()
+        ref_aln_bytes[:, np.arange(left_tx_info['breakpoint_in_aln'], right_tx_info['breakpoint_in_aln'])] = ord('~')
+        final_ref1_str = ref_aln_bytes[0].tobytes().decode()
+        final_ref2_str = ref_aln_bytes[1].tobytes().decode()
+
+    #insertions in the alignments that align to gaps (~) are kept, as deleting them could make the alignment unstable
+    bp_match_ref1, bp_match_ref2 = np.count_nonzero(ref_aln_bytes == aln_maps.aln_bytes[0], axis=1).tolist()
     bp_insertion = 0
-    for idx in range(len(read_aln_arr)):
-        # these lines delete insertions in the alignments that align to gaps (~) but could make the alignment unstable
-#        if read_aln_arr[idx] == '-' and ref1_aln_arr[idx] == '~' and ref2_aln_arr[idx] == '~':
-#            pass
-#        else:
-            final_read_aln_arr.append(read_aln_arr[idx])
-            final_ref1_aln_arr.append(ref1_aln_arr[idx])
-            final_ref2_aln_arr.append(ref2_aln_arr[idx])
-
-            if read_aln_arr[idx] == ref1_aln_arr[idx]:
-                bp_match_ref1 += 1
-            if read_aln_arr[idx] == ref2_aln_arr[idx]:
-                bp_match_ref2 += 1
-            if ref1_aln_arr[idx] == '~':
-                bp_insertion += 0
-
-
-    final_read_str = ''.join(final_read_aln_arr)
-    final_ref1_str = ''.join(final_ref1_aln_arr)
-    final_ref2_str = ''.join(final_ref2_aln_arr)
 
 
     is_tx = False
-    tx_status = 'Unknown/breakpoints not given (' + str(ref1_cut_pos) + ' and ' + str(ref2_cut_pos) + ')'
+    status = TxStatus.UNKNOWN
     tx_lucky_insertions = 0
 
-    if (ref1_cut_pos is not None) and (ref2_cut_pos is not None):
+    if len(read_path) == 0:
+        #the read was not aligned because its alignment score is below the minimum score (see ChromBridGE_aln.ReferencePair)
+        status = TxStatus.NOT_ALIGNED
+    elif (ref1_cut_pos is not None) and (ref2_cut_pos is not None):
         if len(read_path) == 1:
             is_tx = False
-            tx_status = 'No breakpoints detected'
+            status = TxStatus.NO_BREAKPOINTS
         #alignments with multiple breakpoints are probably not tx
         elif len(read_path) > 2 and len(final_path) == 0:
             is_tx = False
-            tx_status = 'Multiple breakpoints detected'
+            status = TxStatus.MULTIPLE_BREAKPOINTS
         elif not left_bp_is_valid or not right_bp_is_valid:
             is_tx = False
-            tx_status = 'Valid breakpoints could not be identified'
+            status = TxStatus.INVALID_BREAKPOINTS
         else:
             tx_lucky_insertions = max(left_dist,0) + max(right_dist,0)
             if (final_path[0] == 1 and final_path[1] == 2):
                 if final_breakpoint_ref1 <= ref1_cut_pos and final_breakpoint_ref2 >= ref2_cut_pos:
                     is_tx = True
-                    tx_status = 'Tx A>B'
+                    status = TxStatus.TX_A_B
                 else:
-                    tx_status = 'Breakpoints incompatible with given cuts'
+                    status = TxStatus.INCOMPATIBLE_BREAKPOINTS
             elif (final_path[0] == 2 and final_path[1] == 1):
                 if final_breakpoint_ref2 <= ref2_cut_pos and final_breakpoint_ref1 >= ref1_cut_pos:
                     is_tx = True
-                    tx_status = 'Tx B>A'
+                    status = TxStatus.TX_B_A
                 else:
-                    tx_status = 'Breakpoints incompatible with given cuts'
+                    status = TxStatus.INCOMPATIBLE_BREAKPOINTS
+
+    return TxResult(final_read_str, final_ref1_str, final_ref2_str, final_path,
+            final_breakpoint_ref1, final_breakpoint_ref2, bp_match_ref1, bp_match_ref2, bp_insertion,
+            is_tx, status, left_dist, right_dist, tx_lucky_insertions, ref1_cut_pos, ref2_cut_pos)
 
-    return({"final_read_str":final_read_str,
-            "final_ref1_str":final_ref1_str,
-            "final_ref2_str":final_ref2_str,
+def analyze_tx_alignment(read_aln_str, ref1_aln_str, ref2_aln_str,
+        breakpoints_read,breakpoints_ref1,breakpoints_ref2,
+        read_path, ref1_cut_pos=None, ref2_cut_pos=None,
+        min_num_bases_beyond_cut=4, min_num_bases_before_cut=4,
+        mismatch_tolerance=0, gap_tolerance=0):
+    """
+    Refine the alignment and possible translocation sites (see get_tx_result)
 
-            "final_path":final_path,
+    returns:
+        dict with the keys of TX_RESULT_KEYS (see get_tx_result)
+    """
+    return get_tx_result(read_aln_str, ref1_aln_str, ref2_aln_str,
+            breakpoints_read, breakpoints_ref1, breakpoints_ref2,
+            read_path, ref1_cut_pos=ref1_cut_pos, ref2_cut_pos=ref2_cut_pos,
+            min_num_bases_beyond_cut=min_num_bases_beyond_cut, min_num_bases_before_cut=min_num_bases_before_cut,
+            mismatch_tolerance=mismatch_tolerance, gap_tolerance=gap_tolerance).to_dict()
 
-            "final_breakpoint_ref1":final_breakpoint_ref1,
-            "final_breakpoint_ref2":final_breakpoint_ref2,
+def analyze_tx_batch(aln_infos, ref1_cut_pos=None, ref2_cut_pos=None,
+        min_num_bases_beyond_cut=4, min_num_bases_before_cut=4,
+        mismatch_tolerance=0, gap_tolerance=0, out=None):
+    """
+    Refine the alignments and possible translocation sites of many reads (see get_tx_result), storing the numeric results in a structured array
 
-            "bp_match_ref1":bp_match_ref1,
-            "bp_match_ref2":bp_match_ref2,
-            "bp_insertion":bp_insertion,
+    params:
+        aln_infos: alignments of the reads (dicts with the keys of nw_breakpoint, or ChromBridGE_aln.AlignmentResults)
+        out: array of TX_RESULT_DTYPE with one row per alignment to fill (a new array is made if None)
+        other params: see get_tx_result
 
-            "is_tx":is_tx,
-            "tx_status":tx_status,
-            "left_dist":left_dist,
-            "right_dist":right_dist,
-            "tx_lucky_insertions":tx_lucky_insertions
-            })
+    returns:
+        array of TX_RESULT_DTYPE with one row per alignment. Breakpoints and distances that are None in the TxResult are MISSING_VALUE
+    """
+    if out is None:
+        out = np.empty(len(aln_infos), dtype=TX_RESULT_DTYPE)
+    elif out.dtype != TX_RESULT_DTYPE or out.shape != (len(aln_infos),):
+        raise ValueError('out must be an array of TX_RESULT_DTYPE with one row per alignment')
+    for idx, aln_info in enumerate(aln_infos):
+        tx_result = get_tx_result(
+                read_aln_str=aln_info['read_aln'],
+                ref1_aln_str=aln_info['ref1_aln'],
+                ref2_aln_str=aln_info['ref2_aln'],
+                breakpoints_read=aln_info['breakpoints_read'],
+                breakpoints_ref1=aln_info['breakpoints_ref1'],
+                breakpoints_ref2=aln_info['breakpoints_ref2'],
+                read_path=aln_info['read_path'],
+                ref1_cut_pos=ref1_cut_pos,
+                ref2_cut_pos=ref2_cut_pos,
+                min_num_bases_beyond_cut=min_num_bases_beyond_cut,
+                min_num_bases_before_cut=min_num_bases_before_cut,
+                mismatch_tolerance=mismatch_tolerance,
+                gap_tolerance=gap_tolerance)
+        out[idx] = tx_result.to_row()
+    return out
 
 if __name__ == "__main__":
 #    from ChromBridGE.ChromBridGE_aln import nw_breakpoint
@@ -1008,6 +1378,17 @@ if __name__ == "__main__":
     print(val)
     assert(val == (1,1,1))
 
+    # a break before the start of the alignment (from a cut position that wraps around in get_ref_cut_pos_in_aln) wraps around like the walk from the break
+    val = get_last_matching_pos(
+        read_aln_str = "GCCCTTGCGGTACAGGGAAGGA",
+        ref_aln_str =  "   CTTGCGCTACAGGGAAGGA",
+        aln_idx_break = -18,
+        increment=1,
+    )
+    print(val)
+    assert(val == (5,5,5))
+    assert([type(x) for x in val] == [int, int, int])
+
     ref_cut_pos_in_aln = get_ref_cut_pos_in_aln(
             read_aln_str = 'AAAACCCCTTTTGGGG',
             ref_aln_str =  'AAAACCCC        ',
@@ -1096,6 +1477,40 @@ if __name__ == "__main__":
     print(ref_cut_pos_in_aln)
     assert(ref_cut_pos_in_aln == (14,11))
 
+    # a cut position before the bases of the ref in the alignment wraps around to the end of the alignment, as in the walk from the break
+    ref_cut_pos_in_aln = get_ref_cut_pos_in_aln(
+            read_aln_str = 'AAAACCCCTTTTGGGG',
+            ref_aln_str =  'AAAACCCCTTTTGGGG',
+            aln_idx_break=2,
+            read_idx_break=2,
+            ref_idx_break=6,
+            ref_cut_pos = 2
+            )
+    print(ref_cut_pos_in_aln)
+    assert(ref_cut_pos_in_aln == (-2,-2))
+
+    # maps shared by the read and both refs give the same cut positions as maps built for one ref and as the walk from the break (including cut positions that wrap around)
+    aln_maps = AlignmentMaps('AAAACC-CTTTTGGGG', ['AA-ACCCC        ', '        TTT-GGGG'])
+    assert(aln_maps.read_ind_in_aln.tolist() == [0, 1, 2, 3, 4, 5, 7, 8, 9, 10, 11, 12, 13, 14, 15, 0])
+    for ref_row, ref_aln_str in [(1, 'AA-ACCCC        '), (2, '        TTT-GGGG')]:
+        aln_index = AlignmentIndex('AAAACC-CTTTTGGGG', ref_aln_str, aln_maps, ref_row)
+        for ref_cut_pos in range(11):
+            assert(get_ref_cut_pos_in_aln('AAAACC-CTTTTGGGG', ref_aln_str, 8, 7, 4, ref_cut_pos, aln_index=aln_index) ==
+                    get_ref_cut_pos_in_aln('AAAACC-CTTTTGGGG', ref_aln_str, 8, 7, 4, ref_cut_pos))
+    for read_aln_str, ref_aln_strs in [('AAAACC-CTTTTGGGG', ['AA-ACCCCTTTTGGGG', 'AAAACCCC        ']), ('-AAACCCCTT-TGGGG', ['AAAA-CCCTTTTG-GG', '    ACCCTTTTG-GG'])]:
+        aln_maps = AlignmentMaps(read_aln_str, ref_aln_strs)
+        for ref_row, ref_aln_str in enumerate(ref_aln_strs, 1):
+            aln_index = AlignmentIndex(read_aln_str, ref_aln_str, aln_maps, ref_row)
+            for aln_idx_break, read_idx_break in [(2, 2), (5, 4), (8, 7)]:
+                for ref_idx_break in range(4, 12):
+                    for ref_cut_pos in range(-3, 20):
+                        try:
+                            walk_val = _walk_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos)
+                        except IndexError:
+                            continue
+                        assert(get_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos, aln_index=aln_index) == walk_val)
+                        assert(get_ref_cut_pos_in_aln(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, ref_cut_pos) == walk_val)
+
 
     bp = get_tx_offset(
             read_aln_str = 'AAAACCCCTTTTGGGG',
@@ -0,0 +1,34 @@
+import argparse
+import random
+import time
+
+from ChromBridGE.ChromBridGE_aln import ReferencePair
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measures alignment throughput for translocation reads of different lengths')
+    parser.add_argument('--read_lengths', type=int, nargs='+', default=[100, 150, 300, 600, 1000, 2000], help='Read lengths to align')
+    parser.add_argument('--cells', type=int, default=50000000, help='Approximate number of table cells to fill for each read length')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the random references and reads')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print('read_len\tref_len\treads\tseconds\treads_per_second\tmillion_cells_per_second')
+    for read_len in args.read_lengths:
+        #each read is half of one reference and half of the other, with some sequencing errors
+        ref_len = read_len
+        ref1 = ''.join(random.choice('ACGT') for _ in range(ref_len))
+        ref2 = ''.join(random.choice('ACGT') for _ in range(ref_len))
+        cut_pos = ref_len // 2
+        ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=cut_pos, ref2_cut_pos=cut_pos, max_table_cells=1 << 30)
+        cells_per_read = 2 * (read_len + 1) * (ref_len + 1)
+        num_reads = max(1, args.cells // cells_per_read)
+        reads = []
+        for _ in range(num_reads):
+            read = ref1[:cut_pos] + ref2[cut_pos:]
+            reads.append(''.join(base if random.random() > 0.01 else random.choice('ACGT') for base in read))
+
+        start = time.perf_counter()
+        for read in reads:
+            ref_pair.align(read)
+        seconds = time.perf_counter() - start
+        print('\t'.join([str(read_len), str(ref_len), str(num_reads), '%.3f' % seconds, '%.1f' % (num_reads / seconds), '%.1f' % (num_reads * cells_per_read / seconds / 1e6)]))
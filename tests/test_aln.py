@@ -1,4 +1,20 @@
-from ChromBridGE.ChromBridGE_aln import nw_breakpoint
+import io
+import os
+import pickle
+import random
+import re
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from ChromBridGE.ChromBridGE_aln import nw_breakpoint, nw_breakpoint_batch, nw_breakpoint_score, nw_breakpoint_panel, ReferencePair, ReferencePanel, MISSING_VALUE
+from ChromBridGE.ChromBridGE_aln import analyze_tx_alignment as compiled_analyze_tx_alignment, get_aln_segments
+from ChromBridGE.ChromBridGE_tx import analyze_tx_alignment, analyze_tx_batch, get_tx_result, TxStatus, AlignmentIndex, get_first_matching_pos, get_last_matching_pos
+from ChromBridGE.ChromBridGE import get_wild_type_aln_info, format_aln_segments, decode_aln_segments, get_result_fields, get_aln_tx_status, format_result_fields, get_summary_fields, RESULT_HEADER
+from ChromBridGE.ChromBridGE import get_primer_lookups, classify_read_primers, get_triaged_result_fields, get_triaged_summary_fields
+from ChromBridGE.ChromBridGE_index import KmerIndex
+from ChromBridGE.ChromBridGE_summary import BreakpointSummary
 
 if __name__ == "__main__":
     print('Performing tests..')
@@ -365,4 +381,527 @@ if __name__ == "__main__":
 
 
 
+    #batch alignment should give the same results as aligning reads one at a time
+    batch_reads = ['AAATGGG','AAATG','ATGGG','GGGAAA','A','TTTTTTTTTTTT']
+    batch_aln_infos = nw_breakpoint_batch(
+                batch_reads,
+                'AAATG',
+                'ATGGG',
+          gap_score=-3,
+          mismatch_score=-3,
+          jump_score=-2,
+          ref1_cut_pos=5,
+          ref2_cut_pos=5,
+          num_threads=2)
+    for read, batch_aln_info in zip(batch_reads, batch_aln_infos):
+        aln_info = nw_breakpoint(
+                read,
+                'AAATG',
+                'ATGGG',
+          gap_score=-3,
+          mismatch_score=-3,
+          jump_score=-2,
+          ref1_cut_pos=5,
+          ref2_cut_pos=5)
+        if aln_info != batch_aln_info:
+            raise Exception('TEST DID NOT PASS\nbatch: ' + str(batch_aln_info) + '\nsingle: ' + str(aln_info))
+
+    #a ReferencePair reused for reads of different lengths should give the same results as nw_breakpoint
+    ref_pair = ReferencePair(
+                'AGCGG',
+                'GTCGA',
+                gap_score=-3,
+                mismatch_score=-3,
+                jump_score=-6,
+                cut_pos_jump_incentive_score=2,
+                ref1_cut_pos=2,
+                ref2_cut_pos=2)
+    for read in ['AGTGGA','AG','AGTGGAAGTGGA','TCGA','AGTGGA']:
+        aln_info = nw_breakpoint(
+                read,
+                'AGCGG',
+                'GTCGA',
+                gap_score=-3,
+                mismatch_score=-3,
+                jump_score=-6,
+                cut_pos_jump_incentive_score=2,
+                ref1_cut_pos=2,
+                ref2_cut_pos=2)
+        ref_pair_aln_info = ref_pair.align(read)
+        if aln_info != ref_pair_aln_info:
+            raise Exception('TEST DID NOT PASS\nref_pair: ' + str(ref_pair_aln_info) + '\nnw_breakpoint: ' + str(aln_info))
+
+    #score-only alignment should agree with the full alignment
+    for read in ['AGTGGA','AG','AGTGGAAGTGGA','TCGA','AGCGG','GTCGA']:
+        aln_info = nw_breakpoint(
+                read,
+                'AGCGG',
+                'GTCGA',
+                gap_score=-3,
+                mismatch_score=-3,
+                jump_score=-6,
+                cut_pos_jump_incentive_score=2,
+                ref1_cut_pos=2,
+                ref2_cut_pos=2)
+        score_info = nw_breakpoint_score(
+                read,
+                'AGCGG',
+                'GTCGA',
+                gap_score=-3,
+                mismatch_score=-3,
+                jump_score=-6,
+                cut_pos_jump_incentive_score=2,
+                ref1_cut_pos=2,
+                ref2_cut_pos=2)
+        if score_info['aln_score'] != aln_info['aln_score'] or \
+                score_info['has_jump'] != (len(aln_info['breakpoints_read']) > 0) or \
+                score_info['aln_ref'] != aln_info['read_path'][-1] or \
+                score_info['single_ref_score'] > score_info['aln_score']:
+            raise Exception('TEST DID NOT PASS\nscore: ' + str(score_info) + '\nnw_breakpoint: ' + str(aln_info))
+
+    #banded alignment should agree with the full alignment for reads that stay near the expected diagonals
+    ref1 = 'CCGTAATGCCTTTCCCTAACAGAGTTTTTCGAACTCGTGTTGTCGAGCGACGGAATTAGA'
+    ref2 = 'TCAGTTAAATGGCAGAAAACTGGCAGGGCTTTTAGTCGTGGGATGATCAGTGGGTAAAGG'
+    full_ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25)
+    banded_ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, band_width=5)
+    for read in [ref1, ref2, ref1[:30]+ref2[25:], ref2[:25]+ref1[30:], ref1[:30]+ref1[33:], ref1[10:50]]:
+        aln_info = full_ref_pair.align(read)
+        banded_aln_info = banded_ref_pair.align(read)
+        if aln_info != banded_aln_info:
+            raise Exception('TEST DID NOT PASS\nbanded: ' + str(banded_aln_info) + '\nfull: ' + str(aln_info))
+
+    #banded alignment should also agree with the full alignment for random reads, with jumps, edits near the cut sites, sequencing errors and unrelated sequence
+    rng = random.Random(7)
+    def random_seq(length):
+        return ''.join(rng.choice('ACGT') for _ in range(length))
+    def add_errors(seq, num_errors):
+        for _ in range(num_errors):
+            pos = rng.randrange(len(seq))
+            seq = seq[:pos] + rng.choice(['', random_seq(1), random_seq(1) + seq[pos]]) + seq[pos+1:]
+        return seq
+    for _ in range(10):
+        random_ref1 = random_seq(150)
+        random_ref2 = random_seq(rng.randint(130, 170))
+        random_cut1 = rng.randint(40, 110)
+        random_cut2 = rng.randint(40, len(random_ref2)-40)
+        random_full_ref_pair = ReferencePair(random_ref1, random_ref2, ref1_cut_pos=random_cut1, ref2_cut_pos=random_cut2)
+        random_banded_ref_pair = ReferencePair(random_ref1, random_ref2, ref1_cut_pos=random_cut1, ref2_cut_pos=random_cut2, band_width=10)
+        for _ in range(20):
+            read_type = rng.randrange(5)
+            if read_type == 0:
+                read = add_errors(rng.choice([random_ref1, random_ref2]), rng.randint(0, 4))
+            elif read_type == 1:
+                read = add_errors(random_ref1[:random_cut1] + random_seq(rng.randint(0, 8)) + random_ref2[random_cut2:], rng.randint(0, 3))
+            elif read_type == 2:
+                read = add_errors(random_ref2[:random_cut2] + random_seq(rng.randint(0, 8)) + random_ref1[random_cut1:], rng.randint(0, 3))
+            elif read_type == 3:
+                edit_pos = random_cut1 + rng.randint(-10, 10)
+                read = random_ref1[:edit_pos] + random_seq(rng.randint(0, 30)) + random_ref1[edit_pos+rng.randint(0, 30):]
+            else:
+                read = random_seq(rng.randint(20, 150))
+            aln_info = random_full_ref_pair.align(read)
+            banded_aln_info = random_banded_ref_pair.align(read)
+            if aln_info != banded_aln_info:
+                raise Exception('TEST DID NOT PASS\nbanded: ' + str(banded_aln_info) + '\nfull: ' + str(aln_info))
+
+    #banded alignment should agree with the full alignment when the best alignment starts along the first row, outside of the band
+    aln_info = ReferencePair('CATTAGATCGTCACCCTGTGGACTGTGTC', 'TGGCGAATACGGGCGCA', match_score=1, mismatch_score=-1, gap_score=-1, jump_score=-12,
+            ref1_cut_pos=0).align('CATTGATGTCATACGGGCGCA')
+    banded_aln_info = ReferencePair('CATTAGATCGTCACCCTGTGGACTGTGTC', 'TGGCGAATACGGGCGCA', match_score=1, mismatch_score=-1, gap_score=-1, jump_score=-12,
+            ref1_cut_pos=0, band_width=1).align('CATTGATGTCATACGGGCGCA')
+    if aln_info['aln_score'] != 11 or aln_info != banded_aln_info:
+        raise Exception('TEST DID NOT PASS\nbanded: ' + str(banded_aln_info) + '\nfull: ' + str(aln_info))
+
+    #banded alignment should agree with the full alignment for short random sequences and scores with narrow bands, where most alignments leave the band
+    for seed in range(1000):
+        rng = random.Random(seed)
+        random_ref1 = random_seq(rng.randint(1, 30))
+        random_ref2 = random_seq(rng.randint(1, 30))
+        score_params = {'match_score': rng.randint(1, 3), 'mismatch_score': rng.randint(-3, 0), 'gap_score': rng.randint(-3, 0),
+                'perimeter_gap_extension_score': rng.choice([0, 0, -1]), 'jump_score': rng.randint(-14, 0), 'cut_pos_jump_incentive_score': rng.randint(0, 2)}
+        if rng.random() < 0.8:
+            score_params['ref1_cut_pos'] = rng.randint(0, len(random_ref1))
+        if rng.random() < 0.8:
+            score_params['ref2_cut_pos'] = rng.randint(0, len(random_ref2))
+        read_type = rng.randrange(3)
+        if read_type == 0:
+            read = random_seq(rng.randint(1, 35))
+        elif read_type == 1:
+            read = random_ref1[:rng.randint(0, len(random_ref1))] + random_ref2[rng.randint(0, len(random_ref2)):]
+        else:
+            read = rng.choice([random_ref1, random_ref2])
+            read = add_errors(read, rng.randint(0, min(6, len(read)-1)))
+        if read == '':
+            read = random_seq(1)
+        aln_info = ReferencePair(random_ref1, random_ref2, **score_params).align(read)
+        for band_width in [1, 2, 3]:
+            banded_aln_info = ReferencePair(random_ref1, random_ref2, band_width=band_width, **score_params).align(read)
+            if aln_info != banded_aln_info:
+                raise Exception('TEST DID NOT PASS\nseed: ' + str(seed) + ' band_width: ' + str(band_width) + '\nbanded: ' + str(banded_aln_info) + '\nfull: ' + str(aln_info))
+
+    #alignments computed in linear memory should be the same as alignments computed from the whole tables
+    linear_ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, max_table_cells=1)
+    for read in [ref1, ref2, ref1[:30]+ref2[25:], ref2[:25]+ref1[30:], ref1[:30]+'GATTACA'+ref1[30:], ref1[10:50], 'GATTACA', ref1*3]:
+        aln_info = full_ref_pair.align(read)
+        linear_aln_info = linear_ref_pair.align(read)
+        if aln_info != linear_aln_info:
+            raise Exception('TEST DID NOT PASS\nlinear: ' + str(linear_aln_info) + '\nfull: ' + str(aln_info))
+
+    #reads aligned together in lanes should get the same alignments as reads aligned one at a time
+    reads = [ref1, ref2, ref1[:30]+ref2[30:], ref2[:25]+ref1[25:], ref1[:20]+'GATTACA'+ref1[27:], ref2[::-1]] * 3 + ['GATTACA', ref1[10:50]]
+    for read, lane_aln_info in zip(reads, full_ref_pair.align_lanes(reads)):
+        aln_info = full_ref_pair.align(read)
+        if aln_info != lane_aln_info:
+            raise Exception('TEST DID NOT PASS\nlanes: ' + str(lane_aln_info) + '\nsingle: ' + str(aln_info))
+    lane_min_score_ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, min_score=150)
+    for lane_ref_pair in [full_ref_pair, lane_min_score_ref_pair]:
+        for read, (lane_aln_result, lane_tx_result) in zip(reads, lane_ref_pair.analyze_lanes(reads)):
+            aln_result, tx_result = lane_ref_pair.analyze_read(read)
+            if lane_aln_result.to_dict() != aln_result.to_dict() or lane_tx_result.to_dict() != tx_result.to_dict():
+                raise Exception('TEST DID NOT PASS\nanalyzed lanes: ' + str(lane_tx_result.to_dict()) + '\nsingle: ' + str(tx_result.to_dict()))
+
+    #wild-type reads should get the alignment they would get from the aligner
+    for read in [ref1, ref2]:
+        aln_info = full_ref_pair.align(read)
+        wild_type_aln_info = get_wild_type_aln_info(read, full_ref_pair)
+        if aln_info != wild_type_aln_info:
+            raise Exception('TEST DID NOT PASS\nwild-type: ' + str(wild_type_aln_info) + '\naligned: ' + str(aln_info))
+    if get_wild_type_aln_info(ref1[:30]+ref2[25:], full_ref_pair) is not None:
+        raise Exception('TEST DID NOT PASS\nwild-type alignment returned for a read that is not wild-type')
+
+    #a large x_drop should not change the alignment, and reads that score less than min_score should not be aligned
+    xdrop_ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, x_drop=1000)
+    min_score_ref_pair = ReferencePair(ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, min_score=100)
+    for read in [ref1, ref2, ref1[:30]+ref2[25:], ref1[:20]+'GATTACA'+ref1[27:], 'GATTACA', ref2[::-1]]:
+        aln_info = full_ref_pair.align(read)
+        xdrop_aln_info = xdrop_ref_pair.align(read)
+        if aln_info != xdrop_aln_info:
+            raise Exception('TEST DID NOT PASS\nx_drop: ' + str(xdrop_aln_info) + '\nfull: ' + str(aln_info))
+        min_score_aln_info = min_score_ref_pair.align(read)
+        if aln_info['aln_score'] >= 100 and min_score_aln_info != aln_info:
+            raise Exception('TEST DID NOT PASS\nmin_score: ' + str(min_score_aln_info) + '\nfull: ' + str(aln_info))
+        if aln_info['aln_score'] < 100 and (min_score_aln_info['read_path'] != [] or min_score_aln_info['aln_score'] is not None):
+            raise Exception('TEST DID NOT PASS\nalignment below min_score returned: ' + str(min_score_aln_info))
+
+    #scores too large for 16-bit tables should give the same alignments (with scaled scores) as the default scores
+    scaled_ref_pair = ReferencePair(ref1, ref2, match_score=3000, mismatch_score=-1000, gap_score=-2000, jump_score=-12000,
+            cut_pos_jump_incentive_score=1000, ref1_cut_pos=30, ref2_cut_pos=25)
+    for read in [ref1, ref1[:30]+ref2[25:], ref1[:20]+'GATTACA'+ref1[27:], ref2[::-1]]:
+        aln_info = full_ref_pair.align(read)
+        scaled_aln_info = scaled_ref_pair.align(read)
+        if scaled_aln_info['aln_score'] != aln_info['aln_score'] * 1000 or scaled_aln_info['read_path'] != aln_info['read_path'] or \
+                scaled_aln_info['read_aln'] != aln_info['read_aln'] or scaled_aln_info['ref1_aln'] != aln_info['ref1_aln']:
+            raise Exception('TEST DID NOT PASS\nscaled scores: ' + str(scaled_aln_info) + '\ndefault scores: ' + str(aln_info))
+
+    #result objects should read like the dicts, and the batch arrays should hold the same scores, breakpoints, paths and distances
+    batch_reads = [ref1, ref1[:30]+ref2[25:], ref2[:25]+ref1[30:], ref1[:20]+'GATTACA'+ref1[27:], 'GATTACA']
+    aln_results = min_score_ref_pair.align_batch_results(batch_reads, num_threads=2)
+    aln_array = min_score_ref_pair.align_batch_array(batch_reads, num_threads=2)
+    tx_array = analyze_tx_batch(aln_results, ref1_cut_pos=30, ref2_cut_pos=25)
+    for read, aln_result, aln_row, tx_row in zip(batch_reads, aln_results, aln_array, tx_array):
+        aln_info = min_score_ref_pair.align(read)
+        if aln_result.to_dict() != aln_info or {key: aln_result[key] for key in aln_result.keys()} != aln_info:
+            raise Exception('TEST DID NOT PASS\nresult: ' + str(aln_result) + '\ndict: ' + str(aln_info))
+        aln_buffers = np.asarray(aln_result)
+        if [aln_buffers[row].tobytes().decode() for row in range(3)] != [aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln']]:
+            raise Exception('TEST DID NOT PASS\nbuffers: ' + str(aln_buffers) + '\ndict: ' + str(aln_info))
+        if aln_info['aln_score'] is None:
+            if aln_row['aln_score'] != MISSING_VALUE or aln_row['path_start'] != 0 or aln_row['status'] == 0:
+                raise Exception('TEST DID NOT PASS\nrow of unaligned read: ' + str(aln_row))
+        elif aln_row['aln_score'] != aln_info['aln_score'] or aln_row['num_breakpoints'] != len(aln_info['breakpoints_read']) or \
+                aln_row['path_start'] != aln_info['read_path'][0] or aln_row['path_end'] != aln_info['read_path'][-1] or \
+                (len(aln_info['breakpoints_read']) > 0 and (aln_row['first_breakpoint_ref1'] != aln_info['breakpoints_ref1'][0] or \
+                aln_row['last_breakpoint_read'] != aln_info['breakpoints_read'][-1])):
+            raise Exception('TEST DID NOT PASS\nrow: ' + str(aln_row) + '\ndict: ' + str(aln_info))
+        tx_info = analyze_tx_alignment(aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln'],
+                aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2'], aln_info['read_path'], ref1_cut_pos=30, ref2_cut_pos=25)
+        tx_result = get_tx_result(aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln'],
+                aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2'], aln_info['read_path'], ref1_cut_pos=30, ref2_cut_pos=25)
+        if tx_result.to_dict() != tx_info or tx_result['tx_status'] != tx_info['tx_status'] or TxStatus(tx_row['status']) != tx_result.status or \
+                tx_row['is_tx'] != tx_info['is_tx'] or tx_row['left_dist'] != (MISSING_VALUE if tx_info['left_dist'] is None else tx_info['left_dist']):
+            raise Exception('TEST DID NOT PASS\ntx row: ' + str(tx_row) + '\ntx result: ' + str(tx_result) + '\ntx dict: ' + str(tx_info))
+    if [TxStatus(status) for status in tx_array['status']] != [TxStatus.NO_BREAKPOINTS, TxStatus.TX_A_B, TxStatus.TX_B_A, TxStatus.NO_BREAKPOINTS, TxStatus.NOT_ALIGNED]:
+        raise Exception('TEST DID NOT PASS\ntx statuses: ' + str(tx_array['status']))
+
+    #the compiled translocation analysis (alone, and fused with the alignment) should give the same results as ChromBridGE_tx
+    for read in batch_reads + [ref1[:28]+'TT'+ref2[25:], ref2[:25]+ref1[33:], ref1[:30]+ref2[25:40]+ref1[45:]]:
+        for tx_params in [{}, {'min_num_bases_before_cut': 2, 'mismatch_tolerance': 1}, {'min_num_bases_beyond_cut': 1, 'gap_tolerance': 2}]:
+            aln_info = min_score_ref_pair.align(read)
+            for ref1_cut_pos, ref2_cut_pos in [(30, 25), (None, None), (20, None)]:
+                aln_args = (aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln'],
+                        aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2'], aln_info['read_path'])
+                tx_info = analyze_tx_alignment(*aln_args, ref1_cut_pos=ref1_cut_pos, ref2_cut_pos=ref2_cut_pos, **tx_params)
+                compiled_tx_info = compiled_analyze_tx_alignment(*aln_args, ref1_cut_pos=ref1_cut_pos, ref2_cut_pos=ref2_cut_pos, **tx_params)
+                if compiled_tx_info != tx_info:
+                    raise Exception('TEST DID NOT PASS\ncompiled: ' + str(compiled_tx_info) + '\nreference: ' + str(tx_info))
+            aln_result, fused_tx_result = min_score_ref_pair.analyze_read(read, **tx_params)
+            if aln_result.to_dict() != aln_info or fused_tx_result.to_dict() != analyze_tx_alignment(*aln_args, ref1_cut_pos=30, ref2_cut_pos=25, **tx_params):
+                raise Exception('TEST DID NOT PASS\nfused: ' + str(aln_result) + ' ' + str(fused_tx_result) + '\nreference: ' + str(aln_info))
+
+    #the indexed match lookups should give the same results as walking the alignment base by base from the break, in either direction (including breaks before the start of the alignment, which wrap around like negative indices)
+    def walk_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, read_idx_break, ref_idx_break, num_bases_to_check, increment):
+        stop_idx = 0 + num_bases_to_check - 2
+        left_right_adjustment = -1
+        if increment > 0:
+            stop_idx = len(read_aln_str) - num_bases_to_check + 1
+            left_right_adjustment = 0
+        curr_aln_idx = aln_idx_break + left_right_adjustment
+        curr_read_idx = read_idx_break
+        curr_ref_idx = ref_idx_break
+        while (stop_idx - curr_aln_idx) * increment > 0:
+            has_spaces = False
+            bases_match = True
+            for offset in range(num_bases_to_check):
+                aln_idx_to_check = int(curr_aln_idx + (offset * increment))
+                if ref_aln_str[aln_idx_to_check] == ' ':
+                    has_spaces = True
+                    break
+                if ref_aln_str[aln_idx_to_check] != read_aln_str[aln_idx_to_check]:
+                    bases_match = False
+                    break
+            if has_spaces:
+                break
+            if bases_match:
+                return {"success":True, "aln_ind":curr_aln_idx - left_right_adjustment, "read_ind":curr_read_idx, "ref_ind":curr_ref_idx}
+            curr_aln_idx += increment
+            if ref_aln_str[curr_aln_idx] != '-':
+                curr_ref_idx += increment
+            if read_aln_str[curr_aln_idx] != '-':
+                curr_read_idx += increment
+        return {"success":False, "aln_ind":-1, "read_ind":-1, "ref_ind":-1}
+
+    def walk_last_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, increment, mismatch_tolerance, gap_tolerance):
+        stop_idx = -1
+        left_right_adjustment = -1
+        if increment > 0:
+            stop_idx = len(read_aln_str)
+            left_right_adjustment = 0
+        curr_aln_idx = aln_idx_break + left_right_adjustment
+        gap_count = 0
+        mismatch_count = 0
+        match_bases_count = 0
+        match_read_bases_count = 0
+        match_ref_bases_count = 0
+        while curr_aln_idx != stop_idx:
+            if ref_aln_str[curr_aln_idx] == ' ':
+                break
+            if ref_aln_str[curr_aln_idx] == '-' or read_aln_str[curr_aln_idx] == '-':
+                gap_count += 1
+                if gap_count > gap_tolerance:
+                    break
+            if ref_aln_str[curr_aln_idx] != read_aln_str[curr_aln_idx]:
+                mismatch_count += 1
+                if mismatch_count > mismatch_tolerance:
+                    break
+            if ref_aln_str[curr_aln_idx] != '-':
+                match_ref_bases_count += 1
+            if read_aln_str[curr_aln_idx] != '-':
+                match_read_bases_count += 1
+            match_bases_count += 1
+            curr_aln_idx += increment
+        return (match_bases_count, match_read_bases_count, match_ref_bases_count)
+
+    for read_aln_str, ref_aln_str in [("AAAAA-CCTTTTGGGG", "AAAAACCC  ATGGGG"), ("AAAAA-CCTTTTGGGG", "AAAAACCCTTATGG-G"), ("AACAA-CCTTTTGGGG", "      CCTTATGG-G"), ("GCCCTTGCGGTACAGGGAAGGA", "   CTTGCGCTACAGGGAAGGA")]:
+        aln_index = AlignmentIndex(read_aln_str, ref_aln_str)
+        for aln_idx_break in range(-len(read_aln_str), len(read_aln_str) + 1):
+            for increment in [-1, 1]:
+                for num_bases_to_check in [1, 2, 4]:
+                    try:
+                        walk_val = walk_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, 0, 0, num_bases_to_check, increment)
+                    except IndexError: # the walk runs off the end of the alignment
+                        continue
+                    for val in [get_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, 0, 0, num_bases_to_check, increment, aln_index=aln_index),
+                            get_first_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, 0, 0, num_bases_to_check, increment)]:
+                        if val != walk_val:
+                            raise Exception('TEST DID NOT PASS\nfirst matching pos from ' + str(aln_idx_break) + ': ' + str(val) + '\nwalk: ' + str(walk_val))
+                for mismatch_tolerance, gap_tolerance in [(0, 0), (1, 1), (2, 0)]:
+                    try:
+                        walk_val = walk_last_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, increment, mismatch_tolerance, gap_tolerance)
+                    except IndexError:
+                        continue
+                    for val in [get_last_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, increment, mismatch_tolerance, gap_tolerance, aln_index=aln_index),
+                            get_last_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, increment, mismatch_tolerance, gap_tolerance)]:
+                        if val != walk_val:
+                            raise Exception('TEST DID NOT PASS\nlast matching pos from ' + str(aln_idx_break) + ': ' + str(val) + '\nwalk: ' + str(walk_val))
+        for aln_idx_break in [-len(read_aln_str) - 1, len(read_aln_str) + 1]:
+            try:
+                get_last_matching_pos(read_aln_str, ref_aln_str, aln_idx_break, 1, aln_index=aln_index)
+            except IndexError:
+                continue
+            raise Exception('TEST DID NOT PASS\nbreak outside the alignment: ' + str(aln_idx_break))
+
+    #alignments are stored as operations, and the strings made from them should match the alignment dicts
+    if full_ref_pair.align_result(ref1[:30]+ref2[25:]).segments != [(1, 0, '30M'), (2, 25, '35M')] or \
+            full_ref_pair.align_result(ref1[:20]+ref1[25:]).segments != [(1, 0, '20M5D35M')] or min_score_ref_pair.align_result('GATTACA').segments != []:
+        raise Exception('TEST DID NOT PASS\nsegments: ' + str(full_ref_pair.align_result(ref1[:30]+ref2[25:]).segments))
+    for read in batch_reads + [ref1[:20]+'GATTACA'+ref1[27:], ref2[:25]+'GATTACA'+ref1[30:], ref1[:30]+ref2[25:40]+ref1[45:]]:
+        for ref_pair in [full_ref_pair, min_score_ref_pair, ReferencePair(ref1, ref2, band_width=8), ReferencePair(ref1, ref2, max_table_cells=100)]:
+            aln_info = ref_pair.align(read)
+            aln_result = ref_pair.align_result(read)
+            if aln_result.aligned and sum(int(run_len) for _, _, cigar in aln_result.segments for run_len in re.findall('[0-9]+', cigar)) != len(aln_info['read_aln']):
+                raise Exception('TEST DID NOT PASS\nsegments: ' + str(aln_result.segments) + '\nreference: ' + str(aln_info))
+            if aln_result.to_dict() != aln_info or aln_result.read_aln != aln_info['read_aln'] or aln_result.ref2_aln != aln_info['ref2_aln']:
+                raise Exception('TEST DID NOT PASS\nfrom operations: ' + str(aln_result) + '\nreference: ' + str(aln_info))
+
+    #the segments written with --compact_alignments should rebuild the alignment strings
+    for read in batch_reads + [ref1, ref2, ref1[:20]+'GATTACA'+ref1[27:], ref2[:25]+'GATTACA'+ref1[30:], 'GATTACA']:
+        for ref_pair in [full_ref_pair, min_score_ref_pair, ReferencePair(ref1, ref2, max_table_cells=100)]:
+            aln_info = get_wild_type_aln_info(read, ref_pair) or ref_pair.align(read)
+            aln_segments = get_aln_segments(aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln'],
+                    aln_info['breakpoints_read'], aln_info['breakpoints_ref1'], aln_info['breakpoints_ref2'], aln_info['read_path'], ref1, ref2)
+            if aln_segments != ref_pair.align_result(read).segments or \
+                    decode_aln_segments(format_aln_segments(aln_segments), read, ref1, ref2) != (aln_info['read_aln'], aln_info['ref1_aln'], aln_info['ref2_aln']):
+                raise Exception('TEST DID NOT PASS\nsegments: ' + format_aln_segments(aln_segments) + '\nreference: ' + str(aln_info))
+            aln_result, tx_result = ref_pair.analyze_read(read)
+            compact_fields = format_result_fields(aln_result, tx_result.tx_status, ref1, ref2, compact_alignments=True)
+            if compact_fields != format_result_fields(aln_result.to_dict(), tx_result.tx_status, ref1, ref2, compact_alignments=True):
+                raise Exception('TEST DID NOT PASS\ncompact fields from segments: ' + compact_fields + '\nreference: ' + str(aln_result))
+    if format_aln_segments(full_ref_pair.align_result(ref1[:30]+ref2[25:]).segments) != 'A:0:30M;B:25:35M':
+        raise Exception('TEST DID NOT PASS\nsegments: ' + format_aln_segments(full_ref_pair.align_result(ref1[:30]+ref2[25:]).segments))
+    try:
+        get_aln_segments('ACGT', 'ACGA', '    ', [], [], [], [1], ref1, ref2)
+        raise Exception('TEST DID NOT PASS\nsegments of an alignment that does not match the references')
+    except ValueError:
+        pass
+
+    #a panel of two references should give the same alignments as the pair, and a panel of more references should find jumps between any two of them
+    panel = ReferencePanel([ref1, ref2], ref_cut_pos=[30, 25])
+    for read in [ref1, ref2, ref1[:30]+ref2[25:], ref2[:25]+ref1[30:], ref1[:20]+'GATTACA'+ref1[27:], 'GATTACA']:
+        aln_info = full_ref_pair.align(read)
+        panel_aln_info = panel.align(read)
+        if panel_aln_info['read_aln'] != aln_info['read_aln'] or \
+                panel_aln_info['ref_alns'] != [aln_info['ref1_aln'], aln_info['ref2_aln']] or \
+                panel_aln_info['breakpoints_read'] != aln_info['breakpoints_read'] or \
+                panel_aln_info['aln_score'] != aln_info['aln_score'] or \
+                panel_aln_info['read_path'] != aln_info['read_path']:
+            raise Exception('TEST DID NOT PASS\npanel: ' + str(panel_aln_info) + '\npair: ' + str(aln_info))
+    ref3 = 'GGATCCTTAGCACTGAACGTATGCCAAGTTCGCATGCGTTACAGGTACCTTCAGACTTAGC'
+    panel_aln_info = nw_breakpoint_panel(ref1[:30]+ref3[20:], [ref1, ref2, ref3], ref_cut_pos=[30, 25, 20])
+    if panel_aln_info['read_path'] != [1, 3] or \
+            panel_aln_info['breakpoints_ref_from'] != [30] or \
+            panel_aln_info['breakpoints_ref_to'] != [20] or \
+            panel_aln_info['ref_alns'][1].strip() != '':
+        raise Exception('TEST DID NOT PASS\npanel: ' + str(panel_aln_info))
+
+    #the k-mer index should pick the pair of references that the halves of a read come from
+    kmer_index = KmerIndex([ref1, ref2, ref3], kmer_size=8)
+    for read, site_pair in [(ref1[:30]+ref3[20:], (0, 2)), (ref3[:20]+ref2[25:], (1, 2)), (ref2[:25]+ref1[30:], (0, 1))]:
+        candidate_pairs = kmer_index.get_candidate_pairs(read)
+        if candidate_pairs != [site_pair]:
+            raise Exception('TEST DID NOT PASS\ncandidate pairs: ' + str(candidate_pairs) + '\nexpected: ' + str(site_pair))
+
+    #the summary of a run should count reads by tx status, and their breakpoints by reference, position and tx status, and chunk summaries should merge to the same counts
+    summary = BreakpointSummary(['A', 'B'], [len(ref1), len(ref2)])
+    chunk_summary = pickle.loads(pickle.dumps(BreakpointSummary(['A', 'B'], [len(ref1), len(ref2)])))
+    for read, read_count in [(ref1[:30]+ref2[25:], 3), (ref2[:25]+ref1[30:], 2), (ref1, 4), (ref1[:30]+ref2[25:40]+ref1[45:], 1)]:
+        summary_fields = get_summary_fields(*get_aln_tx_status(read, ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, ref_pair=full_ref_pair))
+        summary.add_result_fields(summary_fields, read_count)
+        chunk_summary.add_result_fields(summary_fields, read_count)
+    summary.add_result_fields(get_summary_fields(*get_aln_tx_status('GATTACA', ref1, ref2, ref_pair=full_ref_pair)), 5)
+    if get_summary_fields(*get_aln_tx_status(ref1[:30]+ref2[25:], ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, ref_pair=full_ref_pair)) != ('Tx A>B', [(30, 30, 25)]):
+        raise Exception('TEST DID NOT PASS\nsummary fields: ' + str(get_summary_fields(*get_aln_tx_status(ref1[:30]+ref2[25:], ref1, ref2, ref1_cut_pos=30, ref2_cut_pos=25, ref_pair=full_ref_pair))))
+    chunk_summary = pickle.loads(pickle.dumps(chunk_summary))
+    if chunk_summary.breakpoint_counts[0, 30].sum() != 6 or chunk_summary.breakpoint_counts[1, 25].sum() != 6 or chunk_summary.get_total_counts()['Total reads'] != 10:
+        raise Exception('TEST DID NOT PASS\nchunk summary: ' + str(chunk_summary.get_total_counts()))
+    summary.merge(chunk_summary)
+    if summary.get_total_counts() != {'Total reads': 25, 'Likely tx A>B': 6, 'Likely tx B>A': 4, 'Unlikely tx': 2} or \
+            summary.breakpoint_counts[0, 30].sum() != 12 or summary.breakpoint_counts[0, 31].sum() != 0 or summary.breakpoint_counts.sum() != 2 * 2 * (3 + 2 + 2*1):
+        raise Exception('TEST DID NOT PASS\nsummary: ' + str(summary.get_total_counts()))
+    summary_out = io.StringIO()
+    summary.write(summary_out)
+    if 'A\t30\tTx A>B\t6\n' not in summary_out.getvalue() or 'Unknown/breakpoints not given\t5\n' not in summary_out.getvalue():
+        raise Exception('TEST DID NOT PASS\nsummary table: ' + summary_out.getvalue())
+
+    #primer lookups should map every read end within the allowed mismatches of a primer to its sequence, and drop read ends within the allowed mismatches of the primers of both sequences (here ACGTAG and ACGTGC, in the variants of both left primers)
+    left_lookup, right_lookup = get_primer_lookups(('ACGTAC', 'GGTTCC'), ('acgtgg', 'TTGGAA'), 1)
+    if left_lookup[6].get('ACGTAC') != 'A' or left_lookup[6].get('ACGTGG') != 'B' or left_lookup[6].get('NCGTAC') != 'A' or left_lookup[6].get('ACGTGT') != 'B' or \
+            'ACGTAG' in left_lookup[6] or 'ACGTGC' in left_lookup[6] or len(left_lookup[6]) != 2 * (1 + 6*4) - 2*2 or len(right_lookup[6]) != 2 * (1 + 6*4):
+        raise Exception('TEST DID NOT PASS\nleft lookup: ' + str(left_lookup))
+    _, right_lookup = get_primer_lookups(('ACGTAC', 'GGTTCC'), ('ACGTGG', 'TTGGAA'), 2)
+    if len(right_lookup[6]) != 2 * (1 + 6*4 + 15*4*4) or right_lookup[6].get('GNTTCA') != 'A' or right_lookup[6].get('GGTTCC') != 'A':
+        raise Exception('TEST DID NOT PASS\nright lookup: ' + str(len(right_lookup[6])))
+    _, right_lookup = get_primer_lookups(('ACGTAC', 'GGTTCC'), ('ACGTGG', 'TTGGAA'), 0)
+    if right_lookup != {6: {'GGTTCC': 'A', 'TTGGAA': 'B'}}:
+        raise Exception('TEST DID NOT PASS\nright lookup: ' + str(right_lookup))
+
+    #reads should be classified by the sequences whose primers start and end them
+    left_lookup, right_lookup = get_primer_lookups(('ACGTAC', 'GGTTCC'), ('ACGTGG', 'TTGGAA'), 1)
+    for read, primer_class in [('ACGTACTTTTGGTTCC', 'AA'), ('acgtggttttttggaa', 'BB'), ('ACGTATGGGTTGGAT', 'AB'), ('ACGTGGAAAAGGTTCC', 'BA'),
+            ('ACGTAGTTTTGGTTCC', 'unclassified'), ('ACGTACTTTTGCATCC', 'unclassified'), ('ACGTAC', 'unclassified'), ('GGTTCC', 'unclassified')]:
+        if classify_read_primers(read, left_lookup, right_lookup) != primer_class:
+            raise Exception('TEST DID NOT PASS\nread: ' + read + '\nprimer class: ' + classify_read_primers(read, left_lookup, right_lookup) + '\nexpected: ' + primer_class)
+
+    #reads skipped by their primers should be written without alignments, and counted in the summary by their primer class
+    triaged_summary = BreakpointSummary(['A', 'B'], [len(ref1), len(ref2)])
+    for compact_alignments in [False, True]:
+        result_fields = get_triaged_result_fields('ACGTACTTTTGGTTCC', 'AA', 30, 25, compact_alignments)
+        expected_fields = ['', '0', '0', 'Not aligned (primers AA)', ''] if compact_alignments else ['', '0', '0', 'Not aligned (primers AA)', 'ACGTACTTTTGGTTCC', '', '']
+        if result_fields.split('\t') != expected_fields:
+            raise Exception('TEST DID NOT PASS\ntriaged fields: ' + result_fields)
+        triaged_summary.add_result_fields(get_triaged_summary_fields('AA'), 2)
+    triaged_summary.add_result_fields(get_triaged_summary_fields('BB'), 1)
+    summary_out = io.StringIO()
+    triaged_summary.write(summary_out)
+    if get_triaged_result_fields('ACGTGGTTTTTTGGAA', 'BB').split('\t')[2] != 'NA' or triaged_summary.read_counts.sum() != 5 or triaged_summary.breakpoint_read_counts.sum() != 0 or \
+            'Not aligned (primers AA)\t4\n' not in summary_out.getvalue() or 'Not aligned (primers BB)\t1\n' not in summary_out.getvalue():
+        raise Exception('TEST DID NOT PASS\ntriaged summary: ' + summary_out.getvalue())
+
+    #the command line should write a row for each read in input order (or each unique sequence with --write_unique), with the same results for every copy of a sequence, and count the aligned and wild-type reads
+    cli_ref1 = 'CCGTAATGCCTTTCCCTAACAGAGTTTTTCGAACTCGTGTTGTCGAGCGACGGAATTAGA'
+    cli_ref2 = 'TCAGTTAAATGGCAGAAAACTGGCAGGGCTTTTAGTCGTGGGATGATCAGTGGGTAAAGG'
+    tx_read = cli_ref1[:30]+cli_ref2[25:]
+    cli_reads = [tx_read, cli_ref1, cli_ref2[:25]+cli_ref1[30:], tx_read, 'GATTACA', cli_ref1[:30]+cli_ref1[33:], cli_ref1, tx_read]
+    cli_tx_statuses = ['Tx A>B', 'No breakpoints detected', 'Tx B>A', 'Tx A>B', 'No breakpoints detected', 'Multiple breakpoints detected', 'No breakpoints detected', 'Tx A>B']
+    with tempfile.TemporaryDirectory() as cli_dir:
+        fastq_file = os.path.join(cli_dir, 'reads.fastq')
+        with open(fastq_file, 'w') as f_fastq:
+            for read_ind, read in enumerate(cli_reads):
+                f_fastq.write('@read' + str(read_ind) + '\n' + read + '\n+\n' + 'I' * len(read) + '\n')
+        cli_command = [sys.executable, '-m', 'ChromBridGE.ChromBridGE', '-f', fastq_file, '-a', cli_ref1, '-b', cli_ref2, '--seqA_cut_pos', '30', '--seqB_cut_pos', '25']
+        output_file = os.path.join(cli_dir, 'out.txt')
+        def run_cli(extra_args):
+            cli_run = subprocess.run(cli_command + ['-o', output_file] + extra_args, capture_output=True, text=True)
+            if cli_run.returncode != 0:
+                raise Exception('TEST DID NOT PASS\ncommand line ' + str(extra_args) + ' failed:\n' + cli_run.stderr)
+            with open(output_file) as f_out:
+                return [line.rstrip('\n').split('\t') for line in f_out], cli_run.stdout
+
+        collapsed_rows, collapsed_stdout = run_cli([])
+        if collapsed_rows[0] != ['read_id'] + RESULT_HEADER.split('\t') or [row[0] for row in collapsed_rows[1:]] != ['@read' + str(read_ind) for read_ind in range(len(cli_reads))] or \
+                [row[4] for row in collapsed_rows[1:]] != cli_tx_statuses or [row[5].replace('-', '') for row in collapsed_rows[1:]] != cli_reads or \
+                collapsed_rows[1][1:] != collapsed_rows[4][1:] or collapsed_rows[1][1:] != collapsed_rows[8][1:] or collapsed_rows[1][1] != '30:30:25' or \
+                'Aligned 4 sequences from 8 reads' not in collapsed_stdout or 'Skipped alignment of 2 wild-type reads' not in collapsed_stdout:
+            raise Exception('TEST DID NOT PASS\ncollapsed rows: ' + str(collapsed_rows) + '\n' + collapsed_stdout)
+        results_by_seq = {read: row[1:] for read, row in zip(cli_reads, collapsed_rows[1:])}
+
+        unique_rows, unique_stdout = run_cli(['--write_unique'])
+        if unique_rows[0] != ['read_seq', 'read_count'] + RESULT_HEADER.split('\t') or \
+                [(row[0], row[1]) for row in unique_rows[1:]] != [(tx_read, '3'), (cli_ref1, '2'), (cli_ref2[:25]+cli_ref1[30:], '1'), ('GATTACA', '1'), (cli_ref1[:30]+cli_ref1[33:], '1')] or \
+                any(row[2:] != results_by_seq[row[0]] for row in unique_rows[1:]) or 'Aligned 4 sequences from 8 reads' not in unique_stdout:
+            raise Exception('TEST DID NOT PASS\nunique rows: ' + str(unique_rows) + '\n' + unique_stdout)
+
+        uncollapsed_rows, uncollapsed_stdout = run_cli(['--no_collapse'])
+        if uncollapsed_rows != collapsed_rows or 'Aligned 6 sequences from 8 reads' not in uncollapsed_stdout or 'Skipped alignment of 2 wild-type reads' not in uncollapsed_stdout:
+            raise Exception('TEST DID NOT PASS\nuncollapsed rows: ' + str(uncollapsed_rows) + '\n' + uncollapsed_stdout)
+
+        #worker processes should write the same rows in the same order as a single process, with the reads split into several chunks
+        for mode_args, single_process_rows in [([], collapsed_rows), (['--write_unique'], unique_rows), (['--no_collapse'], uncollapsed_rows)]:
+            threaded_rows, threaded_stdout = run_cli(mode_args + ['--threads', '3', '--chunk_size', '2'])
+            if threaded_rows != single_process_rows:
+                raise Exception('TEST DID NOT PASS\nthreaded rows ' + str(mode_args) + ': ' + str(threaded_rows) + '\nsingle process rows: ' + str(single_process_rows))
+
+        #--summary_only should write the same summary as a run that also writes the rows, and should not be given with -o
+        summary_file = os.path.join(cli_dir, 'summary.txt')
+        run_cli(['--summary_file', summary_file])
+        with open(summary_file) as f_summary:
+            rows_summary = f_summary.read()
+        summary_run = subprocess.run(cli_command + ['--summary_only', '--summary_file', summary_file], capture_output=True, text=True)
+        with open(summary_file) as f_summary:
+            summary_only_summary = f_summary.read()
+        if summary_run.returncode != 0 or summary_only_summary != rows_summary or 'Tx A>B\t3\n' not in rows_summary or 'A\t30\tTx A>B\t3\n' not in rows_summary:
+            raise Exception('TEST DID NOT PASS\nsummary only: ' + summary_only_summary + summary_run.stderr + '\nwith rows: ' + rows_summary)
+        rejected_run = subprocess.run(cli_command + ['--summary_only', '-o', output_file], capture_output=True, text=True)
+        if rejected_run.returncode == 0 or '--summary_only' not in rejected_run.stderr:
+            raise Exception('TEST DID NOT PASS\n-o with --summary_only: ' + rejected_run.stderr)
+
     print("Tests passed")